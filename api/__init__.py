@@ -1 +1 @@
-from .app import create_app, db, ma, aws_wrapper, celery
\ No newline at end of file
+from .app import create_app, db, ma, aws_wrapper, storage, preview_urls, celery
\ No newline at end of file
@@ -7,15 +7,25 @@ from flask_mail import Mail
 from flask_caching import Cache
 from apifairy import APIFairy
 from celery import Celery
-import redis
 import logging
 
 from config import Config, config
 from utils.aws_wrapper import AWSWrapper
+from utils.database import engine_options
+from utils.replicas import ReplicaSet, RoutingSession
+from utils.storage import Storage
+from utils.preview_url_cache import PreviewURLCache
+from utils.principal_cache import PrincipalCache
+from utils.redis_client import RedisClient
+from utils.response_cache import ResponseCache
+from utils.fast_json import FastJSONProvider
+from utils.google_certs import GoogleTokenVerifier
 
 from typing import Any
 
-db = Alchemical()
+replicas = ReplicaSet()
+db = Alchemical(session_options={'class_': RoutingSession,
+                                 'replicas': replicas})
 migrate = Migrate()
 ma = Marshmallow()
 cors = CORS()
@@ -23,10 +33,14 @@ mail = Mail()
 apifairy = APIFairy()
 cache = Cache()
 aws_wrapper = AWSWrapper()
+storage = Storage(aws_wrapper)
 celery = Celery(__name__, broker=str(config.REDIS_URL))
-rd = redis.StrictRedis(
-    host=config.REDIS_URL.host, port=config.REDIS_URL.port,
-    db=0, decode_responses=True)
+rd = RedisClient(decode_responses=True)
+token_redis = RedisClient()
+preview_urls = PreviewURLCache(storage, rd)
+principals = PrincipalCache(rd)
+responses = ResponseCache(cache)
+google_verifier = GoogleTokenVerifier()
 
 
 def create_app(config_class: Config = config) -> Flask:
@@ -38,22 +52,35 @@ def create_app(config_class: Config = config) -> Flask:
     """
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = FastJSONProvider(app)
     app.json.sort_keys = False
+    app.config['ALCHEMICAL_ENGINE_OPTIONS'] = engine_options(app.config)
 
     db.init_app(app)
+    replicas.init_app(app)
     migrate.init_app(app, db)
     ma.init_app(app)
     cors.init_app(app, resources={r'/api/*': {'origins': '*'}})
     mail.init_app(app)
     apifairy.init_app(app)
+    app.config.setdefault('CACHE_REDIS_URL', str(app.config['REDIS_URL']))
     cache.init_app(app)
+    rd.init_app(app)
+    token_redis.init_app(app)
+    responses.init_app(app)
     aws_wrapper.init_app(app)
+    storage.init_app(app)
+    preview_urls.init_app(app)
+    principals.init_app(app)
+    google_verifier.init_app(app)
     celery.conf.update(app.config)
 
     from api.routes.health import bp as health_bp
     app.register_blueprint(health_bp)
     from api.routes.errors import bp as errors_bp
     app.register_blueprint(errors_bp)
+    from api.routes.storage import bp as storage_bp
+    app.register_blueprint(storage_bp)
     from api.routes.tokens import bp as tokens_bp
     app.register_blueprint(tokens_bp, url_prefix='/api/v1')
     from api.routes.users import bp as users_bp
@@ -1,19 +1,47 @@
-import requests
+import time
 from flask import current_app, abort
 from flask_httpauth import HTTPTokenAuth
 from werkzeug.exceptions import Unauthorized, Forbidden
 from jwt import DecodeError
 
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from google.auth.exceptions import GoogleAuthError
 
-from api.app import db
+from api.app import db, principals, google_verifier
+from api.token import Token
 from database.models import User
+from database.enums import Role
 
 google_auth = HTTPTokenAuth(scheme='Bearer')
 token_auth = HTTPTokenAuth(scheme='Bearer')
 
 
+class Principal:
+    """The authenticated user of a request.
+
+    Only the user ID and role are kept, so that authenticated requests don't
+    need to load the user from the database. The full user is loaded from
+    :attr:`user` by the handlers that need it.
+    """
+    __slots__ = ('id', 'role', 'expires_at')
+
+    def __init__(self, id: int, role: Role,
+                 expires_at: float = float('inf')) -> None:
+        """Create a principal
+
+        :param id: The user ID.
+        :param role: The user's role.
+        :param expires_at: The epoch time at which the access token expires.
+        """
+        self.id = id
+        self.role = role
+        self.expires_at = expires_at
+
+    @property
+    def user(self) -> User|None:
+        """Return the user this principal represents."""
+        return db.session.get(User, self.id)
+
+
 @google_auth.verify_token
 def verify_google_token(credential:str) -> User|None:
     """Exchange OAuth2 credential code for access token and verify it.
@@ -26,8 +54,11 @@ def verify_google_token(credential:str) -> User|None:
         return db.session.scalar(User.select())
 
     if credential:
-        idinfo = id_token.verify_oauth2_token(
-            credential, requests.Request(), current_app.config['GOOGLE_CLIENT_ID'])
+        try:
+            idinfo = google_verifier.verify(
+                credential, current_app.config['GOOGLE_CLIENT_ID'])
+        except (ValueError, GoogleAuthError):
+            abort(401)
 
         if 'email' in idinfo:
             user = db.session.scalar(
@@ -40,31 +71,50 @@ def verify_google_token(credential:str) -> User|None:
 
 
 @token_auth.verify_token
-def verify_token(access_token: str) -> User|None:
+def verify_token(access_token: str) -> Principal|None:
     """Verify the access token.
 
+    Validated access tokens are cached for a few seconds in each process.
+
     :param access_token: The access token.
 
-    :return: The user associated with the access token.
+    :return: The principal associated with the access token.
     """
     if current_app.config['DISABLE_AUTH']:
-        return db.session.scalar(User.select())
+        user = db.session.scalar(User.select())
+        return Principal(user.id, user.role) if user else None
     if access_token:
         try:
-            return User.verify_access_token(access_token)
+            access_token = Token.decode_jwt(access_token)
         except DecodeError:
             abort(401)
 
+        principal = principals.get(access_token)
+        if principal is not None:
+            return principal
+
+        try:
+            token = Token.from_access_token(access_token)
+        except ValueError:
+            abort(401)
+        if token.access_expiration <= time.time():
+            return None
+        user = db.session.get(User, token.user_id)
+        if user:
+            principal = Principal(user.id, user.role, token.access_expiration)
+            principals.set(access_token, principal)
+            return principal
+
 
 @token_auth.get_user_roles
-def get_user_roles(user: User) -> str:
+def get_user_roles(principal: Principal) -> str:
     """Return the user's role.
 
-    :param user: The user.
+    :param principal: The authenticated principal.
 
     :return: The user's role.
     """
-    return user.role.name
+    return principal.role.name
 
 
 @token_auth.error_handler
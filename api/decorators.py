@@ -0,0 +1,280 @@
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+import redis
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+from flask import abort, current_app, request
+from apifairy import arguments, response
+from marshmallow import fields
+
+from api import db
+from api.app import responses
+from api.auth import get_user_roles, token_auth
+from api.routes.schemas import CursorPaginationSchema, PaginatedCollection
+from utils.replicas import use_primary
+
+from typing import Any, Callable
+
+
+def eager_load_options(schema: Any) -> list:
+    """Return the loader options for the relationships a schema dumps.
+
+    Many-to-one relationships are joined into the main query and
+    collections are loaded with one additional query each, so the number of
+    queries needed to dump a result does not depend on its number of rows.
+
+    :param schema: The SQLAlchemy schema used to dump the result.
+
+    :return: The list of loader options.
+    """
+    model = getattr(schema.opts, 'model', None)
+    if model is None:
+        return []
+    relationships = sa.inspect(model).relationships
+    options = []
+    for name, field in schema.dump_fields.items():
+        attr = field.attribute or name
+        if not isinstance(field, fields.Nested) or attr not in relationships:
+            continue
+        relationship = getattr(model, attr)
+        loader = so.selectinload(relationship) \
+            if relationships[attr].uselist else so.joinedload(relationship)
+        nested_options = eager_load_options(field.schema)
+        options.append(loader.options(*nested_options) if nested_options
+                       else loader)
+    return options
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Encode a keyset position as an opaque cursor.
+
+    :param created_at: The creation time of the last row of a page.
+    :param id: The id of the last row of a page.
+
+    :return: The cursor as a URL safe string.
+    """
+    payload = json.dumps([created_at.isoformat(), id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor returned by :func:`encode_cursor`.
+
+    :param cursor: The cursor string.
+
+    :return: The ``(created_at, id)`` keyset position.
+
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def keyset_paginate(select_query: sa.Select, limit: int,
+                    cursor: str | None = None,
+                    order: str = 'desc') -> sa.Select:
+    """Apply keyset pagination on ``(created_at, id)`` to a select query.
+
+    One row more than ``limit`` is selected, so that the caller can tell if
+    there is a next page without running a count query.
+
+    :param select_query: The select query on a timestamped model.
+    :param limit: The page size.
+    :param cursor: The cursor of the previous page, if any.
+    :param order: The sort direction, ``asc`` or ``desc``.
+
+    :return: The paginated select query.
+    """
+    model = select_query.column_descriptions[0]['entity']
+    key = sa.tuple_(model.created_at, model.id)
+    if cursor:
+        position = decode_cursor(cursor)
+        select_query = select_query.where(
+            key > position if order == 'asc' else key < position)
+    if order == 'asc':
+        ordering = (model.created_at.asc(), model.id.asc())
+    else:
+        ordering = (model.created_at.desc(), model.id.desc())
+    return select_query.order_by(*ordering).limit(limit + 1)
+
+
+def validator_query(select_query: sa.Select, schema: Any) -> sa.Select:
+    """Return the query for the validators of the rows a query selects.
+
+    The ``id`` and ``updated_at`` of each row are selected, with the
+    ``updated_at`` of the rows nested by the many-to-one relationships that
+    ``schema`` dumps, so that a change to any of them changes the
+    validators. Keyset indexes include ``updated_at`` on PostgreSQL, so a
+    page is validated from the index alone, and nested rows by primary key.
+
+    :param select_query: The select query on a timestamped model.
+    :param schema: The schema used to dump the result.
+
+    :return: The select query for the validator columns.
+    """
+    model = select_query.column_descriptions[0]['entity']
+    relationships = sa.inspect(model).relationships
+    columns = [model.id, model.updated_at]
+    joins = []
+    for name, field in schema.dump_fields.items():
+        attr = field.attribute or name
+        if not isinstance(field, fields.Nested) or \
+                attr not in relationships or relationships[attr].uselist:
+            continue
+        nested = so.aliased(relationships[attr].mapper.class_)
+        joins.append(getattr(model, attr).of_type(nested))
+        columns.append(nested.updated_at)
+    select_query = select_query.with_only_columns(*columns)
+    for join in joins:
+        select_query = select_query.outerjoin(join)
+    return select_query
+
+
+def conditional_headers(select_query: sa.Select,
+                        last_modified: bool = False) -> dict[str, str]:
+    """Return the validators of a response, or abort with 304 if unchanged.
+
+    The strong ETag hashes the URL and the validator rows, without dumping
+    the response. It also changes with the ``PREVIEW_URL_WINDOW``, so that
+    clients don't keep preview URLs past their expiration, and for the same
+    reason ``Last-Modified`` is never before the start of the window.
+
+    :param select_query: The query returned by :func:`validator_query`.
+    :param last_modified: Whether to send the latest ``updated_at``, or the
+        start of the window if later, as ``Last-Modified``. Only single
+        resources send it, as it doesn't change when a row leaves a
+        collection.
+
+    :return: The ``ETag`` and ``Last-Modified`` headers, empty if there are
+        no rows.
+    """
+    rows = [tuple(row) for row in db.session.execute(select_query)]
+    if not rows:
+        return {}
+    window_size = current_app.config['PREVIEW_URL_WINDOW']
+    window = int(time.time() // window_size)
+    response = current_app.response_class()
+    response.set_etag(hashlib.sha256(repr(
+        (request.full_path, window, rows)).encode()).hexdigest()[:32])
+    if last_modified:
+        response.last_modified = max(
+            datetime.fromtimestamp(window * window_size, timezone.utc),
+            *(updated_at.replace(tzinfo=timezone.utc)
+              for row in rows for updated_at in row[1:]
+              if updated_at is not None))
+    response.make_conditional(request)
+    if response.status_code == 304:
+        abort(response)
+    return {header: response.headers[header]
+            for header in ('ETag', 'Last-Modified')
+            if header in response.headers}
+
+
+def paginated_response(schema: Any, max_limit: int = 100,
+                       default_limit: int = 25,
+                       pagination_schema: type = CursorPaginationSchema
+                       ) -> Callable:
+    """Paginate the select query returned by the decorated route.
+
+    The response contains the page of items under ``data`` and the page size,
+    item count and the cursor of the next page under ``pagination``. The
+    relationships dumped by ``schema`` are eagerly loaded. The page is
+    validated with an ETag first, and not loaded when the client has it.
+
+    :param schema: The schema used to dump each item.
+    :param max_limit: The maximum page size a client can request.
+    :param default_limit: The page size used when none is requested.
+    :param pagination_schema: The schema of the pagination arguments.
+
+    :return: The decorator.
+    """
+    def inner(f: Callable) -> Callable:
+        @wraps(f)
+        def paginate(*args, **kwargs) -> tuple[dict, dict]:
+            args = list(args)
+            pagination = args.pop(-1)
+            select_query = f(*args, **kwargs)
+            limit = min(pagination.get('limit', default_limit), max_limit)
+            page = {'cursor': pagination.get('cursor'),
+                    'order': pagination.get('order', 'desc')}
+            try:
+                validators = keyset_paginate(
+                    validator_query(select_query, schema), limit, **page)
+                select_query = keyset_paginate(select_query.options(
+                    *eager_load_options(schema)), limit, **page)
+            except ValueError as e:
+                abort(400, str(e))
+            headers = conditional_headers(validators)
+
+            data = db.session.scalars(select_query).all()
+            next_cursor = None
+            if len(data) > limit:
+                data = data[:limit]
+                next_cursor = encode_cursor(data[-1].created_at, data[-1].id)
+            return {'data': data, 'pagination': {
+                'limit': limit,
+                'count': len(data),
+                'next': next_cursor,
+            }}, headers
+
+        return arguments(pagination_schema)(response(PaginatedCollection(
+            schema, pagination_schema=pagination_schema))(paginate))
+    return inner
+
+
+def cached_response(*models: Any) -> Callable:
+    """Cache the responses of the decorated read route.
+
+    Responses are cached per route, query arguments and role of the user,
+    until a change to the tables of ``models`` is committed, and not at all
+    when ``RESPONSE_CACHE_TIMEOUT`` is 0. The decorator goes between
+    ``authenticate`` and the apifairy decorators that build the response.
+
+    Responses that miss the cache are built from the primary, as a replica
+    may not have replayed the commit that changed the tables yet, and its
+    stale response would be cached under their new generations.
+
+    :param models: The models the response is built from, including the
+        ones of nested schemas.
+
+    :return: The decorator.
+    """
+    tables = sorted(model.__table__.name for model in models)
+
+    def inner(f: Callable) -> Callable:
+        @wraps(f)
+        def cached(*args, **kwargs) -> Any:
+            if not responses.timeout:
+                return f(*args, **kwargs)
+            try:
+                key = responses.key(
+                    tables, get_user_roles(token_auth.current_user()))
+                rv = responses.get(key)
+            except redis.RedisError as e:
+                logging.warning(f'Response cache unavailable: {e}')
+                return f(*args, **kwargs)
+            if rv is not None:
+                rv.headers['X-Cache'] = 'HIT'
+                return rv.make_conditional(request)
+            use_primary()
+            rv = current_app.make_response(f(*args, **kwargs))
+            if rv.status_code == 200:
+                try:
+                    responses.set(key, rv)
+                except redis.RedisError as e:
+                    logging.warning(f'Response cache unavailable: {e}')
+            rv.headers['X-Cache'] = 'MISS'
+            return rv
+        return cached
+    return inner
@@ -1,44 +1,111 @@
-from threading import Thread
+import logging
 
-from flask import Flask, current_app, render_template
+import sqlalchemy as sa
+from flask import current_app, render_template
 from flask_mail import Message
 
-from api.app import mail
+from api.app import db
+from database import outbox
+from database.enums import EmailStatus
+from database.models.email import Email
+from utils.mailer import SMTPPool
 
 
-def send_async_email(app: Flask, to:str, subject:str, template:str,
-                     sender=None, **kwargs) -> None:
-    """Send an email asynchronously.
+def send_email(to: str, subject: str, template: str, sender=None,
+               **kwargs) -> Email:
+    """Queue an email to be sent by the worker.
+
+    The email is tracked in the database and its task is sent once the
+    session is committed, so the caller commits.
 
-    :param app: Flask app
     :param to: Email recipient
     :param subject: Email subject
     :param template: Email template
     :param sender: Email sender
-    :param kwargs: Additional keyword arguments
+    :param kwargs: The context of the template
+
+    :return: The queued email
     """
-    with app.app_context():
-        msg = Message(subject, recipients=[to], sender=sender)
-        msg.body = render_template(template + '.txt', **kwargs)
-        msg.html = render_template(template + '.html', **kwargs)
-        mail.send(msg)
+    email = Email(recipient=to, subject=subject, template=template,
+                  sender=sender or current_app.config['MAIL_DEFAULT_SENDER'],
+                  context=kwargs)
+    db.session.add(email)
+    db.session.flush()
+    outbox.enqueue_batch(db.session, 'worker.tasks.email_tasks.send_emails',
+                         email.id)
+    return email
 
 
-def send_email(to:str, subject:str, template:str, sender=None, **kwargs) -> Thread:
-    """Send an email.
+def render_email(email: Email) -> Message:
+    """Render the message of an email.
 
-    :param to: Email recipient
-    :param subject: Email subject
-    :param template: Email template
-    :param sender: Email sender
-    :param kwargs: Additional keyword arguments
+    Templates are compiled once and cached by the Jinja environment of the
+    app.
+
+    :param email: The email to render.
+
+    :return: The message, with a text and an HTML body.
+    """
+    message = Message(email.subject, recipients=[email.recipient],
+                      sender=email.sender)
+    message.body = render_template(email.template + '.txt', **email.context)
+    message.html = render_template(email.template + '.html', **email.context)
+    return message
+
+
+def deliver_emails(email_ids: list[int], pool: SMTPPool) -> list[Email]:
+    """Send queued emails over one connection and record the outcome.
+
+    Sent emails are marked as sent, and emails that can't be rendered or
+    that the server refused as failed. If the connection fails, the outcome
+    of the emails sent before is recorded along with the attempt, the other
+    emails stay queued and the error is raised.
+
+    :param email_ids: The IDs of the emails.
+    :param pool: The pool of SMTP connections.
+
+    :return: The emails that were still queued.
+    """
+    emails = db.session.scalars(Email.select().where(
+        Email.id.in_(email_ids), Email.status == EmailStatus.QUEUED)).all()
+    pending, messages = [], []
+    for email in emails:
+        email.attempts += 1
+        try:
+            messages.append(render_email(email))
+        except Exception as e:
+            logging.exception(f'Could not render email {email.id}')
+            email.status = EmailStatus.FAILED
+            email.error = f'Could not render the email: {e}'[:280]
+        else:
+            pending.append(email)
+
+    def record(index: int, error: str|None) -> None:
+        email = pending[index]
+        if error is None:
+            email.status = EmailStatus.SENT
+            email.sent_at = sa.func.now()
+        else:
+            email.status = EmailStatus.FAILED
+        email.error = error
+
+    try:
+        if messages:
+            pool.send(messages, callback=record)
+    finally:
+        db.session.commit()
+    return emails
+
+
+def fail_emails(email_ids: list[int], error: str) -> None:
+    """Mark queued emails as failed, once they can't be retried.
 
-    :return: The email thread
+    :param email_ids: The IDs of the emails.
+    :param error: The last error.
     """
-    if sender is None:
-        sender = current_app.config['MAIL_DEFAULT_SENDER']
-    app = current_app._get_current_object()
-    thread = Thread(target=send_async_email, args=(app, to, subject, template),
-                    kwargs={**kwargs, 'sender': sender})
-    thread.start()
-    return thread
+    emails = db.session.scalars(Email.select().where(
+        Email.id.in_(email_ids), Email.status == EmailStatus.QUEUED))
+    for email in emails:
+        email.status = EmailStatus.FAILED
+        email.error = error[:280]
+    db.session.commit()
@@ -0,0 +1,95 @@
+import csv
+import io
+from datetime import datetime
+
+import msgspec
+import sqlalchemy as sa
+from flask import Response, current_app, stream_with_context
+
+from api import db
+
+from typing import Any, Iterable, Iterator, Sequence
+
+EXPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+ndjson_encoder = msgspec.json.Encoder()
+
+
+def ndjson_chunks(keys: list[str],
+                  partitions: Iterable[Sequence[sa.Row]]) -> Iterator[bytes]:
+    """Encode partitions of rows as JSON objects, one per line.
+
+    :param keys: The names of the columns of the rows.
+    :param partitions: The rows, a partition at a time.
+
+    :return: The lines of each partition.
+    """
+    for rows in partitions:
+        yield ndjson_encoder.encode_lines(
+            [dict(zip(keys, row)) for row in rows])
+
+
+def csv_value(value: Any) -> Any:
+    """Return a value as written in JSON, for dates and booleans."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+def csv_chunks(keys: list[str],
+               partitions: Iterable[Sequence[sa.Row]]) -> Iterator[bytes]:
+    """Encode partitions of rows as CSV lines, after a header line.
+
+    Dates and booleans are written as in JSON responses, and nulls as empty
+    values.
+
+    :param keys: The names of the columns of the rows.
+    :param partitions: The rows, a partition at a time.
+
+    :return: The header line and the lines of each partition.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(keys)
+    for rows in partitions:
+        writer.writerows([csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_response(select_query: sa.Select, format: str,
+                    name: str) -> Response:
+    """Stream the rows of a query as an NDJSON or CSV download.
+
+    The rows are fetched ``EXPORT_YIELD_PER`` at a time from a server-side
+    cursor, where the database supports them, and each partition is encoded
+    and sent before the next one is fetched, so the memory used doesn't
+    depend on the number of rows. The columns are selected without loading
+    ORM objects.
+
+    :param select_query: The select query of the columns to export.
+    :param format: ``ndjson`` or ``csv``.
+    :param name: The name of the downloaded file, without extension.
+
+    :return: The streamed response.
+    """
+    keys = [column.key for column in select_query.selected_columns]
+    encode = csv_chunks if format == 'csv' else ndjson_chunks
+
+    def generate() -> Iterator[bytes]:
+        result = db.session.execute(select_query.execution_options(
+            yield_per=current_app.config['EXPORT_YIELD_PER']))
+        try:
+            yield from encode(keys, result.partitions())
+        finally:
+            result.close()
+
+    return Response(stream_with_context(generate()),
+                    mimetype=EXPORT_MIMETYPES[format], headers={
+                        'Content-Disposition':
+                            f'attachment; filename={name}.{format}'})
@@ -1,17 +1,135 @@
-from flask import Blueprint, abort
-from apifairy import authenticate, body, response, other_responses
+import sqlalchemy as sa
+from botocore.exceptions import ClientError
+from flask import Blueprint, Response, abort, current_app
+from apifairy import authenticate, arguments, body, response, other_responses
 
-from api import db, aws_wrapper
+from api import db, aws_wrapper, storage
 from api.auth import token_auth
-from .schemas import FileSchema, EmptySchema, PresignedPostSchema
-from database.models import File
+from api.export import export_response
+from api.decorators import (paginated_response, eager_load_options,
+                            cached_response, conditional_headers,
+                            validator_query)
+from .schemas import (FileSchema, EmptySchema, PresignedPostSchema,
+                      FileFilterSchema, FileExportSchema,
+                      FileBatchUpdateSchema,
+                      BatchDeleteSchema, FileBatchResultSchema,
+                      MultipartUploadSchema, CompleteMultipartUploadSchema)
+from database import outbox
+from utils.multipart import get_part_size
+from database.models import File, Folder, User
 from database.enums import Role
 
 bp = Blueprint('file', __name__)
 file_schema = FileSchema()
-files_schema = FileSchema(many=True)
 update_file_schema = FileSchema(partial=True)
 presigned_post_schema = PresignedPostSchema()
+multipart_upload_schema = MultipartUploadSchema()
+complete_multipart_upload_schema = CompleteMultipartUploadSchema()
+abort_multipart_upload_schema = CompleteMultipartUploadSchema(
+    exclude=('parts',))
+file_filter_schema = FileFilterSchema()
+file_export_schema = FileExportSchema()
+files_schema = FileSchema(many=True)
+update_files_schema = FileBatchUpdateSchema(
+    many=True, partial=('filename', 'mimetype', 'folder_id'))
+batch_delete_schema = BatchDeleteSchema()
+batch_result_schema = FileBatchResultSchema(many=True)
+
+IMAGE_MIMETYPES = ['image/jpeg', 'image/png', 'image/gif']
+VIDEO_MIMETYPES = ['video/mp4']
+
+
+def files_query(filters: dict) -> sa.Select:
+    """Return the select query for files matching the given filters.
+
+    :param filters: The loaded ``FileFilterSchema`` arguments.
+
+    :return: The select query.
+    """
+    query = File.select()
+    for attr in ('folder_id', 'created_by', 'mimetype'):
+        if filters.get(attr) is not None:
+            query = query.where(getattr(File, attr) == filters[attr])
+    if filters.get('created_after'):
+        query = query.where(File.created_at >= filters['created_after'])
+    if filters.get('created_before'):
+        query = query.where(File.created_at < filters['created_before'])
+    return query
+
+
+def check_batch(items: list) -> None:
+    """Abort with a 413 error if a batch is larger than ``FILE_BATCH_SIZE``.
+
+    :param items: The items of the batch.
+    """
+    if len(items) > current_app.config['FILE_BATCH_SIZE']:
+        abort(413, f'Batches are limited to '
+                   f'{current_app.config["FILE_BATCH_SIZE"]} items')
+
+
+def check_batch_items(items: list[dict],
+                      files: dict[int, File]|None = None) -> dict[int, dict]:
+    """Return the errors of the items of a file batch.
+
+    Filenames must be unique, in the batch and in the database, and folders
+    must exist. Both are checked with one query each.
+
+    :param items: The loaded items of the batch.
+    :param files: The files updated by the items, keyed by ID.
+
+    :return: The error results keyed by item index.
+    """
+    files = files or {}
+    filenames = {item['filename'] for item in items if 'filename' in item}
+    folder_ids = {item['folder_id'] for item in items if 'folder_id' in item}
+    taken = dict(db.session.execute(
+        sa.select(File.filename, File.id).where(
+            File.filename.in_(filenames))).all())
+    folders = set(db.session.scalars(
+        sa.select(Folder.id).where(Folder.id.in_(folder_ids))))
+
+    errors = {}
+    for index, item in enumerate(items):
+        file_id = item.get('id')
+        if file_id is not None and file_id not in files:
+            errors[index] = {'status': 404, 'error': 'File not found'}
+        elif 'folder_id' in item and item['folder_id'] not in folders:
+            errors[index] = {'status': 404, 'error': 'Folder not found'}
+        elif item.get('filename') in taken and \
+                (file_id is None or taken[item['filename']] != file_id):
+            errors[index] = {'status': 409, 'error': 'Filename already exists'}
+        else:
+            if 'filename' in item:
+                taken[item['filename']] = file_id
+            continue
+        errors[index].update(index=index, id=file_id)
+    return errors
+
+
+def batch_results(items: list, errors: dict[int, dict],
+                  ids: list[int], status: int) -> list[dict]:
+    """Return the results of a file batch in the order of its items.
+
+    :param items: The items of the batch.
+    :param errors: The error results keyed by item index.
+    :param ids: The IDs of the files of the successful items, in order.
+    :param status: The status of the successful items.
+
+    :return: The results, with the successful files loaded in one query.
+    """
+    files = {file.id: file for file in db.session.scalars(
+        File.select().where(File.id.in_(ids)).options(
+            *eager_load_options(file_schema)))}
+    ids = iter(ids)
+    results = []
+    for index in range(len(items)):
+        if index in errors:
+            results.append(errors[index])
+        else:
+            file = files[next(ids)]
+            results.append({'index': index, 'status': status, 'id': file.id,
+                            'file': file})
+    return results
 
 
 @bp.route('/files/pre', methods=['POST'])
@@ -20,71 +138,114 @@ presigned_post_schema = PresignedPostSchema()
 @response(presigned_post_schema, 201)
 def pre(data: dict) -> dict:
     """Retrieve a pre-signed URL for uploading a file"""
-    return aws_wrapper.generate_presigned_post(**data)
+    return storage.generate_presigned_post(**data)
 
 
-@bp.route('/files/<int:id>', methods=['GET'])
+@bp.route('/files/multipart', methods=['POST'])
 @authenticate(token_auth)
-@response(file_schema)
-@other_responses({404: 'File not found'})
-def get(id: int) -> File:
-    """Retrieve file by id"""
-    return db.session.get(File, id) or abort(404)
+@body(multipart_upload_schema)
+@response(multipart_upload_schema, 201)
+def multipart(data: dict) -> dict:
+    """Start a multipart upload
 
+    The file is split in parts of ``part_size`` bytes, the last one being
+    smaller, and each part is sent with a PUT request to its URL. The ETag
+    header of each response is needed to complete the upload.
+    """
+    part_size = get_part_size(
+        data['size'], aws_wrapper.transfer_config.multipart_chunksize)
+    part_count = -(-data['size'] // part_size)
+    upload = aws_wrapper.create_multipart_upload(data['filename'])
+    return {**upload, 'part_size': part_size,
+            'parts': aws_wrapper.generate_presigned_parts(
+                upload['key'], upload['upload_id'], part_count)}
 
-@bp.route('/files', methods=['GET'])
-@authenticate(token_auth)
-@response(files_schema)
-def all() -> list[File]:
-    """Retrieve all files"""
-    return db.session.scalars(File.select()).all()
 
-from sqlalchemy import Column, DateTime, func
-from sqlalchemy.ext.declarative import declared_attr
+@bp.route('/files/multipart/complete', methods=['POST'])
+@authenticate(token_auth)
+@body(complete_multipart_upload_schema)
+@response(EmptySchema, 204)
+@other_responses({400: 'Invalid upload or parts'})
+def complete_multipart(data: dict) -> dict:
+    """Complete a multipart upload"""
+    try:
+        aws_wrapper.complete_multipart_upload(
+            data['key'], data['upload_id'], data['parts'])
+    except ClientError as e:
+        abort(400, e.response['Error'].get('Message', str(e)))
+    return {}
 
 
-class TimestampMixin:
-    @declared_attr
-    def created_at(cls: type) -> Column:
-        """Return a created_at column.
+@bp.route('/files/multipart', methods=['DELETE'])
+@authenticate(token_auth)
+@body(abort_multipart_upload_schema)
+@response(EmptySchema, 204)
+@other_responses({400: 'Invalid upload'})
+def abort_multipart(data: dict) -> dict:
+    """Abort a multipart upload"""
+    try:
+        aws_wrapper.abort_multipart_upload(data['key'], data['upload_id'])
+    except ClientError as e:
+        abort(400, e.response['Error'].get('Message', str(e)))
+    return {}
 
-        :param cls: The class to create the column for.
 
-        :return: The created_at column.
-        """
-        return Column(DateTime, default=func.now(), nullable=False)
+@bp.route('/files/<int:id>', methods=['GET'])
+@authenticate(token_auth)
+@cached_response(File, Folder, User)
+@response(file_schema)
+@other_responses({404: 'File not found'})
+def get(id: int) -> tuple[File, dict]:
+    """Retrieve file by id"""
+    headers = conditional_headers(validator_query(
+        File.select().where(File.id == id), file_schema), last_modified=True)
+    return db.session.get(
+        File, id, options=eager_load_options(file_schema)) or abort(404), \
+        headers
 
-    @declared_attr
-    def updated_at(cls: type) -> Column:
-        """Return an updated_at column.
 
-        :param cls: The class to create the column for.
+@bp.route('/files', methods=['GET'])
+@authenticate(token_auth)
+@cached_response(File, Folder, User)
+@paginated_response(file_schema)
+@arguments(file_filter_schema)
+def all(filters: dict) -> sa.Select:
+    """Retrieve all files"""
+    return files_query(filters)
 
-        :return: The updated_at column.
-        """
-        return Column(
-            DateTime,
-            default=func.now(),
-            onupdate=func.now(),
-            nullable=False,
-        )
 
 @bp.route('/videos', methods=['GET'])
 @authenticate(token_auth)
-@response(files_schema)
-def videos() -> list[File]:
+@cached_response(File, Folder, User)
+@paginated_response(file_schema)
+@arguments(file_filter_schema)
+def videos(filters: dict) -> sa.Select:
     """Retrieve all videos"""
-    return db.session.scalars(
-        File.select().where(File.mimetype == 'video/mp4')).all()
+    return files_query(filters).where(File.mimetype.in_(VIDEO_MIMETYPES))
 
 
 @bp.route('/images', methods=['GET'])
 @authenticate(token_auth)
-@response(files_schema)
-def images() -> list[File]:
+@cached_response(File, Folder, User)
+@paginated_response(file_schema)
+@arguments(file_filter_schema)
+def images(filters: dict) -> sa.Select:
     """Retrieve all images"""
-    return db.session.scalars(File.select().where(
-        File.mimetype.in_(['image/jpeg', 'image/png', 'image/gif']))).all()
+    return files_query(filters).where(File.mimetype.in_(IMAGE_MIMETYPES))
+
+
+@bp.route('/files/export', methods=['GET'])
+@authenticate(token_auth)
+@arguments(file_export_schema)
+def export(args: dict) -> Response:
+    """Export all files
+
+    The files matching the filters are streamed in ``ndjson`` format, one
+    JSON object per line, or in ``csv`` format with a header line, in the
+    order of their IDs. Preview URLs, owners and folders are not included.
+    """
+    return export_response(files_query(args).with_only_columns(
+        *File.__table__.columns).order_by(File.id), args['format'], 'files')
 
 
 @bp.route('/files', methods=['POST'])
@@ -124,3 +285,88 @@ def delete(id: int) -> dict:
     db.session.delete(file)
     db.session.commit()
     return {}
+
+
+@bp.route('/files/batch', methods=['POST'])
+@authenticate(token_auth, role=[Role.ADMIN.name, Role.MODERATOR.name])
+@body(files_schema)
+@response(batch_result_schema)
+@other_responses({413: 'Too many files'})
+def batch_post(data: list[dict]) -> list[dict]:
+    """Create many files
+
+    The files are inserted with a single statement, and sent to the worker
+    in a single task. Each item gets its own result, with a 201 status or
+    the reason it was not created.
+    """
+    check_batch(data)
+    user = token_auth.current_user()
+    errors = check_batch_items(data)
+    rows = [{'description': None, **item, 'created_by': user.id}
+            for index, item in enumerate(data) if index not in errors]
+    ids = []
+    if rows:
+        # Filenames are unique, so the rows don't need to be returned in
+        # order, which would make some databases insert them one at a time.
+        inserted = dict(db.session.execute(
+            sa.insert(File).returning(File.filename, File.id), rows).all())
+        ids = [inserted[row['filename']] for row in rows]
+        outbox.enqueue_batch(db.session,
+                             'worker.tasks.file_tasks.set_dominant_colors',
+                             *ids)
+        db.session.commit()
+    return batch_results(data, errors, ids, 201)
+
+
+@bp.route('/files/batch', methods=['PUT'])
+@authenticate(token_auth, role=[Role.ADMIN.name, Role.MODERATOR.name])
+@body(update_files_schema)
+@response(batch_result_schema)
+@other_responses({413: 'Too many files'})
+def batch_put(data: list[dict]) -> list[dict]:
+    """Edit many files
+
+    Each item gets its own result, with a 200 status or the reason it was
+    not updated.
+    """
+    check_batch(data)
+    files = {file.id: file for file in db.session.scalars(
+        File.select().where(File.id.in_({item['id'] for item in data})))}
+    errors = check_batch_items(data, files)
+    ids = []
+    for index, item in enumerate(data):
+        if index not in errors:
+            files[item['id']].update(
+                {attr: value for attr, value in item.items() if attr != 'id'})
+            ids.append(item['id'])
+    db.session.commit()
+    return batch_results(data, errors, ids, 200)
+
+
+@bp.route('/files/batch', methods=['DELETE'])
+@authenticate(token_auth, role=[Role.ADMIN.name, Role.MODERATOR.name])
+@body(batch_delete_schema)
+@response(batch_result_schema)
+@other_responses({413: 'Too many files'})
+def batch_delete(data: dict) -> list[dict]:
+    """Delete many files
+
+    The records are deleted with a single statement, and their S3 objects
+    with one ``delete_objects`` request per 1000 keys once the deletion is
+    committed.
+    """
+    check_batch(data['ids'])
+    filenames = dict(db.session.execute(
+        sa.select(File.id, File.filename).where(
+            File.id.in_(data['ids']))).all())
+    if filenames:
+        db.session.execute(sa.delete(File).where(File.id.in_(filenames)))
+        outbox.enqueue_batch(db.session,
+                             'worker.tasks.file_tasks.delete_s3_files',
+                             *filenames.values())
+        db.session.commit()
+    return [{'index': index, 'id': file_id, 'status': 204}
+            if file_id in filenames else
+            {'index': index, 'id': file_id, 'status': 404,
+             'error': 'File not found'}
+            for index, file_id in enumerate(data['ids'])]
@@ -1,35 +1,81 @@
-from flask import Blueprint, abort
-from apifairy import authenticate, body, response, other_responses
+import sqlalchemy as sa
+from flask import Blueprint, Response, abort
+from apifairy import authenticate, arguments, body, response, other_responses
 
 from api import db
-from database.models import Folder
+from api.export import export_response
+from api.decorators import (paginated_response, eager_load_options,
+                            cached_response, conditional_headers,
+                            validator_query)
+from database.models import Folder, User
 from database.enums import Role
-from .schemas import FolderSchema, EmptySchema
+from .schemas import (FolderSchema, EmptySchema, FolderFilterSchema,
+                      FolderExportSchema)
 from api.auth import token_auth
 
-from typing import List, Dict, Any
+from typing import Dict, Any
 
 bp = Blueprint('folders', __name__)
 folder_schema = FolderSchema()
-folders_schema = FolderSchema(many=True)
 update_folder_schema = FolderSchema(partial=True)
+folder_filter_schema = FolderFilterSchema()
+folder_export_schema = FolderExportSchema()
+
+
+def folders_query(filters: Dict) -> sa.Select:
+    """Return the select query for folders matching the given filters.
+
+    :param filters: The loaded ``FolderFilterSchema`` arguments.
+
+    :return: The select query.
+    """
+    query = Folder.select()
+    if filters.get('created_by') is not None:
+        query = query.where(Folder.created_by == filters['created_by'])
+    if filters.get('created_after'):
+        query = query.where(Folder.created_at >= filters['created_after'])
+    if filters.get('created_before'):
+        query = query.where(Folder.created_at < filters['created_before'])
+    return query
 
 
 @bp.route('/folders/<int:id>', methods=['GET'])
 @authenticate(token_auth)
 @response(folder_schema)
 @other_responses({404: 'Folder not found'})
-def get(id: int) -> Folder:
+def get(id: int) -> tuple[Folder, dict]:
     """Retrieve folder by id"""
-    return db.session.get(Folder, id) or abort(404)
+    headers = conditional_headers(validator_query(
+        Folder.select().where(Folder.id == id), folder_schema),
+        last_modified=True)
+    return db.session.get(
+        Folder, id, options=eager_load_options(folder_schema)) or abort(404), \
+        headers
 
 
 @bp.route('/folders', methods=['GET'])
 @authenticate(token_auth)
-@response(folders_schema)
-def all() -> List[Folder]:
+@cached_response(Folder, User)
+@paginated_response(folder_schema)
+@arguments(folder_filter_schema)
+def all(filters: Dict) -> sa.Select:
     """Retrieve all folders"""
-    return db.session.scalars(Folder.select()).all()
+    return folders_query(filters)
+
+
+@bp.route('/folders/export', methods=['GET'])
+@authenticate(token_auth)
+@arguments(folder_export_schema)
+def export(args: Dict) -> Response:
+    """Export all folders
+
+    The folders matching the filters are streamed in ``ndjson`` format, one
+    JSON object per line, or in ``csv`` format with a header line, in the
+    order of their IDs. Owners are not included.
+    """
+    return export_response(folders_query(args).with_only_columns(
+        *Folder.__table__.columns).order_by(Folder.id), args['format'],
+        'folders')
 
 
 @bp.route('/folders', methods=['POST'])
@@ -1,7 +1,12 @@
 from flask import Blueprint
-from apifairy import response
+from apifairy import authenticate, response
 
-from .schemas import EmptySchema
+from api import db, aws_wrapper
+from api.app import replicas
+from api.auth import token_auth
+from database.enums import Role
+from utils.database import pool_stats
+from .schemas import EmptySchema, PoolStatsSchema
 
 bp = Blueprint('health', __name__)
 
@@ -11,3 +16,13 @@ bp = Blueprint('health', __name__)
 def health_check():
     """Health check endpoint"""
     return {}
+
+
+@bp.route('/health/pools')
+@authenticate(token_auth, role=[Role.ADMIN.name])
+@response(PoolStatsSchema)
+def pools() -> dict:
+    """Connection pool usage of the database and AWS clients of this process"""
+    return {'database': pool_stats(db.get_engine()),
+            'replicas': replicas.stats(),
+            **aws_wrapper.pool_stats()}
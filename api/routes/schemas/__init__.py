@@ -1,20 +1,52 @@
 from .empty import EmptySchema
 from .file import FileSchema
-from .folder import FolderSchema
-from .user import UserSchema
+from .folder import FolderSchema, FolderSummarySchema
+from .user import UserSchema, UserSummarySchema
 from .user_invitation import UserInvitationSchema
 from .token import TokenSchema
 from .oauth2 import OAuth2Schema
-from .presigned import PresignedFieldsSchema, PresignedPostSchema
+from .presigned import (PresignedFieldsSchema, PresignedPostSchema,
+                        PresignedPartSchema, UploadedPartSchema,
+                        MultipartUploadSchema, CompleteMultipartUploadSchema)
+from .pagination import CursorPaginationSchema, PaginatedCollection
+from .batch import (FileBatchUpdateSchema, BatchDeleteSchema,
+                    FileBatchResultSchema)
+from .health import (ClientPoolSchema, EnginePoolSchema, ReplicaPoolSchema,
+                     PoolStatsSchema)
+from .filters import (TimestampFilterSchema, FileFilterSchema,
+                      FolderFilterSchema, UserFilterSchema)
+from .export import ExportSchema, FileExportSchema, FolderExportSchema
 
 __all__ = [
     'EmptySchema',
     'FileSchema',
     'FolderSchema',
+    'FolderSummarySchema',
     'UserSchema',
+    'UserSummarySchema',
     'UserInvitationSchema',
     'TokenSchema',
     'OAuth2Schema',
     'PresignedFieldsSchema',
     'PresignedPostSchema',
+    'PresignedPartSchema',
+    'UploadedPartSchema',
+    'MultipartUploadSchema',
+    'CompleteMultipartUploadSchema',
+    'CursorPaginationSchema',
+    'PaginatedCollection',
+    'FileBatchUpdateSchema',
+    'BatchDeleteSchema',
+    'FileBatchResultSchema',
+    'ClientPoolSchema',
+    'EnginePoolSchema',
+    'ReplicaPoolSchema',
+    'PoolStatsSchema',
+    'TimestampFilterSchema',
+    'FileFilterSchema',
+    'FolderFilterSchema',
+    'UserFilterSchema',
+    'ExportSchema',
+    'FileExportSchema',
+    'FolderExportSchema',
 ]
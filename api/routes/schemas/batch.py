@@ -0,0 +1,36 @@
+from marshmallow import validate, pre_dump
+
+from api import ma, preview_urls
+from .file import FileSchema
+
+
+class FileBatchUpdateSchema(FileSchema):
+    id = ma.auto_field(required=True)
+
+
+class BatchDeleteSchema(ma.Schema):
+    ids = ma.List(ma.Integer(), required=True,
+                  validate=validate.Length(min=1))
+
+
+class FileBatchResultSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    index = ma.Integer()
+    status = ma.Integer()
+    id = ma.Integer(allow_none=True)
+    error = ma.String()
+    file = ma.Nested(FileSchema)
+
+    @pre_dump(pass_many=True)
+    def sign_preview_urls(self, data: dict|list[dict], many: bool,
+                          **kwargs) -> dict|list[dict]:
+        """Sign the preview URLs of all the files in the batch at once.
+
+        :return: The results, unchanged
+        """
+        results = data if many else [data]
+        preview_urls.get_many([result['file'].filename for result in results
+                               if result.get('file') is not None])
+        return data
@@ -0,0 +1,20 @@
+from marshmallow import validate
+
+from api import ma
+from .filters import FileFilterSchema, FolderFilterSchema
+
+
+class ExportSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    format = ma.String(load_default='ndjson',
+                       validate=validate.OneOf(['ndjson', 'csv']))
+
+
+class FileExportSchema(FileFilterSchema, ExportSchema):
+    pass
+
+
+class FolderExportSchema(FolderFilterSchema, ExportSchema):
+    pass
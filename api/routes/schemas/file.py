@@ -1,10 +1,11 @@
-from marshmallow import validate
+from marshmallow import validate, pre_dump
 
-from api import ma, aws_wrapper
+from api import ma, preview_urls
 from database.models import File
+from utils.fast_json import FastJSONMixin
 
 
-class FileSchema(ma.SQLAlchemySchema):
+class FileSchema(FastJSONMixin, ma.SQLAlchemySchema):
     class Meta:
         model = File
         ordered = True
@@ -22,12 +23,23 @@ class FileSchema(ma.SQLAlchemySchema):
     folder_id = ma.auto_field()
     preview_url = ma.Method('get_preview_url', dump_only=True)
 
-    owner = ma.Nested('UserSchema', exclude=('files',), dump_only=True)
-    folder = ma.Nested('FolderSchema', exclude=('files',), dump_only=True)
+    owner = ma.Nested('UserSummarySchema', dump_only=True)
+    folder = ma.Nested('FolderSummarySchema', dump_only=True)
+
+    @pre_dump(pass_many=True)
+    def sign_preview_urls(self, data: File|list[File], many: bool,
+                          **kwargs) -> File|list[File]:
+        """Sign the preview URLs of all the files being dumped in one batch.
+
+        :return: The files, unchanged
+        """
+        files = data if many else [data]
+        preview_urls.get_many([file.filename for file in files])
+        return data
+
+    def get_preview_url(self, obj: File) -> str|None:
+        """Return a URL for previewing the file if it is stored in S3.
 
-    def get_preview_url(self, obj: dict) -> str:
-        """Generate a URL for previewing the file if it is stored in S3.
-        
         :return: URL for previewing the file
         """
-        return aws_wrapper.generate_presigned_url(obj.filename)
+        return preview_urls.get(obj.filename)
@@ -0,0 +1,26 @@
+from marshmallow_enum import EnumField
+
+from api import ma
+from database.enums import Role
+
+
+class TimestampFilterSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    created_after = ma.DateTime()
+    created_before = ma.DateTime()
+
+
+class FileFilterSchema(TimestampFilterSchema):
+    folder_id = ma.Integer()
+    created_by = ma.Integer()
+    mimetype = ma.String()
+
+
+class FolderFilterSchema(TimestampFilterSchema):
+    created_by = ma.Integer()
+
+
+class UserFilterSchema(TimestampFilterSchema):
+    role = EnumField(Role)
@@ -2,9 +2,10 @@ from marshmallow import validate
 
 from api import ma
 from database.models import Folder
+from utils.fast_json import FastJSONMixin
 
 
-class FolderSchema(ma.SQLAlchemySchema):
+class FolderSchema(FastJSONMixin, ma.SQLAlchemySchema):
     class Meta:
         model = Folder
         ordered = True
@@ -16,6 +17,13 @@ class FolderSchema(ma.SQLAlchemySchema):
     created_by = ma.auto_field(dump_only=True)
     created_at = ma.auto_field(dump_only=True)
 
-    owner = ma.Nested('UserSchema', exclude=('folders',), dump_only=True)
-    files = ma.Nested(
-        'FileSchema', exclude=('folder',), many=True, dump_only=True)
+    owner = ma.Nested('UserSummarySchema', dump_only=True)
+
+
+class FolderSummarySchema(ma.SQLAlchemySchema):
+    class Meta:
+        model = Folder
+        ordered = True
+
+    id = ma.auto_field(dump_only=True)
+    name = ma.auto_field(dump_only=True)
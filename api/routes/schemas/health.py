@@ -0,0 +1,40 @@
+from api import ma
+
+
+class ClientPoolSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    created = ma.Boolean()
+    max_pool_connections = ma.Integer()
+
+
+class EnginePoolSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    pid = ma.Integer()
+    pool = ma.String()
+    size = ma.Integer(allow_none=True)
+    checked_out = ma.Integer(allow_none=True)
+    idle = ma.Integer(allow_none=True)
+    overflow = ma.Integer(allow_none=True)
+
+
+class ReplicaPoolSchema(EnginePoolSchema):
+    class Meta:
+        ordered = True
+
+    url = ma.String()
+    healthy = ma.Boolean()
+    lag = ma.Float(allow_none=True)
+
+
+class PoolStatsSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    database = ma.Nested(EnginePoolSchema)
+    replicas = ma.Nested(ReplicaPoolSchema, many=True)
+    s3 = ma.Nested(ClientPoolSchema)
+    rekognition = ma.Nested(ClientPoolSchema)
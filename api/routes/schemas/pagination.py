@@ -0,0 +1,43 @@
+from marshmallow import validate
+
+from api import ma
+from utils.fast_json import FastJSONMixin
+
+paginated_schema_cache: dict = {}
+
+
+class CursorPaginationSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    limit = ma.Integer(validate=validate.Range(min=1))
+    cursor = ma.String(load_only=True)
+    order = ma.String(load_only=True,
+                      validate=validate.OneOf(['asc', 'desc']))
+    count = ma.Integer(dump_only=True)
+    next = ma.String(dump_only=True, allow_none=True)
+
+
+def PaginatedCollection(schema: ma.Schema,
+                        pagination_schema: type = CursorPaginationSchema
+                        ) -> type:
+    """Return a schema wrapping a page of items and its pagination data.
+
+    :param schema: The schema used to dump each item of the page.
+    :param pagination_schema: The schema used to dump the pagination data.
+
+    :return: The paginated schema class.
+    """
+    if schema in paginated_schema_cache:
+        return paginated_schema_cache[schema]
+
+    class PaginatedSchema(FastJSONMixin, ma.Schema):
+        class Meta:
+            ordered = True
+
+        data = ma.Nested(schema, many=True)
+        pagination = ma.Nested(pagination_schema)
+
+    PaginatedSchema.__name__ = f'Paginated{schema.__class__.__name__}'
+    paginated_schema_cache[schema] = PaginatedSchema
+    return PaginatedSchema
@@ -1,3 +1,5 @@
+from marshmallow import validate
+
 from api import ma
 
 
@@ -18,3 +20,43 @@ class PresignedPostSchema(ma.Schema):
     filename = ma.String(load_only=True)
     url = ma.String(dump_only=True)
     fields = ma.Nested(PresignedFieldsSchema, dump_only=True)
+
+
+class PresignedPartSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    part_number = ma.Integer()
+    url = ma.String()
+
+
+class UploadedPartSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    part_number = ma.Integer(required=True,
+                             validate=validate.Range(min=1, max=10000))
+    etag = ma.String(required=True)
+
+
+class MultipartUploadSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    filename = ma.String(load_only=True, required=True)
+    size = ma.Integer(load_only=True, required=True,
+                      validate=validate.Range(min=1, max=5 * 1024 ** 4))
+    key = ma.String(dump_only=True)
+    upload_id = ma.String(dump_only=True)
+    part_size = ma.Integer(dump_only=True)
+    parts = ma.Nested(PresignedPartSchema, many=True, dump_only=True)
+
+
+class CompleteMultipartUploadSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    key = ma.String(required=True)
+    upload_id = ma.String(required=True)
+    parts = ma.List(ma.Nested(UploadedPartSchema), required=True,
+                    validate=validate.Length(min=1, max=10000))
@@ -4,15 +4,14 @@ from marshmallow_enum import EnumField
 from api import ma
 from database.models import User
 from database.enums import Role
-
-paginated_schema_cache: dict = {}
+from utils.fast_json import FastJSONMixin
 
 
 class EmptySchema(ma.Schema):
     pass
 
 
-class UserSchema(ma.SQLAlchemySchema):
+class UserSchema(FastJSONMixin, ma.SQLAlchemySchema):
     class Meta:
         model = User
         ordered = True
@@ -26,7 +25,12 @@ class UserSchema(ma.SQLAlchemySchema):
     role = EnumField(Role)
     created_at = ma.auto_field(dump_only=True)
 
-    folders = ma.Nested(
-        'FolderSchema', exclude=('owner', 'files'), many=True, dump_only=True)
-    files = ma.Nested(
-        'FileSchema', exclude=('owner', 'folder'), many=True, dump_only=True)
+
+class UserSummarySchema(ma.SQLAlchemySchema):
+    class Meta:
+        model = User
+        ordered = True
+
+    id = ma.auto_field(dump_only=True)
+    username = ma.auto_field(dump_only=True)
+    avatar_url = ma.auto_field(dump_only=True)
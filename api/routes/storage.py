@@ -0,0 +1,70 @@
+import mimetypes
+import os
+import posixpath
+import time
+
+from flask import Blueprint, Response, abort, request, send_file
+
+from api import storage
+from api.routes.files import IMAGE_MIMETYPES, VIDEO_MIMETYPES
+from utils.storage import LocalStorage
+
+bp = Blueprint('storage', __name__)
+
+INLINE_MIMETYPES = frozenset(IMAGE_MIMETYPES + VIDEO_MIMETYPES)
+
+
+def local_storage() -> LocalStorage:
+    """Return the local storage backend, or abort if files are kept elsewhere.
+
+    :return: The local storage backend.
+    """
+    if not isinstance(storage.backend, LocalStorage):
+        abort(404)
+    return storage.backend
+
+
+@bp.route('/storage/<path:key>', methods=['GET', 'HEAD'])
+def download(key: str) -> Response:
+    """Serve a file of the local storage from a presigned URL
+
+    Range and conditional requests are answered from the file on disk, which
+    the WSGI server can send with ``sendfile``. Responses can be cached until
+    the URL expires.
+
+    Only images and videos are shown inline. Other files, which could run
+    scripts on the origin of the API, are sent as attachments.
+    """
+    backend = local_storage()
+    try:
+        expires = int(request.args.get('expires', ''))
+    except ValueError:
+        abort(403)
+    if not backend.verify(f'{key}\n{expires}',
+                          request.args.get('signature', ''), expires):
+        abort(403)
+    path = backend.local_path(key)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    mimetype = mimetypes.guess_type(key)[0]
+    inline = mimetype in INLINE_MIMETYPES
+    response = send_file(path, mimetype if inline else
+                         'application/octet-stream', conditional=True,
+                         as_attachment=not inline,
+                         download_name=posixpath.basename(key),
+                         max_age=max(expires - int(time.time()), 0))
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+@bp.route('/storage', methods=['POST'])
+def upload() -> tuple:
+    """Upload a file to the local storage with a presigned POST"""
+    backend = local_storage()
+    key = backend.check_presigned_post(request.form)
+    if key is None:
+        abort(403)
+    if 'file' not in request.files:
+        abort(400, 'No file')
+    backend.put(key, request.files['file'].stream)
+    return '', 204
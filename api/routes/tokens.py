@@ -48,7 +48,6 @@ def new() -> Token:
     if not user:
         abort(404, 'User does not exist.')
     token = user.generate_auth_token()
-    Token.clean()
     return token_response(token)
 
 
@@ -1,18 +1,40 @@
+import sqlalchemy as sa
 from apifairy.decorators import other_responses
 from flask import Blueprint, abort
-from apifairy import authenticate, body, response
+from apifairy import authenticate, arguments, body, response
 
 from api import db
-from .schemas import UserSchema, UserInvitationSchema, EmptySchema
+from api.app import principals
+from api.decorators import (paginated_response, conditional_headers,
+                            validator_query)
+from .schemas import (UserSchema, UserInvitationSchema, EmptySchema,
+                      UserFilterSchema)
 from api.auth import token_auth
 from database.models import User
 from database.enums import Role
 
-from typing import Optional, List
+from typing import Optional
 
 bp = Blueprint('users', __name__)
 user_schema = UserSchema()
-users_schema = UserSchema(many=True)
+user_filter_schema = UserFilterSchema()
+
+
+def users_query(filters: dict) -> sa.Select:
+    """Return the select query for users matching the given filters.
+
+    :param filters: The loaded ``UserFilterSchema`` arguments.
+
+    :return: The select query.
+    """
+    query = User.select()
+    if filters.get('role') is not None:
+        query = query.where(User.role == filters['role'])
+    if filters.get('created_after'):
+        query = query.where(User.created_at >= filters['created_after'])
+    if filters.get('created_before'):
+        query = query.where(User.created_at < filters['created_before'])
+    return query
 
 
 @bp.route('/users', methods=['POST'])
@@ -30,7 +52,7 @@ def post(data: dict) -> Optional[User]:
 
     :return: The new user
     """
-    user = token_auth.current_user()
+    user = token_auth.current_user().user
     new_user = user.invite(data.get('email'), data.get('role')) \
         or abort(400, 'User already exists')
     return new_user
@@ -52,6 +74,7 @@ def delete(id: int) -> dict:
     user = db.session.get(User, id) or abort(404)
     db.session.delete(user)
     db.session.commit()
+    principals.invalidate_user(id)
     return {}
 
 
@@ -72,32 +95,39 @@ def put(data: dict, id: int) -> Optional[User]:
     user = db.session.get(User, id) or abort(404)
     user.update(data)
     db.session.commit()
+    if 'role' in data:
+        principals.invalidate_user(id)
     return user
 
 
 @bp.route('/users', methods=['GET'])
 @authenticate(token_auth)
-@response(users_schema)
-def all() -> List[User]:
+@paginated_response(user_schema)
+@arguments(user_filter_schema)
+def all(filters: dict) -> sa.Select:
     """Retrieve all users
 
-    :return: All users
+    :param filters: The filters to apply
+
+    :return: A page of users
     """
-    return db.session.scalars(User.select())
+    return users_query(filters)
 
 
 @bp.route('/users/<int:id>', methods=['GET'])
 @authenticate(token_auth)
 @response(user_schema)
 @other_responses({404: 'User not found'})
-def get(id: int) -> Optional[User]:
+def get(id: int) -> tuple[User, dict]:
     """Retrieve a user by id
 
     :param id: The id of the user to retrieve
 
-    :return: The user
+    :return: The user and its validators
     """
-    return db.session.get(User, id) or abort(404)
+    headers = conditional_headers(validator_query(
+        User.select().where(User.id == id), user_schema), last_modified=True)
+    return db.session.get(User, id) or abort(404), headers
 
 
 @bp.route('/me', methods=['GET'])
@@ -108,4 +138,4 @@ def me() -> User:
 
     :return: The authenticated user
     """
-    return token_auth.current_user()
+    return token_auth.current_user().user
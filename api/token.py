@@ -1,28 +1,108 @@
 import pickle
 import jwt
+import msgspec
 import secrets
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timezone
 
-from api.app import cache
+from api.app import cache, token_redis, principals
 from config import config
 
 
+class TokenRecord(msgspec.Struct, array_like=True):
+    """Fixed layout of a token stored in Redis, encoded with MessagePack."""
+    user_id: int
+    access_token: str
+    access_expiration: int
+    refresh_token: str
+    refresh_expiration: int
+
+
+token_encoder = msgspec.msgpack.Encoder()
+token_decoder = msgspec.msgpack.Decoder(TokenRecord)
+
+
 class Token:
+    """Access and refresh token pair stored in Redis.
+
+    Each token is stored under ``token:<access token>`` with a Redis TTL that
+    ends at its refresh expiration. The access tokens of a user are indexed
+    in the ``user_tokens:<user id>`` set, so that they can be revoked without
+    scanning the tokens of every other user. Expirations are epoch seconds.
+    """
+    __slots__ = ('user_id', 'access_token', 'access_expiration',
+                 'refresh_token', 'refresh_expiration')
 
     def __init__(self, user_id: int) -> None:
         """Create a new token for the given user
 
         param user_id: The user ID
         """
+        now = int(time.time())
         self.user_id = user_id
         self.access_token = secrets.token_urlsafe()
-        self.access_expiration = datetime.utcnow() + timedelta(
-            minutes=config.ACCESS_TOKEN_MINUTES)
+        self.access_expiration = now + config.ACCESS_TOKEN_MINUTES * 60
         self.refresh_token = secrets.token_urlsafe()
-        self.refresh_expiration = datetime.utcnow() + timedelta(
-            days=config.REFRESH_TOKEN_DAYS)
+        self.refresh_expiration = now + config.REFRESH_TOKEN_DAYS * 24 * 3600
         self.save()
 
+    def __setstate__(self, state: dict) -> None:
+        """Restore a token pickled before tokens were stored as records.
+
+        :param state: The pickled attributes of the token
+        """
+        for attr in self.__slots__:
+            value = state[attr]
+            if isinstance(value, datetime):
+                value = int(value.replace(tzinfo=timezone.utc).timestamp())
+            setattr(self, attr, value)
+
+    def dumps(self) -> bytes:
+        """Serialize the token
+
+        :return: The token as a MessagePack record
+        """
+        return token_encoder.encode(TokenRecord(
+            self.user_id, self.access_token, self.access_expiration,
+            self.refresh_token, self.refresh_expiration))
+
+    @staticmethod
+    def loads(data: bytes) -> 'Token':
+        """Deserialize a token
+
+        :param data: The serialized token
+
+        :return: The token
+        """
+        record = token_decoder.decode(data)
+        token = Token.__new__(Token)
+        token.user_id = record.user_id
+        token.access_token = record.access_token
+        token.access_expiration = record.access_expiration
+        token.refresh_token = record.refresh_token
+        token.refresh_expiration = record.refresh_expiration
+        return token
+
+    @staticmethod
+    def key(access_token: str) -> str:
+        """Return the Redis key of a token
+
+        :param access_token: The access token
+
+        :return: The Redis key
+        """
+        return f'token:{access_token}'
+
+    @staticmethod
+    def user_key(user_id: int) -> str:
+        """Return the Redis key of the index of a user's tokens
+
+        :param user_id: The user ID
+
+        :return: The Redis key
+        """
+        return f'user_tokens:{user_id}'
+
     @property
     def access_token_jwt(self) -> str:
         """Return the access token as a JWT
@@ -33,22 +113,38 @@ class Token:
             {'token': self.access_token}, config.SECRET_KEY, algorithm='HS256')
 
     def save(self) -> None:
-        """Save the token to Redis and register it."""
-        token_data = pickle.dumps(self)
-        cache.set(f'token:{self.access_token}', token_data,
-                  timeout=config.REFRESH_TOKEN_DAYS * 24 * 3600)
-        current_registry = cache.get('token_registry') or []
-        current_registry.append(f'token:{self.access_token}')
-        cache.set('token_registry', current_registry)
+        """Save the token to Redis and add it to its user's index."""
+        ttl = self.refresh_expiration - int(time.time())
+        user_key = self.user_key(self.user_id)
+        with token_redis.pipeline() as pipe:
+            pipe.set(self.key(self.access_token), self.dumps(),
+                     ex=max(ttl, 1))
+            pipe.sadd(user_key, self.access_token)
+            pipe.expire(user_key, config.REFRESH_TOKEN_DAYS * 24 * 3600)
+            pipe.execute()
 
     def expire(self, delay: int=5) -> None:
         """Expire the token
 
         :param delay: The delay in seconds
         """
-        self.access_expiration = datetime.utcnow() + timedelta(seconds=delay)
-        self.refresh_expiration = datetime.utcnow() + timedelta(seconds=delay)
+        self.access_expiration = int(time.time()) + delay
+        self.refresh_expiration = self.access_expiration
         self.save()
+        principals.invalidate_token(self.access_token)
+
+    @staticmethod
+    def decode_jwt(access_token_jwt: str) -> str:
+        """Return the access token of a JWT
+
+        :param access_token_jwt: The access token as a JWT
+
+        :return: The access token
+
+        :raises jwt.DecodeError: If the JWT is invalid
+        """
+        decoded = jwt.decode(access_token_jwt, config.SECRET_KEY, algorithms=['HS256'])
+        return decoded.get('token')
 
     @staticmethod
     def from_jwt(access_token_jwt: str) -> 'Token':
@@ -60,29 +156,90 @@ class Token:
 
         :raises ValueError: If the token is invalid or expired
         """
-        decoded = jwt.decode(access_token_jwt, config.SECRET_KEY, algorithms=['HS256'])
-        access_token = decoded.get('token')
+        return Token.from_access_token(Token.decode_jwt(access_token_jwt))
 
-        serialized_token = cache.get(f"token:{access_token}")
+    @staticmethod
+    def from_access_token(access_token: str) -> 'Token':
+        """Return a token from its access token
 
-        if not serialized_token:
+        :param access_token: The access token
+
+        :return: The token
+
+        :raises ValueError: If the token is invalid or expired
+        """
+        serialized_token = token_redis.get(Token.key(access_token))
+        if serialized_token:
+            return Token.loads(serialized_token)
+
+        token = Token.from_legacy_cache(access_token)
+        if token is None:
             raise ValueError("Invalid or expired token")
+        return token
 
+    @staticmethod
+    def from_legacy_cache(access_token: str) -> 'Token|None':
+        """Move a token saved by an earlier release to its record.
+
+        Earlier releases pickled tokens into the app cache under
+        ``token:<access token>``, so they are read back through the cache,
+        saved as records and removed from it. Tokens past their refresh
+        expiration are only removed.
+
+        :param access_token: The access token
+
+        :return: The token, or None if there is no valid legacy token
+        """
+        key = f'token:{access_token}'
+        serialized_token = cache.get(key)
+        if not serialized_token:
+            return None
+        cache.delete(key)
         token = pickle.loads(serialized_token)
+        if token.refresh_expiration <= int(time.time()):
+            return None
+        token.save()
         return token
-    
+
     @staticmethod
-    def clean() -> None:
-        """Remove all expired tokens from the cache."""
-        token_registry = cache.get('token_registry') or []
-        for token_key in token_registry:
-            serialized_token = cache.get(token_key)
-            if serialized_token:
-                token = pickle.loads(serialized_token)
-                if token.access_expiration < datetime.utcnow() or token.refresh_expiration < datetime.utcnow():
-                    cache.delete(token_key)
-                    token_registry.remove(token_key)
-        cache.set('token_registry', token_registry)
+    def sweep(cursor: int=0, count: int=500) -> tuple[int, int]:
+        """Remove expired tokens from a batch of user indexes.
+
+        The tokens themselves are removed by Redis when their TTL runs out, so
+        only their stale index entries need to be removed.
+
+        :param cursor: The SCAN cursor returned by the previous batch, or 0 to
+            start a new pass.
+        :param count: The number of keys to scan in this batch.
+
+        :return: The cursor of the next batch, 0 once the pass is complete,
+            and the number of index entries removed.
+        """
+        cursor, user_keys = token_redis.scan(
+            cursor, match=Token.user_key('*'), count=count)
+        if not user_keys:
+            return cursor, 0
+
+        with token_redis.pipeline(transaction=False) as pipe:
+            for user_key in user_keys:
+                pipe.smembers(user_key)
+            indexes = list(zip(user_keys, pipe.execute()))
+        with token_redis.pipeline(transaction=False) as pipe:
+            for _, access_tokens in indexes:
+                for access_token in access_tokens:
+                    pipe.exists(Token.key(access_token.decode()))
+            exists = iter(pipe.execute())
+
+        removed = 0
+        with token_redis.pipeline(transaction=False) as pipe:
+            for user_key, access_tokens in indexes:
+                expired = [access_token for access_token in access_tokens
+                           if not next(exists)]
+                if expired:
+                    pipe.srem(user_key, *expired)
+                    removed += len(expired)
+            pipe.execute()
+        return cursor, removed
 
     @staticmethod
     def revoke_all(user_id: int) -> None:
@@ -90,9 +247,13 @@ class Token:
 
         :param user_id: The user ID for which to revoke all tokens.
         """
-        for key in cache.scan_iter(match='token:*'):
-            serialized_token = cache.get(key)
-            if serialized_token:
-                token = pickle.loads(serialized_token)
-                if token.user_id == user_id:
-                    cache.delete(key)
+        user_key = Token.user_key(user_id)
+
+        def revoke(pipe) -> None:
+            access_tokens = pipe.smembers(user_key)
+            pipe.multi()
+            pipe.delete(user_key, *[Token.key(access_token.decode())
+                                    for access_token in access_tokens])
+
+        token_redis.transaction(revoke, user_key)
+        principals.invalidate_user(user_id)
@@ -0,0 +1,99 @@
+"""App boot time and S3 latency under concurrency, eager vs lazy clients.
+
+Boot time is the median time to import and create the app in a fresh
+process. The eager case creates the S3 and Rekognition clients right after,
+as init_app used to. Latencies are measured against a local moto S3 server,
+with ``threads`` threads each sending ``requests`` GetObject calls and
+presigning as many URLs, first with botocore's default client config and
+then with the tuned one. Run from the repository root with::
+
+    python -m benchmarks.aws_clients [threads] [requests] [port]
+"""
+import logging
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from flask import Flask
+from moto.server import ThreadedMotoServer
+
+from utils.aws_wrapper import AWSWrapper
+
+BOOT = '''
+import time
+start = time.perf_counter()
+from api import create_app, aws_wrapper
+create_app()
+if {eager}:
+    aws_wrapper.s3_client, aws_wrapper.rekognition_client
+print(time.perf_counter() - start)
+'''
+
+
+def boot_time(eager: bool, runs: int = 5) -> float:
+    """Return the median boot time of the app in a fresh process."""
+    times = [float(subprocess.run(
+        [sys.executable, '-c', BOOT.format(eager=eager)], check=True,
+        capture_output=True, text=True).stdout) for _ in range(runs)]
+    return statistics.median(times)
+
+
+def latencies(threads: int, requests: int, fn) -> tuple[float, float]:
+    """Return the p50 and p99 latencies of ``fn`` called concurrently."""
+    def worker(_) -> list[float]:
+        times = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return times
+
+    with ThreadPoolExecutor(threads) as executor:
+        times = sorted(t for result in executor.map(worker, range(threads))
+                       for t in result)
+    return (times[len(times) // 2] * 1000,
+            times[int(len(times) * 0.99)] * 1000)
+
+
+def main(threads: int = 32, requests: int = 50, port: int = 5055) -> None:
+    print(f'{"boot, eager clients":<34}{boot_time(True) * 1000:>8.0f} ms')
+    print(f'{"boot, lazy clients":<34}{boot_time(False) * 1000:>8.0f} ms')
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer('127.0.0.1', port, verbose=False)
+    server.start()
+    endpoint_url = f'http://127.0.0.1:{port}'
+    app = Flask(__name__)
+    app.config.update(AWS_BUCKET='arctic-fox', AWS_REGION='us-east-1',
+                      AWS_ACCESS_KEY_ID='testing',
+                      AWS_SECRET_ACCESS_KEY='testing',
+                      AWS_ENDPOINT_URL=endpoint_url,
+                      AWS_MAX_POOL_CONNECTIONS=threads)
+    s3 = boto3.client('s3', region_name='us-east-1', endpoint_url=endpoint_url,
+                      aws_access_key_id='testing',
+                      aws_secret_access_key='testing')
+    s3.create_bucket(Bucket='arctic-fox')
+    s3.put_object(Bucket='arctic-fox', Key='object', Body=b'x' * 1024)
+
+    for label, config in (('default config', Config()), ('tuned config', None)):
+        aws = AWSWrapper()
+        aws.init_app(app)
+        if config is not None:
+            aws.client_config = config
+        p50, p99 = latencies(threads, requests, lambda: aws.get_s3_object(
+            'object')['Body'].read())
+        print(f'{"GetObject, " + label:<34}p50 {p50:>7.2f} ms  '
+              f'p99 {p99:>7.2f} ms')
+        p50, p99 = latencies(threads, requests,
+                             lambda: aws.generate_presigned_url('object'))
+        print(f'{"presign, " + label:<34}p50 {p50:>7.2f} ms  '
+              f'p99 {p99:>7.2f} ms')
+    server.stop()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
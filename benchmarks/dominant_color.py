@@ -0,0 +1,102 @@
+"""Dominant color of large images, ColorThief vs the reduced-size engine.
+
+Generates a corpus of photo-like JPEGs and PNGs, then measures the time and
+peak RSS each engine needs per image, and how far apart the two colors are.
+Each measurement runs in a fresh process and reads the peak RSS from
+``/proc``, so it needs Linux.
+Run from the repository root with::
+
+    python -m benchmarks.dominant_color [megapixels ...]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+
+def make_image(path: str, megapixels: float, seed: int) -> None:
+    """Save a photo-like image: blurred color patches with sensor noise."""
+    rng = np.random.default_rng(seed)
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    patches = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    image = Image.fromarray(patches).resize((width, height), Image.BICUBIC)
+    pixels = np.asarray(image, dtype=np.int16)
+    pixels += rng.integers(-12, 13, pixels.shape, dtype=np.int16)
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(
+        path, quality=90)
+
+
+def memory(field: str) -> int:
+    """Return a memory field of ``/proc/self/status``, in kB."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(f'{field}:'):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def measure(engine: str, path: str) -> tuple[float, float, str]:
+    """Return the time, RSS growth in MB and color of one engine run."""
+    if engine == 'colorthief':
+        from colorthief import ColorThief
+
+        def run() -> str:
+            with open(path, 'rb') as f:
+                return '#{:02x}{:02x}{:02x}'.format(
+                    *ColorThief(f).get_color(quality=1))
+    else:
+        from utils.dominant_color import get_dominant_color
+
+        def run() -> str:
+            with open(path, 'rb') as f:
+                return get_dominant_color(f)
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')  # Reset the peak RSS to the current RSS.
+    baseline = memory('VmRSS')
+    start = time.perf_counter()
+    color = run()
+    elapsed = time.perf_counter() - start
+    peak = memory('VmHWM')
+    return elapsed, (peak - baseline) / 1024, color
+
+
+def isolated(engine: str, path: str) -> tuple[float, float, str]:
+    """Run :func:`measure` in a fresh process."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(1, mp_context=context) as executor:
+        return executor.submit(measure, engine, path).result()
+
+
+def distance(first: str, second: str) -> float:
+    """Return the RGB distance between two hex colors."""
+    a = np.array([int(first[i:i + 2], 16) for i in (1, 3, 5)])
+    b = np.array([int(second[i:i + 2], 16) for i in (1, 3, 5)])
+    return float(np.linalg.norm(a - b))
+
+
+def main(sizes: list[float]) -> None:
+    print(f'{"image":<16}{"engine":<12}{"time":>10}{"peak RSS":>12}'
+          f'{"color":>10}{"distance":>10}')
+    with tempfile.TemporaryDirectory() as directory:
+        for seed, megapixels in enumerate(sizes):
+            for extension in ('jpg', 'png'):
+                name = f'{megapixels:g}MP.{extension}'
+                path = os.path.join(directory, name)
+                make_image(path, megapixels, seed)
+                results = {engine: isolated(engine, path)
+                           for engine in ('colorthief', 'reduced')}
+                reference = results['colorthief'][2]
+                for engine, (elapsed, rss, color) in results.items():
+                    print(f'{name:<16}{engine:<12}{elapsed:>9.3f}s'
+                          f'{rss:>9.0f} MB{color:>10}'
+                          f'{distance(reference, color):>10.1f}')
+
+
+if __name__ == '__main__':
+    main([float(arg) for arg in sys.argv[1:]] or [1, 4, 12])
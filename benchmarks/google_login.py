@@ -0,0 +1,79 @@
+"""Google ID-token verifications per second, before and after cert caching.
+
+A local HTTP server stands in for Google's certificate endpoint and adds a
+fixed latency to each response. Tokens are minted locally with a throwaway
+RSA key, so no network access is needed. Run from the repository root with::
+
+    python -m benchmarks.google_login [logins] [latency ms]
+"""
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import rsa
+from google.auth import crypt, jwt
+from google.auth.transport import requests
+from google.oauth2 import id_token
+
+from utils.google_certs import GoogleCertCache, GoogleTokenVerifier
+
+AUDIENCE = 'arctic-fox'
+
+
+def serve_certs(certs: dict, latency: float) -> ThreadingHTTPServer:
+    """Serve the certificates like Google's endpoint, with added latency."""
+    body = json.dumps(certs).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Cache-Control', 'public, max-age=300')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def rate(label: str, logins: int, verify) -> None:
+    """Print the number of verifications per second of ``verify``."""
+    start = time.perf_counter()
+    for _ in range(logins):
+        verify()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<36}{logins / elapsed:>10.1f} logins/s')
+
+
+def main(logins: int = 200, latency_ms: int = 20) -> None:
+    public_key, private_key = rsa.newkeys(2048)
+    server = serve_certs({'local': public_key.save_pkcs1().decode()},
+                         latency_ms / 1000)
+    url = f'http://127.0.0.1:{server.server_port}/certs'
+    signer = crypt.RSASigner.from_string(
+        private_key.save_pkcs1().decode(), key_id='local')
+    now = int(time.time())
+    credential = jwt.encode(signer, {
+        'iss': 'https://accounts.google.com', 'aud': AUDIENCE,
+        'iat': now, 'exp': now + 3600, 'email': 'user@example.com'})
+
+    rate('fetch certs on every login', logins, lambda: id_token.verify_token(
+        credential, requests.Request(), AUDIENCE, certs_url=url))
+
+    verifier = GoogleTokenVerifier()
+    verifier.provider = GoogleCertCache(url)
+    rate('cached certs, pooled session', logins,
+         lambda: verifier.verify(credential, AUDIENCE))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
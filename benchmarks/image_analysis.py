@@ -0,0 +1,64 @@
+"""Dominant color throughput of the worker, by number of CPU slots.
+
+Each file goes through the steps of the ``set_dominant_color`` task in one of
+``IO_SLOTS`` threads: a simulated S3 download, the color extraction, and a
+simulated database write. The extraction runs either in the thread itself,
+as it did inside the Celery task, or in the process pool of
+``ImageAnalysisExecutor`` with 1 to ``os.cpu_count()`` CPU slots.
+Run from the repository root with::
+
+    python -m benchmarks.image_analysis [files] [io slots] [latency ms]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.dominant_color import make_image
+from utils.image_analysis import ImageAnalysisExecutor, analyze_image
+
+
+def throughput(label: str, paths: list[str], io_slots: int, latency: float,
+               analyze) -> None:
+    """Print the files processed per minute with ``analyze``."""
+    def process(path: str) -> str:
+        time.sleep(latency)  # S3 download
+        color = analyze(path)
+        time.sleep(latency)  # Database write
+        return color
+
+    with ThreadPoolExecutor(io_slots) as threads:
+        start = time.perf_counter()
+        list(threads.map(process, paths))
+        elapsed = time.perf_counter() - start
+    print(f'{label:<24}{len(paths) / elapsed * 60:>10.0f} files/min')
+
+
+def main(files: int = 64, io_slots: int = 8, latency_ms: int = 50) -> None:
+    latency = latency_ms / 1000
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = []
+        for seed in range(8):
+            path = os.path.join(directory, f'{seed}.jpg')
+            make_image(path, 12, seed)
+            corpus.append(path)
+        paths = [corpus[i % len(corpus)] for i in range(files)]
+
+        throughput('in I/O threads', paths, io_slots, latency,
+                   lambda path: analyze_image(path, 256, 100_000_000))
+        cpu_slots = 1
+        while True:
+            executor = ImageAnalysisExecutor()
+            executor.cpu_slots = cpu_slots
+            executor.dominant_color(corpus[0])  # Start the processes.
+            throughput(f'{cpu_slots} CPU slots', paths, io_slots, latency,
+                       executor.dominant_color)
+            executor.shutdown()
+            if cpu_slots >= (os.cpu_count() or 1):
+                break
+            cpu_slots = min(cpu_slots * 2, os.cpu_count())
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
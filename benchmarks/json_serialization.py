@@ -0,0 +1,75 @@
+"""Rows per second of a page of files dumped to a JSON response.
+
+Compares the marshmallow dump encoded by the stdlib JSON provider with the
+msgspec structs of ``FAST_JSON``, on the same page, and checks that both
+send the same bytes. The files are built in memory and their preview URLs
+are signed by the local storage backend and all kept in memory, so that
+no database, Redis or AWS connection is needed. Run from the repository
+root with::
+
+    python -m benchmarks.json_serialization [rows] [iterations]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from api import create_app
+from api.routes.schemas import FileSchema, PaginatedCollection
+from config import Config
+from database.models import File, Folder, User
+
+
+def make_page(rows: int) -> dict:
+    """Return a page of files with their owners and folders."""
+    now = datetime(2026, 1, 1)
+    users = [User(id=i, username=f'user{i}', avatar_url=None)
+             for i in range(1, 11)]
+    folders = [Folder(id=i, name=f'folder {i}') for i in range(1, 101)]
+    files = [File(id=i, filename=f'{i:06}.jpg', mimetype='image/jpeg',
+                  description='A description of the file' if i % 3 else None,
+                  processed=i % 2 == 0, dominant_color='#a0b0c0',
+                  created_by=users[i % 10].id, folder_id=folders[i % 100].id,
+                  created_at=now + timedelta(seconds=i),
+                  owner=users[i % 10], folder=folders[i % 100])
+             for i in range(1, rows + 1)]
+    return {'data': files, 'pagination': {'limit': rows, 'count': rows,
+                                          'next': 'NjAwMA=='}}
+
+
+def timed(iterations: int, fn) -> tuple[float, bytes]:
+    """Return the best time of ``fn`` in seconds, and its last body."""
+    best = float('inf')
+    for _ in range(iterations):
+        start = time.perf_counter()
+        body = fn().get_data()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main(rows: int = 10000, iterations: int = 5) -> None:
+    app = create_app(Config(ALCHEMICAL_DATABASE_URL='sqlite:///:memory:',
+                            STORAGE_BACKEND='local',
+                            LOCAL_STORAGE_ROOT=tempfile.mkdtemp(),
+                            PREVIEW_URL_CACHE_SIZE=2 * rows))
+    schema = PaginatedCollection(FileSchema())()
+    page = make_page(rows)
+    with app.test_request_context():
+        schema.jsonify(page)  # sign the preview URLs once for both paths
+
+        results = {}
+        for label, fast in (('marshmallow + json', False),
+                            ('msgspec structs', True)):
+            app.config['FAST_JSON'] = fast
+            results[label] = timed(iterations, lambda: schema.jsonify(page))
+
+    bodies = {body for _, body in results.values()}
+    assert len(bodies) == 1, 'The bodies differ'
+    print(f'{"path":<24}{"rows/s":>12}{"ms/page":>10}  ({rows} rows, '
+          f'{len(bodies.pop()) / 1024:.0f} KB)')
+    for label, (elapsed, _) in results.items():
+        print(f'{label:<24}{rows / elapsed:>12.0f}{elapsed * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
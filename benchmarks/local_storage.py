@@ -0,0 +1,87 @@
+"""End-to-end throughput of the upload, process and serve pipeline on disk.
+
+Runs the app with the local storage backend, without network or AWS:
+images are uploaded with presigned POSTs, their dominant color is computed
+from the memory-mapped file (and, for comparison, from a copy downloaded
+to a temporary file as for remote backends), and they are served whole and
+by byte range from presigned URLs. Run from the repository root with::
+
+    python -m benchmarks.local_storage [images] [side]
+"""
+import io
+import shutil
+import sys
+import tempfile
+import time
+from tempfile import NamedTemporaryFile
+from urllib.parse import urlsplit
+
+import numpy as np
+from PIL import Image
+
+from api import create_app, storage
+from config import Config
+from utils.image_analysis import analyze_image
+
+
+def timed(label: str, count: int, size: int, fn) -> None:
+    """Run ``fn`` and print the rate of items and bytes it processed."""
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<32}{count / elapsed:>8.1f} files/s'
+          f'{size / elapsed / 1024 / 1024:>10.1f} MB/s')
+
+
+def main(images: int = 100, side: int = 1024) -> None:
+    root = tempfile.mkdtemp()
+    app = create_app(Config(ALCHEMICAL_DATABASE_URL='sqlite:///:memory:',
+                            STORAGE_BACKEND='local', LOCAL_STORAGE_ROOT=root))
+    client = app.test_client()
+    rng = np.random.default_rng(0)
+    files = {}
+    for i in range(images):
+        image = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (side, side, 3), np.uint8)
+                        ).save(image, 'JPEG', quality=90)
+        files[f'uploads/{i:04}.jpg'] = image.getvalue()
+    size = sum(len(data) for data in files.values())
+
+    def upload() -> None:
+        for key, data in files.items():
+            post = storage.generate_presigned_post(key)
+            rv = client.post(urlsplit(post['url']).path, data={
+                **post['fields'], 'file': (io.BytesIO(data), key)})
+            assert rv.status_code == 204
+
+    def analyze_mapped() -> None:
+        for key in files:
+            analyze_image(storage.local_path(key), 256, 100_000_000)
+
+    def analyze_copied() -> None:
+        for key in files:
+            with NamedTemporaryFile() as image_file:
+                storage.download(key, image_file)
+                image_file.flush()
+                analyze_image(image_file.name, 256, 100_000_000)
+
+    urls = storage.generate_presigned_urls(files)
+
+    def serve(headers: dict) -> None:
+        for url in urls.values():
+            url = urlsplit(url)
+            rv = client.get(url.path, query_string=url.query, headers=headers)
+            assert rv.status_code in (200, 206) and rv.get_data()
+
+    with app.app_context():
+        timed('upload (presigned POST)', images, size, upload)
+        timed('dominant color, mmap', images, size, analyze_mapped)
+        timed('dominant color, copied', images, size, analyze_copied)
+        timed('serve whole file', images, size, lambda: serve({}))
+        timed('serve 64 KiB range', images, images * 65536,
+              lambda: serve({'Range': 'bytes=0-65535'}))
+    shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
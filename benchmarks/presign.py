@@ -0,0 +1,52 @@
+"""Per-row cost of signing preview URLs for a page of files.
+
+Compares one botocore presign call per row with the batch signer, which
+derives the SigV4 signing key once per page, and with warm LRU lookups.
+No network access is needed. Run from the repository root with::
+
+    python -m benchmarks.presign [rows] [rounds]
+"""
+import sys
+import time
+
+import redis
+from flask import Flask
+
+from utils.aws_wrapper import AWSWrapper
+from utils.preview_url_cache import PreviewURLCache
+
+
+def per_row(label: str, rows: int, rounds: int, fn) -> None:
+    """Run ``fn`` ``rounds`` times and print the best per-row time."""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f'{label:<28}{best / rows * 1e6:>10.1f} us/row')
+
+
+def main(rows: int = 1000, rounds: int = 5) -> None:
+    app = Flask(__name__)
+    app.config.update(AWS_BUCKET='arctic-fox', AWS_REGION='us-east-1',
+                      AWS_ACCESS_KEY_ID='AKIDEXAMPLE',
+                      AWS_SECRET_ACCESS_KEY='secret',
+                      PREVIEW_URL_WINDOW=3600, PREVIEW_URL_CACHE_SIZE=rows)
+    aws = AWSWrapper()
+    aws.init_app(app)
+    keys = [f'uploads/file-{i}.jpg' for i in range(rows)]
+
+    per_row('botocore, one call per row', rows, rounds,
+            lambda: [aws.generate_presigned_url(key) for key in keys])
+    per_row('batch signer', rows, rounds,
+            lambda: aws.generate_presigned_urls(keys))
+
+    # an unreachable Redis leaves the in-process LRU as the only cache level
+    cache = PreviewURLCache(aws, redis.Redis(port=1, socket_timeout=0.1))
+    cache.init_app(app)
+    cache.get_many(keys)
+    per_row('cached, LRU hit', rows, rounds, lambda: cache.get_many(keys))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
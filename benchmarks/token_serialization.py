@@ -0,0 +1,69 @@
+"""Encode/decode time and size of a token for both storage formats.
+
+Compares the pickled ``Token`` objects stored by earlier releases with the
+MessagePack records stored now. No Redis connection is needed. Run from the
+repository root with::
+
+    python -m benchmarks.token_serialization [iterations]
+"""
+import pickle
+import secrets
+import sys
+import time
+from datetime import datetime, timedelta
+
+import api.token
+from api.token import Token
+
+
+class PickledToken:
+    """A token laid out like the ones pickled by earlier releases."""
+
+    def __init__(self) -> None:
+        self.user_id = 42
+        self.access_token = secrets.token_urlsafe()
+        self.access_expiration = datetime.utcnow() + timedelta(minutes=15)
+        self.refresh_token = secrets.token_urlsafe()
+        self.refresh_expiration = datetime.utcnow() + timedelta(days=30)
+
+
+PickledToken.__module__, PickledToken.__qualname__ = 'api.token', 'Token'
+
+
+def dumps_legacy(token: PickledToken) -> bytes:
+    """Pickle a token exactly as earlier releases stored it in Redis."""
+    api.token.Token = PickledToken
+    try:
+        return pickle.dumps(token)
+    finally:
+        api.token.Token = Token
+
+
+def timed(iterations: int, fn) -> float:
+    """Return the best time per call of ``fn`` in microseconds."""
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+def main(iterations: int = 20000) -> None:
+    legacy = PickledToken()
+    pickled = dumps_legacy(legacy)
+    token = pickle.loads(pickled)
+    record = token.dumps()
+
+    print(f'{"format":<10}{"bytes":>8}{"encode us":>12}{"decode us":>12}')
+    print(f'{"pickle":<10}{len(pickled):>8}'
+          f'{timed(iterations, lambda: dumps_legacy(legacy)):>12.2f}'
+          f'{timed(iterations, lambda: pickle.loads(pickled)):>12.2f}')
+    print(f'{"msgpack":<10}{len(record):>8}'
+          f'{timed(iterations, token.dumps):>12.2f}'
+          f'{timed(iterations, lambda: Token.loads(record)):>12.2f}')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -1,20 +1,40 @@
+import re
+from datetime import datetime, timedelta, timezone
+
 import click
 import psycopg2
+import sqlalchemy as sa
 from flask import Blueprint
-from sqlalchemy import inspect
+from flask_migrate import stamp
+from itertools import islice
+from sqlalchemy import inspect, select
 
-from api import db
+from api import db, storage
+from api.decorators import (eager_load_options, encode_cursor,
+                            keyset_paginate, validator_query)
+from api.routes.files import (files_query, file_schema, IMAGE_MIMETYPES,
+                              VIDEO_MIMETYPES)
+from api.routes.folders import folders_query, folder_schema
+from api.routes.users import users_query, user_schema
 from config import config
-from database.models import User
+from database import outbox
+from database.models import User, File
 from database.enums import Role
 
+from typing import Iterable, Iterator
+
 bp = Blueprint('database', __name__)
 
 
 @bp.cli.command()
 def init():
-    """Initialize the database."""
+    """Initialize the database.
+
+    The tables are created from the models and marked as up to date with the
+    latest migration, so that later migrations apply to them.
+    """
     db.create_all()
+    stamp()
 
     # Create the admin user
     admin = User(email=config.ADMIN_EMAIL, role=Role.ADMIN)
@@ -66,3 +86,185 @@ def view():
     tables = inspector.get_table_names()
     for table in tables:
         print(table)
+
+
+def orphaned_keys(s3_keys: Iterable[str]) -> Iterator[str]:
+    """Filter out the S3 keys that belong to a file record.
+
+    The keys are checked against the database 1000 at a time.
+
+    :param s3_keys: The S3 keys to check.
+
+    :return: An iterator over the keys without a file record.
+    """
+    s3_keys = iter(s3_keys)
+    while batch := list(islice(s3_keys, 1000)):
+        known = set(db.session.scalars(
+            select(File.filename).where(File.filename.in_(batch))))
+        yield from (s3_key for s3_key in batch if s3_key not in known)
+
+
+@bp.cli.command()
+@click.option('--min-age', type=int, default=config.RECONCILE_MIN_AGE,
+              show_default=True,
+              help='Skip the files stored less than this many seconds ago.')
+@click.option('--yes', is_flag=True,
+              help='Delete the orphaned files instead of listing them.')
+def reconcile(min_age: int, yes: bool = False):
+    """List or delete the stored files that don't belong to any file record.
+
+    Files are uploaded before their record is created, so the ones stored
+    less than ``min_age`` seconds ago are skipped, as their record may not
+    exist yet. The orphaned keys are only listed unless ``--yes`` is given.
+
+    :param min_age: The minimum age of the files in seconds.
+    :param yes: Delete the orphaned files.
+    """
+    keys = orphaned_keys(storage.iter_keys(modified_before=datetime.now(
+        timezone.utc) - timedelta(seconds=min_age)))
+    if not yes:
+        for s3_key in keys:
+            print(s3_key)
+        print('Run again with --yes to delete these files.')
+        return
+
+    errors = storage.delete_many(keys)
+    for s3_key, error in errors.items():
+        print(f'Could not delete {s3_key}: {error}')
+    print(f'Orphaned objects deleted with {len(errors)} errors.')
+
+
+def backlog_query(after_id: int = 0, limit: int = 1000) -> sa.Select:
+    """Return the query for the files the worker hasn't processed yet.
+
+    It is answered from the partial ``ix_files_unprocessed`` index, which
+    only holds the unprocessed files.
+
+    :param after_id: Only select the files with a larger ID.
+    :param limit: The maximum number of files to select.
+
+    :return: The select query for the file IDs, in order.
+    """
+    return select(File.id).where(~File.processed, File.id > after_id) \
+        .order_by(File.id).limit(limit)
+
+
+@bp.cli.command()
+@click.option('--batch-size', default=1000, help='Files sent per task.')
+def requeue(batch_size: int = 1000):
+    """Send the files the worker hasn't processed to it again.
+
+    :param batch_size: The number of files sent per task.
+    """
+    count, last_id = 0, 0
+    while ids := db.session.scalars(backlog_query(last_id, batch_size)).all():
+        outbox.enqueue_batch(db.session,
+                             'worker.tasks.file_tasks.set_dominant_colors',
+                             *ids)
+        db.session.commit()
+        count, last_id = count + len(ids), ids[-1]
+    print(f'{count} files requeued.')
+
+
+def route_queries() -> dict[str, sa.Select]:
+    """Return the queries of the listing routes and the worker backlog.
+
+    The queries are built like the routes build them, with sample filters,
+    eager loading and the first page of keyset pagination, along with the
+    ETag validator queries of the pages.
+
+    :return: The select queries keyed by description.
+    """
+    def page(query: sa.Select, schema, cursor: str|None = None) -> sa.Select:
+        return keyset_paginate(query.options(*eager_load_options(schema)),
+                               25, cursor=cursor)
+
+    def validators(query: sa.Select, schema) -> sa.Select:
+        return keyset_paginate(validator_query(query, schema), 25)
+
+    cursor = encode_cursor(datetime.now(), 1)
+    return {
+        'GET /files': page(files_query({}), file_schema),
+        'GET /files, next page': page(files_query({}), file_schema, cursor),
+        'GET /files?folder_id': page(files_query({'folder_id': 1}),
+                                     file_schema),
+        'GET /files?created_by': page(files_query({'created_by': 1}),
+                                      file_schema),
+        'GET /files?mimetype': page(files_query({'mimetype': 'image/png'}),
+                                    file_schema),
+        'GET /images': page(files_query({}).where(
+            File.mimetype.in_(IMAGE_MIMETYPES)), file_schema),
+        'GET /videos': page(files_query({}).where(
+            File.mimetype.in_(VIDEO_MIMETYPES)), file_schema),
+        'POST /files/batch, filename check': select(
+            File.filename, File.id).where(File.filename.in_(['a', 'b'])),
+        'GET /folders': page(folders_query({}), folder_schema),
+        'GET /folders?created_by': page(folders_query({'created_by': 1}),
+                                        folder_schema),
+        'GET /users': page(users_query({}), user_schema),
+        'GET /users?role': page(users_query({'role': Role.ADMIN}),
+                                user_schema),
+        'GET /files, validators': validators(files_query({}), file_schema),
+        'GET /files?folder_id, validators': validators(
+            files_query({'folder_id': 1}), file_schema),
+        'GET /folders, validators': validators(folders_query({}),
+                                               folder_schema),
+        'GET /files/<id>, validators': validator_query(
+            File.select().where(File.id == 1), file_schema),
+        'Worker backlog': backlog_query(),
+    }
+
+
+def explain_query(query: sa.Select, analyze: bool = False) -> list[str]:
+    """Return the plan the database chooses for a query.
+
+    :param query: The select query.
+    :param analyze: Run the query and report actual times, on PostgreSQL.
+
+    :return: The lines of the plan.
+    """
+    connection = db.session.connection()
+    sql = query.compile(dialect=connection.dialect,
+                        compile_kwargs={'literal_binds': True})
+    if connection.dialect.name == 'sqlite':
+        return [row[-1] for row in connection.exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {sql}')]
+    prefix = 'EXPLAIN ANALYZE' if analyze else 'EXPLAIN'
+    return [row[0] for row in connection.exec_driver_sql(f'{prefix} {sql}')]
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    """Return the tables a query plan reads in full.
+
+    :param plan: The lines of a plan returned by :func:`explain_query`.
+
+    :return: The names of the tables scanned without an index.
+    """
+    return [match.group(1) for line in plan for match in [
+        re.search(r'Seq Scan on (\w+)', line) or
+        re.fullmatch(r'\s*SCAN (\w+)', line)] if match]
+
+
+@bp.cli.command()
+@click.option('--analyze', is_flag=True,
+              help='Run the queries and report actual times (PostgreSQL).')
+@click.option('--force-index', is_flag=True,
+              help='Disable sequential scans (PostgreSQL), so that small '
+                   'tables show the index a query would use.')
+def explain(analyze: bool = False, force_index: bool = False):
+    """Print the plans of the route queries and flag full table scans.
+
+    :param analyze: Run the queries and report actual times.
+    :param force_index: Disable sequential scans while planning.
+    """
+    if force_index and db.session.connection().dialect.name == 'postgresql':
+        db.session.execute(sa.text('SET LOCAL enable_seqscan = off'))
+    unindexed = 0
+    for name, query in route_queries().items():
+        plan = explain_query(query, analyze)
+        print(f'{name}\n' + '\n'.join(f'    {line}' for line in plan))
+        for table in full_scans(plan):
+            print(f'    ! full scan of {table}')
+        unindexed += bool(full_scans(plan))
+    db.session.rollback()
+    print(f'{unindexed} queries scan a whole table.')
@@ -1,5 +1,12 @@
+import csv
+import io
+import os
 import random
+import time
 import click
+import sqlalchemy as sa
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from flask import Blueprint
 from faker import Faker
 from sqlalchemy.exc import IntegrityError
@@ -9,9 +16,22 @@ from api import db
 from database.models import User, Folder, File
 from database.enums import Role
 
+from typing import Any, Callable, Iterator
+
 fake = Blueprint('fake', __name__)
 faker = Faker()
 
+MIMETYPE_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'video/mp4': 'mp4',
+}
+
+# The users and folders that bulk generated files belong to, set once in
+# each generator process.
+owners = {'users': [], 'folders': []}
+
 
 def random_datetime_this_year() -> datetime:
     """Generate a random datetime within the current year.
@@ -27,10 +47,202 @@ def random_datetime_this_year() -> datetime:
     return random_datetime
 
 
+def set_owners(user_ids: list[int], folder_ids: list[int]) -> None:
+    """Set the users and folders of the generated files.
+
+    :param user_ids: The IDs of the users.
+    :param folder_ids: The IDs of the folders.
+    """
+    owners['users'] = user_ids
+    owners['folders'] = folder_ids
+
+
+def fake_user_rows(start: int, count: int, seed: int) -> list[dict[str, Any]]:
+    """Generate the rows of fake users.
+
+    Emails and usernames are made unique with the number of the row.
+
+    :param start: The number of the first row.
+    :param count: The number of rows.
+    :param seed: The seed of the random generators.
+
+    :return: The column values of each row.
+    """
+    random.seed(seed)
+    faker.seed_instance(seed)
+    rows = []
+    for n in range(start, start + count):
+        created_at = random_datetime_this_year()
+        rows.append({
+            'email': f'{n}.{faker.email()}',
+            'username': f'{faker.user_name()}{n}',
+            'role': random.choice(list(Role)).name,
+            'activated': faker.boolean(),
+            'avatar_url': faker.image_url(),
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+    return rows
+
+
+def fake_file_rows(start: int, count: int, seed: int) -> list[dict[str, Any]]:
+    """Generate the rows of fake files, owned by random users and folders.
+
+    Filenames are made unique with the number of the row.
+
+    :param start: The number of the first row.
+    :param count: The number of rows.
+    :param seed: The seed of the random generators.
+
+    :return: The column values of each row.
+    """
+    random.seed(seed)
+    faker.seed_instance(seed)
+    rows = []
+    for n in range(start, start + count):
+        mimetype = random.choice(list(MIMETYPE_EXTENSIONS))
+        created_at = random_datetime_this_year()
+        rows.append({
+            'filename': f'{faker.word()}-{n}.{MIMETYPE_EXTENSIONS[mimetype]}',
+            'mimetype': mimetype,
+            'description': faker.paragraph(),
+            'processed': faker.boolean(),
+            'dominant_color': faker.color(),
+            'error': None if faker.boolean(chance_of_getting_true=75)
+            else faker.sentence(),
+            'created_by': random.choice(owners['users']),
+            'folder_id': random.choice(owners['folders']),
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+    return rows
+
+
+def generate_chunks(generate: Callable[..., list[dict[str, Any]]], num: int,
+                    start: int, chunk_size: int, workers: int,
+                    seed: int) -> Iterator[list[dict[str, Any]]]:
+    """Generate rows in chunks, in a pool of processes.
+
+    Faker is slower than the database at high volumes, so the chunks are
+    generated in parallel while the previous ones are inserted. At most two
+    chunks per process wait to be inserted.
+
+    :param generate: The function that generates a chunk of rows.
+    :param num: The number of rows.
+    :param start: The number of the first row.
+    :param chunk_size: The number of rows in each chunk.
+    :param workers: The number of processes, or 0 to generate the rows in
+        this process.
+    :param seed: The seed of the first chunk, incremented for the next ones.
+
+    :return: An iterator over the chunks, in order.
+    """
+    chunks = [(start + offset, min(chunk_size, num - offset), seed + i)
+              for i, offset in enumerate(range(0, num, chunk_size))]
+    initargs = (owners['users'], owners['folders'])
+    if not workers:
+        for args in chunks:
+            yield generate(*args)
+        return
+
+    executor = ProcessPoolExecutor(workers, initializer=set_owners,
+                                   initargs=initargs)
+    try:
+        pending = deque()
+        for args in chunks:
+            pending.append(executor.submit(generate, *args))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def insert_rows(connection: sa.Connection, table: sa.Table,
+                rows: list[dict[str, Any]]) -> None:
+    """Insert rows with Core, without the events of the ORM.
+
+    PostgreSQL with psycopg2 loads the rows with COPY from an in-memory CSV
+    buffer. Other databases get a multi-row INSERT.
+
+    :param connection: The connection of the transaction.
+    :param table: The table to insert into.
+    :param rows: The column values of each row.
+    """
+    if connection.dialect.driver != 'psycopg2':
+        connection.execute(table.insert(), rows)
+        return
+
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([row[column] for column in columns]
+                                 for row in rows)
+    buffer.seek(0)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {table.name} ({", ".join(columns)}) '
+                           f'FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def bulk_insert(table: sa.Table, chunks: Iterator[list[dict[str, Any]]],
+                num: int) -> int:
+    """Insert chunks of rows, one transaction each, and report the rate.
+
+    :param table: The table to insert into.
+    :param chunks: The chunks of rows.
+    :param num: The total number of rows, for the progress report.
+
+    :return: The number of rows inserted.
+    """
+    inserted = 0
+    start = reported = time.perf_counter()
+    for rows in chunks:
+        insert_rows(db.session.connection(), table, rows)
+        db.session.commit()
+        inserted += len(rows)
+        now = time.perf_counter()
+        if now - reported >= 1 or inserted == num:
+            print(f'{inserted}/{num} {table.name} inserted, '
+                  f'{inserted / (now - start):,.0f} rows/s')
+            reported = now
+    return inserted
+
+
+def next_row(model: type) -> int:
+    """Return a number above the IDs of a table, to make rows unique."""
+    return (db.session.scalar(sa.select(sa.func.max(model.id))) or 0) + 1
+
+
+bulk_options = [
+    click.option('--bulk', is_flag=True,
+                 help='Insert in chunks with COPY or multi-row INSERT, '
+                      'without ORM events.'),
+    click.option('--chunk-size', default=10000,
+                 help='Rows per chunk in bulk mode.'),
+    click.option('--workers', default=os.cpu_count() or 1,
+                 help='Processes generating the rows in bulk mode.'),
+    click.option('--seed', default=0, help='Random seed in bulk mode.'),
+]
+
+
+def with_bulk_options(command: Callable) -> Callable:
+    """Add the options of the bulk mode to a command."""
+    for option in reversed(bulk_options):
+        command = option(command)
+    return command
+
+
 @fake.cli.command('users')
 @click.argument('num', type=int)
-def users(num):
+@with_bulk_options
+def users(num, bulk=False, chunk_size=10000, workers=1, seed=0):
     """Create the given number of fake users."""
+    if bulk:
+        chunks = generate_chunks(fake_user_rows, num, next_row(User),
+                                 chunk_size, workers, seed)
+        print(f'Added {bulk_insert(User.__table__, chunks, num)} users.')
+        return
+
     for _ in range(num):
         email = faker.email()
         try:
@@ -80,27 +292,34 @@ def folders(num, user_id=None):
 
 @fake.cli.command('files')
 @click.argument('num', type=int)
-def files(num: int) -> None:
+@with_bulk_options
+def files(num: int, bulk: bool = False, chunk_size: int = 10000,
+          workers: int = 1, seed: int = 0) -> None:
     """Create the given number of fake files, assigned to random users."""
     users = db.session.scalars(User.select()).all()
     folders = db.session.scalars(Folder.select()).all()
     if not users:
         print('No users found. Add some users first.')
         return
+    if not folders:
+        print('No folders found. Add some folders first.')
+        return
+
+    if bulk:
+        set_owners([user.id for user in users],
+                   [folder.id for folder in folders])
+        chunks = generate_chunks(fake_file_rows, num, next_row(File),
+                                 chunk_size, workers, seed)
+        print(f'Added {bulk_insert(File.__table__, chunks, num)} files.')
+        return
 
     added_files = 0
     for _ in range(num):
         try:
             user = random.choice(users)
             folder = random.choice(folders)
-            mimetype_extension_mapping = {
-                'image/jpeg': '.jpg',
-                'image/png': '.png',
-                'image/gif': '.gif',
-                'video/mp4': '.mp4',
-            }
-            mimetype = random.choice(list(mimetype_extension_mapping.keys()))
-            filename = faker.file_name(extension=mimetype_extension_mapping[mimetype].strip('.'))
+            mimetype = random.choice(list(MIMETYPE_EXTENSIONS))
+            filename = faker.file_name(extension=MIMETYPE_EXTENSIONS[mimetype])
 
             random_date = random_datetime_this_year()
             
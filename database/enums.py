@@ -6,3 +6,9 @@ class Role(enum.Enum):
     MODERATOR: int = 2
     VIEWER: int = 3
 
+
+
+class EmailStatus(enum.Enum):
+    QUEUED: int = 1
+    SENT: int = 2
+    FAILED: int = 3
@@ -1,5 +1,6 @@
 from .user import User
 from .folder import Folder
 from .file import File
+from .email import Email
 
-__all__ = ['User', 'Folder', 'File']
+__all__ = ['User', 'Folder', 'File', 'Email']
@@ -0,0 +1,29 @@
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+from datetime import datetime
+
+from api import db
+from ..enums import EmailStatus
+from ..mixins import TimestampMixin
+
+from typing import Any, Optional
+
+
+class Email(TimestampMixin, db.Model):
+    __tablename__ = 'emails'
+
+    id: so.Mapped[int] = so.mapped_column(primary_key=True)
+    recipient: so.Mapped[str] = so.mapped_column(sa.String(120))
+    sender: so.Mapped[str] = so.mapped_column(sa.String(120))
+    subject: so.Mapped[str] = so.mapped_column(sa.String(120))
+    template: so.Mapped[str] = so.mapped_column(sa.String(64))
+    context: so.Mapped[dict[str, Any]] = so.mapped_column(sa.JSON)
+    status: so.Mapped[EmailStatus] = so.mapped_column(
+        sa.Enum(EmailStatus), default=EmailStatus.QUEUED)
+    attempts: so.Mapped[int] = so.mapped_column(default=0)
+    error: so.Mapped[Optional[str]] = so.mapped_column(sa.String(280))
+    sent_at: so.Mapped[Optional[datetime]] = so.mapped_column(sa.DateTime)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the email."""
+        return f'<Email {self.template} to {self.recipient}>'
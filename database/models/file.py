@@ -1,7 +1,8 @@
 import sqlalchemy as sa
 import sqlalchemy.orm as so
 
-from api import db, celery
+from api import db
+from .. import outbox
 from ..mixins import TimestampMixin, UpdateableMixin
 
 from typing import Optional
@@ -9,6 +10,21 @@ from typing import Optional
 
 class File(TimestampMixin, UpdateableMixin, db.Model):
     __tablename__ = 'files'
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), alone or after a filter.
+        # On PostgreSQL they also cover updated_at for the ETag validators.
+        sa.Index('ix_files_created_at_id', 'created_at', 'id',
+                 postgresql_include=['updated_at']),
+        sa.Index('ix_files_mimetype_created_at_id',
+                 'mimetype', 'created_at', 'id',
+                 postgresql_include=['updated_at']),
+        sa.Index('ix_files_folder_id_created_at_id',
+                 'folder_id', 'created_at', 'id',
+                 postgresql_include=['updated_at']),
+        sa.Index('ix_files_created_by_created_at_id',
+                 'created_by', 'created_at', 'id',
+                 postgresql_include=['updated_at']),
+    )
 
     id: so.Mapped[int] = so.mapped_column(primary_key=True)
     filename: so.Mapped[str] = so.mapped_column(sa.String(64), unique=True)
@@ -28,14 +44,23 @@ class File(TimestampMixin, UpdateableMixin, db.Model):
         return f'<File {self.filename}>'
 
 
+# Files the worker hasn't processed yet. The predicate is built from the
+# column, so that it is rendered like the backlog query for each dialect.
+sa.Index('ix_files_unprocessed', File.id,
+         postgresql_where=~File.processed, sqlite_where=~File.processed)
+
+
 @sa.event.listens_for(File, 'after_insert')
 def set_dominant_color(mapper, connection, target: File):
-    celery.send_task('worker.tasks.file_tasks.set_dominant_color',
-                     args=[target.id])
+    """Set the dominant color of the file once the record is committed."""
+    outbox.enqueue_batch(so.object_session(target),
+                         'worker.tasks.file_tasks.set_dominant_colors',
+                         target.id)
 
 
 @sa.event.listens_for(File, 'before_delete')
 def delete_s3_file(mapper, connection, target: File):
-    """Delete file from S3 before deleting the record."""
-    celery.send_task('worker.tasks.file_tasks.delete_s3_file',
-                     args=[target.filename])
+    """Delete file from S3 once the deletion of the record is committed."""
+    outbox.enqueue_batch(so.object_session(target),
+                         'worker.tasks.file_tasks.delete_s3_files',
+                         target.filename)
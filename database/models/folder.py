@@ -10,6 +10,13 @@ from typing import Optional
 
 class Folder(TimestampMixin, UpdateableMixin, db.Model):
     __tablename__ = 'folders'
+    __table_args__ = (
+        sa.Index('ix_folders_created_at_id', 'created_at', 'id',
+                 postgresql_include=['updated_at']),
+        sa.Index('ix_folders_created_by_created_at_id',
+                 'created_by', 'created_at', 'id',
+                 postgresql_include=['updated_at']),
+    )
 
     id: so.Mapped[int] = so.mapped_column(primary_key=True)
     name: so.Mapped[str] = so.mapped_column(sa.String(64), unique=True)
@@ -1,10 +1,10 @@
 import sqlalchemy as sa
 import sqlalchemy.orm as so
 from sqlalchemy.exc import IntegrityError
-from datetime import datetime
+import time
 
 from api import db
-from api.email import send_email
+import api.email
 from api.token import Token
 from ..enums import Role
 from ..mixins import TimestampMixin, UpdateableMixin
@@ -14,6 +14,12 @@ from typing import Optional
 
 class User(TimestampMixin, UpdateableMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        sa.Index('ix_users_created_at_id', 'created_at', 'id',
+                 postgresql_include=['updated_at']),
+        sa.Index('ix_users_role_created_at_id', 'role', 'created_at', 'id',
+                 postgresql_include=['updated_at']),
+    )
 
     id: so.Mapped[int] = so.mapped_column(primary_key=True)
     email: so.Mapped[str] = so.mapped_column(sa.String(120), unique=True)
@@ -49,8 +55,8 @@ class User(TimestampMixin, UpdateableMixin, db.Model):
         try:
             user = User(email=email, role=role)
             db.session.add(user)
+            api.email.send_email(email, 'Invitation to Arctic Fox', 'invite', user_email=email)
             db.session.commit()
-            send_email(email, 'Invitation to Arctic Fox', 'invite', user_email=email)
             return user
         except IntegrityError:
             db.session.rollback()
@@ -71,11 +77,8 @@ class User(TimestampMixin, UpdateableMixin, db.Model):
         :return: The user if the access token is valid, otherwise None.
         """
         token = Token.from_jwt(access_token_jwt)
-        if token and token.access_expiration > datetime.utcnow():
-            user = db.session.get(User, token.user_id)
-            if user:
-                db.session.commit()
-            return user
+        if token and token.access_expiration > time.time():
+            return db.session.get(User, token.user_id)
 
     @staticmethod
     def verify_refresh_token(refresh_token: str,
@@ -89,7 +92,7 @@ class User(TimestampMixin, UpdateableMixin, db.Model):
         """
         token = Token.from_jwt(access_token_jwt)
         if token and token.refresh_token == refresh_token:
-            if token.refresh_expiration > datetime.utcnow():
+            if token.refresh_expiration > time.time():
                 return token
 
             # Someone tried to refresh with an expired token
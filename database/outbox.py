@@ -0,0 +1,67 @@
+import logging
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+from api import celery
+
+OUTBOX_KEY = 'outbox'
+BATCHES_KEY = 'outbox_batches'
+
+
+def enqueue(session: so.Session, task_name: str, *args) -> None:
+    """Queue a task to be sent once the session's transaction is committed.
+
+    :param session: The session the task depends on.
+    :param task_name: The name of the Celery task.
+    :param args: The positional arguments of the task.
+    """
+    session.info.setdefault(OUTBOX_KEY, []).append((task_name, list(args)))
+
+
+def enqueue_batch(session: so.Session, task_name: str, *items) -> None:
+    """Queue items for a task that takes them as a list.
+
+    The items queued for the same task during a transaction are sent to it
+    in a single message, so that inserting many records doesn't send a
+    message per record.
+
+    :param session: The session the task depends on.
+    :param task_name: The name of the Celery task.
+    :param items: The items to add to the list argument of the task.
+    """
+    batches = session.info.setdefault(BATCHES_KEY, {})
+    if task_name not in batches:
+        batches[task_name] = []
+        enqueue(session, task_name, batches[task_name])
+    batches[task_name].extend(items)
+
+
+def publish(intents: list[tuple[str, list]]) -> None:
+    """Send queued tasks to the broker over a single producer connection.
+
+    :param intents: The task names and arguments.
+    """
+    with celery.producer_or_acquire() as producer:
+        for task_name, args in intents:
+            celery.send_task(task_name, args=args, producer=producer)
+
+
+@sa.event.listens_for(so.Session, 'after_commit')
+def publish_outbox(session: so.Session) -> None:
+    """Send the tasks queued during the committed transaction."""
+    session.info.pop(BATCHES_KEY, None)
+    intents = session.info.pop(OUTBOX_KEY, None)
+    if not intents:
+        return
+    try:
+        publish(intents)
+    except Exception as e:
+        logging.error(f'Could not send {len(intents)} queued tasks: {e}')
+
+
+@sa.event.listens_for(so.Session, 'after_rollback')
+def drop_outbox(session: so.Session) -> None:
+    """Drop the tasks queued during the rolled back transaction."""
+    session.info.pop(BATCHES_KEY, None)
+    session.info.pop(OUTBOX_KEY, None)
@@ -0,0 +1,51 @@
+"""Index the listing and backlog queries
+
+Revision ID: 7f3b9d2e6a01
+Revises: 2c5e8a1f4b7d
+Create Date: 2026-10-18 18:38:46.262656
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3b9d2e6a01'
+down_revision = '2c5e8a1f4b7d'
+branch_labels = None
+depends_on = None
+
+# On PostgreSQL the indexes are built concurrently, outside of the migration
+# transaction, so that the tables stay writable while they are built.
+INDEXES = [
+    ('ix_files_created_at_id', 'files', ['created_at', 'id'], {}),
+    ('ix_files_mimetype_created_at_id', 'files',
+     ['mimetype', 'created_at', 'id'], {}),
+    ('ix_files_folder_id_created_at_id', 'files',
+     ['folder_id', 'created_at', 'id'], {}),
+    ('ix_files_created_by_created_at_id', 'files',
+     ['created_by', 'created_at', 'id'], {}),
+    ('ix_files_unprocessed', 'files', ['id'],
+     {'postgresql_where': sa.text('NOT processed'),
+      'sqlite_where': sa.text('processed = 0')}),
+    ('ix_folders_created_at_id', 'folders', ['created_at', 'id'], {}),
+    ('ix_folders_created_by_created_at_id', 'folders',
+     ['created_by', 'created_at', 'id'], {}),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id'], {}),
+    ('ix_users_role_created_at_id', 'users',
+     ['role', 'created_at', 'id'], {}),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, **kwargs)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in reversed(INDEXES):
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=True)
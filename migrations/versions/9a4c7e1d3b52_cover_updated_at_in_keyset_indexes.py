@@ -0,0 +1,60 @@
+"""Cover updated_at in the keyset indexes
+
+Revision ID: 9a4c7e1d3b52
+Revises: 2d3dd3d12e99
+Create Date: 2026-10-18 19:32:05.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c7e1d3b52'
+down_revision = '2d3dd3d12e99'
+branch_labels = None
+depends_on = None
+
+# The keyset indexes include updated_at on PostgreSQL, so that the ETag
+# validators of a page are read from the index alone. Other databases don't
+# support included columns and keep the indexes as they are.
+INDEXES = [
+    ('ix_files_created_at_id', 'files', ['created_at', 'id']),
+    ('ix_files_mimetype_created_at_id', 'files',
+     ['mimetype', 'created_at', 'id']),
+    ('ix_files_folder_id_created_at_id', 'files',
+     ['folder_id', 'created_at', 'id']),
+    ('ix_files_created_by_created_at_id', 'files',
+     ['created_by', 'created_at', 'id']),
+    ('ix_folders_created_at_id', 'folders', ['created_at', 'id']),
+    ('ix_folders_created_by_created_at_id', 'folders',
+     ['created_by', 'created_at', 'id']),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+    ('ix_users_role_created_at_id', 'users', ['role', 'created_at', 'id']),
+]
+
+
+def rebuild_indexes(include: list[str]) -> None:
+    """Build the keyset indexes again with the given included columns.
+
+    Each new index is built concurrently under a temporary name before the
+    old one is dropped, so that the listings always have an index.
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(f'{name}_new', table, columns, unique=False,
+                            postgresql_include=include,
+                            postgresql_concurrently=True)
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=True)
+            op.execute(sa.text(f'ALTER INDEX {name}_new RENAME TO {name}'))
+
+
+def upgrade():
+    rebuild_indexes(['updated_at'])
+
+
+def downgrade():
+    rebuild_indexes([])
@@ -0,0 +1,67 @@
+import time
+
+from api.app import db, principals
+from api.token import Token
+from database.models import User
+from database.enums import Role
+from tests.base_test_case import BaseTestCase
+
+
+class AuthTests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['DISABLE_AUTH'] = False
+        principals.principals.clear()
+
+    def wait_until(self, condition, timeout=2.0):
+        """Wait for an invalidation to be delivered through pub/sub."""
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        assert condition()
+
+    def test_principal_is_cached(self):
+        """Test that a validated access token is served from the cache."""
+        rv = self.client.get('/api/v1/me', headers=self.headers)
+        assert rv.status_code == 200
+        assert rv.json['email'] == self.user.email
+        assert len(principals.principals) == 1
+
+        rv = self.client.get('/api/v1/me', headers=self.headers)
+        assert rv.status_code == 200
+
+    def test_invalid_token(self):
+        """Test that invalid access tokens are rejected."""
+        rv = self.client.get('/api/v1/me',
+                             headers={'Authorization': 'Bearer invalid'})
+        assert rv.status_code == 401
+
+    def test_revoked_token_is_invalidated(self):
+        """Test that revoking a user's tokens drops them from the cache."""
+        rv = self.client.get('/api/v1/me', headers=self.headers)
+        assert rv.status_code == 200
+
+        Token.revoke_all(self.user.id)
+        self.wait_until(lambda: not principals.principals)
+        rv = self.client.get('/api/v1/me', headers=self.headers)
+        assert rv.status_code == 401
+
+    def test_role_change_is_invalidated(self):
+        """Test that changing a user's role drops its cached principal."""
+        viewer = User(email='viewer@example.com', role=Role.VIEWER)
+        db.session.add(viewer)
+        db.session.commit()
+        headers = {'Authorization':
+                   f'Bearer {viewer.generate_auth_token().access_token_jwt}'}
+        rv = self.client.post('/api/v1/folders', json={'name': 'folder'},
+                              headers=headers)
+        assert rv.status_code == 403
+
+        rv = self.client.put(f'/api/v1/users/{viewer.id}',
+                             json={'role': Role.MODERATOR.name},
+                             headers=self.headers)
+        assert rv.status_code == 200
+        rv = self.client.post('/api/v1/folders', json={'name': 'folder'},
+                              headers=headers)
+        assert rv.status_code == 201
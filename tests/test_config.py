@@ -5,6 +5,8 @@ class TestConfig(Config):
     SERVER_NAME: str = 'localhost:5000'
     TESTING: bool = True
     DISABLE_AUTH: bool = True
+    CACHE_TYPE: str = 'SimpleCache'
+    REDIS_CLIENT_CLASS: str = 'fakeredis.FakeStrictRedis'
     ALCHEMICAL_DATABASE_URL: str = 'sqlite:///:memory:' # in-memory database
 
 
@@ -0,0 +1,90 @@
+from unittest import mock
+
+from api import db
+from cli.database import explain_query, full_scans, route_queries
+from database.models import File, Folder
+from utils.database import engine_options, set_statement_timeout
+from tests.base_test_case import BaseTestCase
+
+
+class DatabaseTests(BaseTestCase):
+
+    def engine_options(self, url: str, **config) -> dict:
+        """Return the engine options for a database URL."""
+        return engine_options({**self.app.config,
+                               'ALCHEMICAL_DATABASE_URL': url, **config})
+
+    def test_engine_options(self):
+        """Test that pool settings only apply to PostgreSQL."""
+        assert self.engine_options('sqlite://') == {'echo': False}
+
+        options = self.engine_options('postgresql://u:p@db/arctic',
+                                      DB_POOL_SIZE=3, DB_MAX_OVERFLOW=2)
+        assert options['pool_size'] == 3
+        assert options['max_overflow'] == 2
+        assert options['pool_pre_ping'] is True
+        assert options['executemany_mode'] == 'values_plus_batch'
+        assert options['connect_args'] == {
+            'options': '-c statement_timeout=30000'}
+        assert 'execution_options' not in options
+
+    def test_pgbouncer_engine_options(self):
+        """Test that PgBouncer mode avoids startup options and prepares."""
+        options = self.engine_options('postgresql+psycopg://u:p@db/arctic',
+                                      DB_PGBOUNCER=True)
+        assert options['connect_args'] == {'prepare_threshold': None}
+        assert options['execution_options'] == {'statement_timeout': 30000}
+
+        connection = mock.Mock()
+        connection.get_execution_options.return_value = \
+            options['execution_options']
+        set_statement_timeout(db.session, None, connection)
+        connection.exec_driver_sql.assert_called_once_with(
+            'SET LOCAL statement_timeout = 30000')
+
+    def test_pool_stats(self):
+        """Test that the database pool is reported with the AWS clients."""
+        rv = self.client.get('/health/pools', headers=self.headers)
+        assert rv.status_code == 200
+        assert rv.json['database']['pool'] == 'SingletonThreadPool'
+        assert rv.json['database']['checked_out'] is None
+        assert 's3' in rv.json
+
+    def test_route_queries_use_indexes(self):
+        """Test that no route query reads a whole table."""
+        for name, query in route_queries().items():
+            assert full_scans(explain_query(query)) == [], name
+
+        result = self.app.test_cli_runner().invoke(args=['database',
+                                                         'explain'])
+        assert result.exit_code == 0
+        assert 'ix_files_unprocessed' in result.output
+        assert '0 queries scan a whole table.' in result.output
+
+    def test_full_scans(self):
+        """Test that scans without an index are detected in plans."""
+        assert full_scans(['SCAN files']) == ['files']
+        assert full_scans(['SCAN files USING INDEX ix_files_created_at_id',
+                           'Seq Scan on folders  (cost=0.00..1.01 rows=1)']
+                          ) == ['folders']
+
+    def test_requeue(self):
+        """Test that only unprocessed files are sent to the worker again."""
+        folder = Folder(name='folder', created_by=self.user.id)
+        db.session.add(folder)
+        db.session.flush()
+        files = [File(filename=f'file{i}.png', mimetype='image/png',
+                      created_by=self.user.id, folder_id=folder.id,
+                      processed=i == 1) for i in range(3)]
+        db.session.add_all(files)
+        with mock.patch('database.outbox.publish'):
+            db.session.commit()
+
+        with mock.patch('database.outbox.publish') as publish:
+            result = self.app.test_cli_runner().invoke(
+                args=['database', 'requeue', '--batch-size', '1'])
+        assert result.exit_code == 0
+        assert '2 files requeued.' in result.output
+        assert [call.args[0] for call in publish.call_args_list] == [
+            [('worker.tasks.file_tasks.set_dominant_colors', [[files[0].id]])],
+            [('worker.tasks.file_tasks.set_dominant_colors', [[files[2].id]])]]
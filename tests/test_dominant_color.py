@@ -0,0 +1,71 @@
+from io import BytesIO
+from tempfile import NamedTemporaryFile
+from unittest import mock
+
+import numpy as np
+from colorthief import ColorThief
+from PIL import Image
+
+from api import aws_wrapper
+from utils.dominant_color import (get_dominant_color, get_palette,
+                                  load_thumbnail)
+from utils.image_analysis import ImageAnalysisExecutor
+from tests.base_test_case import BaseTestCase
+
+
+def make_image(width: int, height: int, format: str = 'PNG') -> BytesIO:
+    """Return an encoded image of noisy color bands of unequal widths."""
+    rng = np.random.default_rng(0)
+    colors = np.array([[200, 40, 40], [30, 90, 200], [240, 200, 30]])
+    bands = colors[np.searchsorted([0.8, 0.9], np.arange(width) / width,
+                                   side='right')]
+    pixels = np.broadcast_to(bands, (height, width, 3)) \
+        + rng.integers(-20, 21, (height, width, 3))
+    image_file = BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(
+        image_file, format)
+    image_file.seek(0)
+    return image_file
+
+
+class DominantColorTests(BaseTestCase):
+
+    def test_palette_matches_colorthief(self):
+        """Test that the palette of an unreduced image is ColorThief's."""
+        image_file = make_image(120, 80)
+        expected = ColorThief(image_file).get_palette(8, quality=1)
+        image_file.seek(0)
+        assert get_palette(image_file, 8, size=120) == expected
+
+    def test_jpeg_is_decoded_reduced(self):
+        """Test that large JPEGs are decoded at about the requested size."""
+        thumbnail = load_thumbnail(make_image(2400, 1600, 'JPEG'), size=256)
+        assert thumbnail.mode == 'RGBA'
+        assert 256 <= max(thumbnail.size) < 512
+
+    def test_image_too_large(self):
+        """Test that images over the pixel limit are rejected."""
+        with self.assertRaises(ValueError):
+            load_thumbnail(make_image(200, 100), max_pixels=10_000)
+
+    def test_generate_dominant_color(self):
+        """Test the dominant color of an image stored in S3."""
+        with mock.patch.object(
+                aws_wrapper, 'get_s3_object',
+                return_value={'Body': make_image(1200, 800, 'JPEG')}):
+            color = aws_wrapper.generate_dominant_color('image.jpg')
+        assert color == get_dominant_color(make_image(1200, 800, 'JPEG'))
+        assert color in ('#1e5ac8', '#c82828', '#f0c81e')
+
+    def test_image_analysis_executor(self):
+        """Test that the dominant color is computed in a pool process."""
+        executor = ImageAnalysisExecutor()
+        executor.init_app(self.app)
+        try:
+            with NamedTemporaryFile() as image_file:
+                image_file.write(make_image(600, 400, 'JPEG').read())
+                image_file.flush()
+                color = executor.dominant_color(image_file.name)
+        finally:
+            executor.shutdown()
+        assert color == get_dominant_color(make_image(600, 400, 'JPEG'))
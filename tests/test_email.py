@@ -0,0 +1,166 @@
+import smtplib
+import socket
+from unittest import mock
+
+from aiosmtpd.controller import Controller
+from flask_mail import Connection
+
+from api.app import db, mail
+from api.email import deliver_emails, send_email
+from database.enums import EmailStatus
+from database.models import Email
+from utils.mailer import SMTPPool
+from tests.base_test_case import BaseTestCase
+
+
+class Handler:
+    """SMTP handler that records messages and refuses one recipient."""
+
+    def __init__(self) -> None:
+        self.messages = []
+        self.peers = set()
+
+    async def handle_RCPT(self, server, session, envelope, address,
+                          rcpt_options):
+        if address == 'refused@example.com':
+            return '550 No such user'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        self.peers.add(session.peer)
+        return '250 Message accepted'
+
+
+def free_port() -> int:
+    """Return a port nothing listens on."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class EmailTests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.handler = Handler()
+        self.smtpd = Controller(self.handler, hostname='127.0.0.1',
+                                port=free_port())
+        self.smtpd.start()
+        self.addCleanup(self.smtpd.stop)
+        self.init_mail(self.smtpd.port)
+
+    def init_mail(self, port: int, **config) -> None:
+        """Send the emails of the app to a local SMTP server."""
+        self.app.config.update(MAIL_SUPPRESS_SEND=False,
+                               MAIL_SERVER='127.0.0.1', MAIL_PORT=port,
+                               MAIL_DEFAULT_SENDER='fox@example.com',
+                               **config)
+        mail.init_app(self.app)
+        self.mailer = SMTPPool()
+        self.mailer.init_app(self.app)
+        self.addCleanup(self.mailer.close)
+
+    def queue_emails(self, *recipients: str) -> list[int]:
+        """Queue invitations without sending their task."""
+        with mock.patch('database.outbox.publish'):
+            ids = [send_email(to, 'Invitation to Arctic Fox', 'invite',
+                              user_email=to).id for to in recipients]
+            db.session.commit()
+        return ids
+
+    def test_invite_queues_email(self):
+        """Test that an invitation is sent to the worker once committed."""
+        with mock.patch('database.outbox.publish') as publish:
+            rv = self.client.post('/api/v1/users', headers=self.headers,
+                                  json={'email': 'new@example.com',
+                                        'role': 'VIEWER'})
+        assert rv.status_code == 201
+        email = db.session.scalar(Email.select())
+        assert email.recipient == 'new@example.com'
+        assert email.status == EmailStatus.QUEUED
+        publish.assert_called_once_with(
+            [('worker.tasks.email_tasks.send_emails', [[email.id]])])
+        assert self.handler.messages == []
+
+    def test_batches_reuse_connection(self):
+        """Test that batches of emails are sent over one connection."""
+        ids = self.queue_emails('a@example.com', 'b@example.com')
+        deliver_emails(ids[:1], self.mailer)
+        deliver_emails(ids[1:], self.mailer)
+
+        assert [m.rcpt_tos for m in self.handler.messages] == [
+            ['a@example.com'], ['b@example.com']]
+        assert len(self.handler.peers) == 1
+        assert b'a@example.com' in self.handler.messages[0].content
+        emails = db.session.scalars(Email.select().order_by(Email.id)).all()
+        assert [e.status for e in emails] == [EmailStatus.SENT] * 2
+        assert all(e.sent_at and e.attempts == 1 for e in emails)
+
+    def test_refused_recipient_fails(self):
+        """Test that a refused recipient fails without the rest of a batch."""
+        ids = self.queue_emails('refused@example.com', 'ok@example.com')
+        refused, sent = deliver_emails(ids, self.mailer)
+
+        assert refused.status == EmailStatus.FAILED
+        assert '550' in refused.error
+        assert sent.status == EmailStatus.SENT
+        assert len(self.handler.messages) == 1
+
+    def test_unreachable_server(self):
+        """Test that connection errors are raised and the email stays queued."""
+        ids = self.queue_emails('a@example.com')
+        self.init_mail(free_port())
+        with self.assertRaises(OSError):
+            deliver_emails(ids, self.mailer)
+
+        email = db.session.get(Email, ids[0])
+        assert email.status == EmailStatus.QUEUED
+        assert email.attempts == 1
+
+    def test_disconnect_keeps_sent_emails(self):
+        """Test that emails sent before a connection error are recorded."""
+        ids = self.queue_emails('a@example.com', 'b@example.com')
+        send = Connection.send
+
+        def send_once(connection, message, *args):
+            if self.handler.messages:
+                raise smtplib.SMTPServerDisconnected('Connection lost')
+            return send(connection, message, *args)
+
+        with mock.patch.object(Connection, 'send', autospec=True,
+                               side_effect=send_once):
+            with self.assertRaises(smtplib.SMTPServerDisconnected):
+                deliver_emails(ids, self.mailer)
+
+        sent, queued = db.session.scalars(
+            Email.select().order_by(Email.id)).all()
+        assert sent.status == EmailStatus.SENT and sent.sent_at
+        assert queued.status == EmailStatus.QUEUED
+        assert deliver_emails(ids, self.mailer) == [queued]
+        assert queued.status == EmailStatus.SENT
+        assert [m.rcpt_tos for m in self.handler.messages] == [
+            ['a@example.com'], ['b@example.com']]
+
+    def test_render_error_fails(self):
+        """Test that an email that can't be rendered fails on its own."""
+        ids = self.queue_emails('a@example.com', 'b@example.com')
+        db.session.get(Email, ids[0]).template = 'missing'
+        db.session.commit()
+        broken, sent = deliver_emails(ids, self.mailer)
+
+        assert broken.status == EmailStatus.FAILED
+        assert 'missing' in broken.error
+        assert broken.attempts == 1
+        assert sent.status == EmailStatus.SENT
+        assert len(self.handler.messages) == 1
+
+    def test_pool_backpressure(self):
+        """Test that senders wait for a free connection, then give up."""
+        self.init_mail(self.smtpd.port, MAIL_POOL_SIZE=1,
+                       MAIL_POOL_TIMEOUT=0.01)
+        with self.mailer.connection():
+            with self.assertRaises(TimeoutError):
+                self.mailer.send([])
+        assert self.mailer.send([]) == []
@@ -0,0 +1,102 @@
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import sqlalchemy as sa
+
+from api import db
+from database.models import File, Folder
+from tests.base_test_case import BaseTestCase
+
+
+class ETagTests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Rows are last updated in the past, as SQLite timestamps have a
+        # resolution of one second.
+        past = datetime(2026, 1, 1)
+        self.folder = Folder(name='folder', created_by=self.user.id,
+                             created_at=past, updated_at=past)
+        db.session.add(self.folder)
+        db.session.flush()
+        db.session.execute(sa.insert(File), [
+            {'filename': f'file{i}.png', 'mimetype': 'image/png',
+             'created_by': self.user.id, 'folder_id': self.folder.id,
+             'created_at': past + timedelta(days=i), 'updated_at': past}
+            for i in range(3)])
+        db.session.commit()
+
+    def get(self, url: str, **headers) -> tuple[int, str|None]:
+        """Return the status and ETag of a conditional request."""
+        rv = self.client.get(url, headers={**self.headers, **headers})
+        if rv.status_code == 304:
+            assert rv.data == b''
+        return rv.status_code, rv.headers.get('ETag')
+
+    def test_collection_not_modified(self):
+        """Test that a page is only sent again once its rows change."""
+        status, etag = self.get('/api/v1/files')
+        assert status == 200 and etag
+        assert self.get('/api/v1/files', If_None_Match=etag) == (304, etag)
+        assert self.get('/api/v1/files?limit=1', If_None_Match=etag)[0] == 200
+
+        # Changes to a file or to a nested folder change the ETag
+        db.session.execute(sa.update(File).where(File.filename == 'file0.png')
+                           .values(description='changed'))
+        db.session.commit()
+        status, changed = self.get('/api/v1/files', If_None_Match=etag)
+        assert status == 200 and changed != etag
+
+        self.folder.name = 'renamed'
+        db.session.commit()
+        status, renamed = self.get('/api/v1/files', If_None_Match=changed)
+        assert status == 200 and renamed != changed
+
+        # So does a file leaving the page
+        db.session.execute(sa.delete(File).where(File.filename == 'file1.png'))
+        db.session.commit()
+        assert self.get('/api/v1/files', If_None_Match=renamed)[0] == 200
+
+    def test_cached_response_not_modified(self):
+        """Test that a cached page is validated without querying files."""
+        status, etag = self.get('/api/v1/images')
+        statements = []
+
+        def record(connection, cursor, statement, *args):
+            statements.append(statement)
+
+        sa.event.listen(db.get_engine(), 'before_cursor_execute', record)
+        self.addCleanup(sa.event.remove, db.get_engine(),
+                        'before_cursor_execute', record)
+        assert self.get('/api/v1/images', If_None_Match=etag) == (304, etag)
+        assert not [statement for statement in statements
+                    if 'files' in statement]
+
+    def test_single_resource_last_modified(self):
+        """Test that single resources are validated by date as well."""
+        rv = self.client.get(f'/api/v1/folders/{self.folder.id}',
+                             headers=self.headers)
+        assert rv.status_code == 200
+        last_modified = rv.headers['Last-Modified']
+        assert self.get(f'/api/v1/folders/{self.folder.id}',
+                        If_Modified_Since=last_modified)[0] == 304
+        assert self.get(f'/api/v1/users/{self.user.id}',
+                        If_None_Match=rv.headers['ETag'])[0] == 200
+        assert self.get('/api/v1/folders/999')[0] == 404
+
+    def test_last_modified_changes_with_window(self):
+        """Test that preview URLs are sent again once their window ends."""
+        url = f'/api/v1/files/{self.folder.files[0].id}'
+        window = self.app.config['PREVIEW_URL_WINDOW']
+        now = (time.time() // window + 1) * window - 1
+        with mock.patch('time.time', return_value=now):
+            rv = self.client.get(url, headers=self.headers)
+            last_modified = rv.headers['Last-Modified']
+            assert self.get(url, If_Modified_Since=last_modified)[0] == 304
+
+        with mock.patch('time.time', return_value=now + 1):
+            rv = self.client.get(url, headers={
+                **self.headers, 'If-Modified-Since': last_modified})
+        assert rv.status_code == 200
+        assert rv.last_modified.timestamp() == now + 1
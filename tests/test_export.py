@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+import sqlalchemy as sa
+
+from api import db
+from database.models import File, Folder
+from tests.base_test_case import BaseTestCase
+
+
+class ExportTests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['EXPORT_YIELD_PER'] = 2
+        self.folder = Folder(name='folder', created_by=self.user.id)
+        db.session.add(self.folder)
+        db.session.flush()
+        db.session.execute(sa.insert(File), [
+            {'filename': f'file{i}.png',
+             'mimetype': 'video/mp4' if i == 4 else 'image/png',
+             'description': 'café, "quoted"\nline' if i == 1 else None,
+             'created_by': self.user.id, 'folder_id': self.folder.id}
+            for i in range(5)])
+        db.session.commit()
+
+    def export(self, url: str) -> tuple[str, list[bytes]]:
+        """Return the content type and the chunks of a streamed export."""
+        rv = self.client.get(url, headers=self.headers, buffered=False)
+        assert rv.status_code == 200
+        chunks = list(rv.response)
+        rv.close()
+        return rv.headers['Content-Type'], chunks
+
+    def test_ndjson(self):
+        """Test that files are streamed a partition at a time, by ID."""
+        content_type, chunks = self.export('/api/v1/files/export')
+        assert content_type == 'application/x-ndjson'
+        assert len(chunks) == 3
+        files = [json.loads(line)
+                 for line in b''.join(chunks).decode().splitlines()]
+        assert [file['filename'] for file in files] == [
+            f'file{i}.png' for i in range(5)]
+        assert files[1]['description'] == 'café, "quoted"\nline'
+        assert files[0]['processed'] is False
+        assert list(files[0]) == File.__table__.columns.keys()
+
+    def test_csv_filters(self):
+        """Test that CSV exports have a header and apply the filters."""
+        content_type, chunks = self.export(
+            '/api/v1/files/export?format=csv&mimetype=image/png')
+        assert content_type.startswith('text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        assert [row['filename'] for row in rows] == [
+            f'file{i}.png' for i in range(4)]
+        assert rows[1]['description'] == 'café, "quoted"\nline'
+        assert rows[0]['description'] == ''
+        assert rows[0]['processed'] == 'false'
+
+        _, chunks = self.export('/api/v1/folders/export?format=csv&'
+                                'created_by=999')
+        assert b''.join(chunks) == \
+            b'id,name,description,created_by,created_at,updated_at\n'
+
+    def test_invalid_format(self):
+        """Test that unknown formats are rejected."""
+        rv = self.client.get('/api/v1/files/export?format=xml',
+                             headers=self.headers)
+        assert rv.status_code == 400
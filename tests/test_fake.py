@@ -0,0 +1,54 @@
+from unittest import mock
+
+import sqlalchemy as sa
+
+from api import db
+from cli.fake import fake_file_rows, generate_chunks, set_owners
+from database.models import File, Folder, User
+from tests.base_test_case import BaseTestCase
+
+
+class FakeTests(BaseTestCase):
+
+    def invoke(self, *args: str) -> str:
+        """Run a fake data command and return its output."""
+        result = self.app.test_cli_runner().invoke(args=['fake', *args])
+        assert result.exit_code == 0, result.output
+        return result.output
+
+    def test_bulk_users(self):
+        """Test that bulk users get unique emails and usernames."""
+        output = self.invoke('users', '25', '--bulk', '--chunk-size', '10',
+                             '--workers', '0')
+        assert 'Added 25 users.' in output
+        assert '25/25 users inserted' in output
+        users = db.session.scalars(User.select().where(
+            User.id != self.user.id)).all()
+        assert len({user.email for user in users}) == 25
+        assert len({user.username for user in users}) == 25
+
+    def test_bulk_files(self):
+        """Test that bulk files are inserted without sending tasks."""
+        db.session.add(Folder(name='folder', created_by=self.user.id))
+        db.session.commit()
+        with mock.patch('database.outbox.publish') as publish:
+            output = self.invoke('files', '50', '--bulk', '--chunk-size',
+                                 '20', '--workers', '1')
+        assert 'Added 50 files.' in output
+        publish.assert_not_called()
+        assert db.session.scalar(sa.select(sa.func.count(File.id))) == 50
+        assert db.session.scalar(sa.select(sa.func.count(
+            sa.distinct(File.filename)))) == 50
+
+        self.invoke('files', '5', '--bulk', '--workers', '0')
+        assert db.session.scalar(sa.select(sa.func.count(File.id))) == 55
+
+    def test_generate_chunks(self):
+        """Test that chunks are the same in a process pool and in order."""
+        set_owners([1, 2], [3])
+        inline = list(generate_chunks(fake_file_rows, 25, 1, 10, 0, 7))
+        pooled = list(generate_chunks(fake_file_rows, 25, 1, 10, 2, 7))
+        assert [len(rows) for rows in inline] == [10, 10, 5]
+        assert pooled == inline
+        assert inline[2][-1]['filename'].split('.')[0].endswith('-25')
+        assert {row['folder_id'] for rows in inline for row in rows} == {3}
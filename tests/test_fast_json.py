@@ -0,0 +1,76 @@
+import json
+
+import msgspec
+from marshmallow import post_dump
+
+from api import db, ma
+from api.app import responses
+from api.routes.schemas import FileSchema, PaginatedCollection
+from database.models import File, Folder
+from utils.fast_json import FastJSONMixin, struct_dumper
+from tests.base_test_case import BaseTestCase
+
+
+class FastJSONTests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['RESPONSE_CACHE_TIMEOUT'] = 0
+        responses.init_app(self.app)
+        self.folder = Folder(name='folder', created_by=self.user.id)
+        db.session.add(self.folder)
+        db.session.flush()
+        descriptions = [None, 'plain', 'café ☕', 'tab\tquote" back\\ del\x7f',
+                        '</script>\x00\x1f']
+        db.session.add_all([
+            File(filename=f'file{i}.png', mimetype='image/png',
+                 description=description, created_by=self.user.id,
+                 folder_id=self.folder.id, processed=i % 2 == 0)
+            for i, description in enumerate(descriptions)])
+        db.session.commit()
+
+    def get(self, url: str, fast: bool) -> bytes:
+        """Return the body of a response with or without the fast path."""
+        self.app.config['FAST_JSON'] = fast
+        rv = self.client.get(url, headers=self.headers)
+        assert rv.status_code == 200
+        assert rv.mimetype == 'application/json'
+        return rv.data
+
+    def test_responses_identical(self):
+        """Test that both paths send the same bytes."""
+        file = db.session.scalar(File.select().where(
+            File.filename == 'file3.png'))
+        for url in ('/api/v1/files', '/api/v1/files?limit=2',
+                    f'/api/v1/files/{file.id}', '/api/v1/images',
+                    '/api/v1/folders', f'/api/v1/folders/{self.folder.id}',
+                    '/api/v1/users', f'/api/v1/users/{self.user.id}'):
+            assert self.get(url, True) == self.get(url, False), url
+
+    def test_structs(self):
+        """Test that structs hold what marshmallow dumps, in order."""
+        files = db.session.scalars(File.select().order_by(File.id)).all()
+        schema = PaginatedCollection(FileSchema())()
+        page = {'data': files, 'pagination': {'limit': 10, 'count': 5,
+                                              'next': None}}
+        structs = struct_dumper(schema).dump(page)
+        assert msgspec.to_builtins(structs) == schema.dump(page)
+        assert list(msgspec.structs.asdict(structs.data[0])) == \
+            list(FileSchema().dump(files[0]))
+        assert self.app.json.dumps(structs) == json.dumps(schema.dump(page))
+
+    def test_unsupported_schema(self):
+        """Test that schemas the structs can't follow are dumped as before."""
+        class TaggedSchema(FastJSONMixin, ma.Schema):
+            name = ma.String()
+
+            @post_dump
+            def tag(self, data: dict, **kwargs) -> dict:
+                return {**data, 'tag': 1}
+
+        self.app.config['FAST_JSON'] = True
+        schema = TaggedSchema()
+        assert struct_dumper(schema) is None
+        with self.app.test_request_context():
+            assert schema.jsonify({'name': 'fox'}).json == {'name': 'fox',
+                                                            'tag': 1}
@@ -1,4 +1,9 @@
-from api import db
+from datetime import datetime, timedelta
+from unittest import mock
+
+import sqlalchemy as sa
+
+from api import celery, db
 from database.models import File, Folder
 from tests.base_test_case import BaseTestCase
 
@@ -57,3 +62,193 @@ class FileTests(BaseTestCase):
 
         rv = self.client.get(f'/api/v1/files/{file.id}', headers=self.headers)
         assert rv.status_code == 404
+
+    def test_list_files_paginated(self):
+        """Test paging through files with a cursor."""
+        folder = self.create_folder()
+        created_at = datetime(2024, 1, 1)
+        for i in range(5):
+            db.session.add(File(filename=f'file{i}.png', mimetype='image/png',
+                                created_by=self.user.id, folder_id=folder.id,
+                                created_at=created_at + timedelta(hours=i % 3)))
+        db.session.commit()
+
+        filenames = []
+        url = '/api/v1/files?limit=2'
+        while url:
+            rv = self.client.get(url, headers=self.headers)
+            assert rv.status_code == 200
+            assert rv.json['pagination']['count'] <= 2
+            filenames += [file['filename'] for file in rv.json['data']]
+            cursor = rv.json['pagination']['next']
+            url = f'/api/v1/files?limit=2&cursor={cursor}' if cursor else None
+        assert filenames == ['file2.png', 'file4.png', 'file1.png',
+                             'file3.png', 'file0.png']
+
+        rv = self.client.get('/api/v1/files?order=asc&limit=1',
+                             headers=self.headers)
+        assert rv.json['data'][0]['filename'] == 'file0.png'
+
+    def test_list_files_filtered(self):
+        """Test filtering files by mimetype and creation date."""
+        folder = self.create_folder()
+        db.session.add_all([
+            File(filename='a.png', mimetype='image/png', folder_id=folder.id,
+                 created_by=self.user.id, created_at=datetime(2024, 1, 1)),
+            File(filename='b.mp4', mimetype='video/mp4', folder_id=folder.id,
+                 created_by=self.user.id, created_at=datetime(2024, 2, 1)),
+            File(filename='c.gif', mimetype='image/gif', folder_id=folder.id,
+                 created_by=self.user.id, created_at=datetime(2024, 3, 1)),
+        ])
+        db.session.commit()
+
+        rv = self.client.get('/api/v1/images', headers=self.headers)
+        assert [f['filename'] for f in rv.json['data']] == ['c.gif', 'a.png']
+
+        rv = self.client.get('/api/v1/videos', headers=self.headers)
+        assert [f['filename'] for f in rv.json['data']] == ['b.mp4']
+
+        rv = self.client.get(
+            '/api/v1/files?created_after=2024-01-15T00:00:00'
+            '&created_before=2024-03-01T00:00:00', headers=self.headers)
+        assert [f['filename'] for f in rv.json['data']] == ['b.mp4']
+
+        rv = self.client.get('/api/v1/files?cursor=invalid',
+                             headers=self.headers)
+        assert rv.status_code == 400
+
+    def count_list_queries(self):
+        """Return the number of statements run by a file listing request."""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db.get_engine()
+        sa.event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            rv = self.client.get('/api/v1/files', headers=self.headers)
+        finally:
+            sa.event.remove(engine, 'before_cursor_execute',
+                            before_cursor_execute)
+        assert rv.status_code == 200
+        assert all('owner' in f and 'folder' in f for f in rv.json['data'])
+        return len(statements)
+
+    def test_list_files_query_count(self):
+        """Test that listing files runs a constant number of queries."""
+        user_id, folder_id = self.user.id, self.create_folder().id
+        db.session.add(File(filename='first.png', mimetype='image/png',
+                            created_by=user_id, folder_id=folder_id))
+        db.session.commit()
+        db.session.expunge_all()
+        single = self.count_list_queries()
+
+        for i in range(10):
+            folder = Folder(name=f'folder{i}', created_by=user_id)
+            db.session.add(folder)
+            db.session.flush()
+            db.session.add(File(filename=f'file{i}.png', mimetype='image/png',
+                                created_by=user_id, folder_id=folder.id))
+        db.session.commit()
+        db.session.expunge_all()
+        assert self.count_list_queries() == single
+
+    def test_tasks_sent_after_commit(self):
+        """Test that file tasks are sent in one batch after commit."""
+        folder = self.create_folder()
+        with mock.patch('database.outbox.publish') as publish:
+            files = [File(filename=f'file{i}.png', mimetype='image/png',
+                          created_by=self.user.id, folder_id=folder.id)
+                     for i in range(3)]
+            db.session.add_all(files)
+            db.session.flush()
+            publish.assert_not_called()
+            db.session.commit()
+            publish.assert_called_once_with([
+                ('worker.tasks.file_tasks.set_dominant_colors',
+                 [[file.id for file in files]])])
+
+            db.session.delete(files[0])
+            db.session.delete(files[1])
+            db.session.commit()
+            publish.assert_called_with([
+                ('worker.tasks.file_tasks.delete_s3_files',
+                 [['file0.png', 'file1.png']])])
+
+    def test_bulk_insert_sends_one_message(self):
+        """Test that the broker gets one message for many inserted files."""
+        folder = self.create_folder()
+        files = [File(filename=f'file{i}.png', mimetype='image/png',
+                      created_by=self.user.id, folder_id=folder.id)
+                 for i in range(3)]
+        with mock.patch.object(celery.amqp, 'send_task_message') as send:
+            db.session.add_all(files)
+            db.session.commit()
+        send.assert_called_once()
+        assert send.call_args.args[1] == \
+            'worker.tasks.file_tasks.set_dominant_colors'
+        assert send.call_args.args[2].body[0] == [[file.id for file in files]]
+
+    def test_tasks_dropped_on_rollback(self):
+        """Test that the tasks of a rolled back transaction are not sent."""
+        folder = self.create_folder()
+        with mock.patch('database.outbox.publish') as publish:
+            db.session.add(File(filename='file.png', mimetype='image/png',
+                                created_by=self.user.id, folder_id=folder.id))
+            db.session.flush()
+            db.session.rollback()
+            db.session.commit()
+            publish.assert_not_called()
+
+    def test_batch_files(self):
+        """Test creating, editing and deleting files in batches."""
+        folder = self.create_file().folder
+        data = [{'filename': f'batch{i}.png', 'mimetype': 'image/png',
+                 'folder_id': folder.id} for i in range(3)]
+        data.append({'filename': 'testfile.png', 'mimetype': 'image/png',
+                     'folder_id': folder.id})
+        data.append({'filename': 'batch0.png', 'mimetype': 'image/png',
+                     'folder_id': folder.id})
+        data.append({'filename': 'nofolder.png', 'mimetype': 'image/png',
+                     'folder_id': 999})
+        with mock.patch('database.outbox.publish') as publish:
+            rv = self.client.post('/api/v1/files/batch', json=data,
+                                  headers=self.headers)
+        assert rv.status_code == 200
+        assert [result['status'] for result in rv.json] == \
+            [201, 201, 201, 409, 409, 404]
+        assert [result['file']['filename'] for result in rv.json[:3]] == \
+            ['batch0.png', 'batch1.png', 'batch2.png']
+        ids = [result['id'] for result in rv.json[:3]]
+        publish.assert_called_once_with([
+            ('worker.tasks.file_tasks.set_dominant_colors', [ids])])
+
+        rv = self.client.put('/api/v1/files/batch', json=[
+            {'id': ids[0], 'description': 'first'},
+            {'id': ids[1], 'filename': 'batch2.png'},
+            {'id': 999, 'description': 'missing'},
+        ], headers=self.headers)
+        assert rv.status_code == 200
+        assert [result['status'] for result in rv.json] == [200, 409, 404]
+        assert rv.json[0]['file']['description'] == 'first'
+
+        with mock.patch('database.outbox.publish') as publish:
+            rv = self.client.delete('/api/v1/files/batch',
+                                    json={'ids': ids + [999]},
+                                    headers=self.headers)
+        assert rv.status_code == 200
+        assert [result['status'] for result in rv.json] == \
+            [204, 204, 204, 404]
+        publish.assert_called_once_with([(
+            'worker.tasks.file_tasks.delete_s3_files',
+            [['batch0.png', 'batch1.png', 'batch2.png']])])
+        assert db.session.scalar(
+            sa.select(sa.func.count()).select_from(File)) == 1
+
+    def test_batch_too_large(self):
+        """Test that batches over the size limit are rejected."""
+        self.app.config['FILE_BATCH_SIZE'] = 2
+        rv = self.client.delete('/api/v1/files/batch',
+                                json={'ids': [1, 2, 3]}, headers=self.headers)
+        assert rv.status_code == 413
@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+from flask import Flask
+
+from api.app import rd
+from utils.aws_wrapper import AWSWrapper
+from utils.preview_url_cache import PreviewURLCache
+from tests.base_test_case import BaseTestCase
+
+
+class PreviewURLTests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        app = Flask(__name__)
+        app.config.update(AWS_BUCKET='arctic-fox', AWS_REGION='us-east-1',
+                          AWS_ACCESS_KEY_ID='AKIDEXAMPLE',
+                          AWS_SECRET_ACCESS_KEY='secret',
+                          PREVIEW_URL_WINDOW=3600, PREVIEW_URL_CACHE_SIZE=16)
+        self.aws_wrapper = AWSWrapper()
+        self.aws_wrapper.init_app(app)
+        self.preview_urls = PreviewURLCache(self.aws_wrapper, rd)
+        self.preview_urls.init_app(app)
+
+    def tearDown(self):
+        for key in rd.scan_iter(match='preview_url:*'):
+            rd.delete(key)
+        super().tearDown()
+
+    def test_bulk_signing_matches_botocore(self):
+        """Test that bulk signed URLs are the ones botocore would sign."""
+        now = datetime(2024, 5, 1, 12, 0, 0, tzinfo=timezone.utc)
+        keys = ['a b/c+d~e(1).png', 'plain.jpg', 'ünïcode.png']
+        with mock.patch('botocore.auth.datetime') as botocore_datetime, \
+                mock.patch('utils.aws_wrapper.datetime') as wrapper_datetime:
+            botocore_datetime.datetime.utcnow.return_value = \
+                now.replace(tzinfo=None)
+            wrapper_datetime.now.return_value = now
+            urls = self.aws_wrapper.generate_presigned_urls(keys)
+            for key in keys:
+                assert urls[key] == \
+                    self.aws_wrapper.generate_presigned_url(key)
+
+    def test_preview_urls_are_reused(self):
+        """Test that preview URLs are signed once per window."""
+        with mock.patch.object(
+                self.aws_wrapper, 'generate_presigned_urls',
+                wraps=self.aws_wrapper.generate_presigned_urls) as sign:
+            first = self.preview_urls.get_many(['a.png', 'b.png'])
+            assert sign.call_count == 1
+            assert self.preview_urls.get_many(['a.png', 'b.png']) == first
+            assert self.preview_urls.get('a.png') == first['a.png']
+            assert sign.call_count == 1
+
+            self.preview_urls.urls.clear()
+            assert self.preview_urls.get_many(['a.png', 'b.png']) == first
+            assert sign.call_count == 1
+
+            self.preview_urls.get_many(['a.png', 'c.png'])
+            sign.assert_called_with(['c.png'], expiration=mock.ANY)
+
+    def test_filenames_iterated_once(self):
+        """Test that filenames can be given as a one-shot iterator."""
+        self.preview_urls.get('a.png')
+        urls = self.preview_urls.get_many(
+            name for name in ['a.png', 'b.png', 'a.png'])
+        assert list(urls) == ['a.png', 'b.png']
+        assert all(urls.values())
@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import sqlalchemy as sa
+
+from api import db
+from api.app import replicas
+from database.models import Folder, User
+from utils.replicas import LAG_QUERIES
+from tests.base_test_case import BaseTestCase
+
+
+class ReplicaTests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.urls = []
+        for i in range(2):
+            url = f'sqlite:///{os.path.join(directory, f"replica{i}.db")}'
+            engine = sa.create_engine(url)
+            db.metadatas[None].create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(sa.insert(User).values(
+                    id=self.user.id, email=self.user.email,
+                    username=self.user.username, role=self.user.role))
+                connection.execute(sa.insert(Folder).values(
+                    id=100 + i, name=f'replica{i}', created_by=self.user.id))
+            engine.dispose()
+            self.urls.append(url)
+
+    def tearDown(self):
+        self.init_replicas([])
+        super().tearDown()
+
+    def init_replicas(self, urls: list[str], **config) -> None:
+        """Configure the replicas of the app."""
+        self.app.config.update(POSTGRES_REPLICA_URIS=urls,
+                               REPLICA_CHECK_INTERVAL=0, **config)
+        replicas.init_app(self.app)
+
+    def folder_names(self) -> list[str]:
+        """Return the names of the folders exported by the API."""
+        rv = self.client.get('/api/v1/folders/export', headers=self.headers)
+        assert rv.status_code == 200
+        return [json.loads(line)['name'] for line in rv.data.splitlines()]
+
+    def test_get_reads_from_replicas(self):
+        """Test that GET requests read from the replicas in turn."""
+        self.init_replicas(self.urls)
+        assert self.folder_names() == ['replica0']
+        assert self.folder_names() == ['replica1']
+        assert self.folder_names() == ['replica0']
+
+        rv = self.client.post('/api/v1/folders', json={'name': 'primary'},
+                              headers=self.headers)
+        assert rv.status_code == 201
+        assert db.session.scalars(sa.select(Folder.name)).all() == ['primary']
+
+    def test_reads_after_write_use_primary(self):
+        """Test that a request reads from the primary once it has written."""
+        self.init_replicas(self.urls[:1])
+        with self.app.test_request_context('/api/v1/folders'):
+            assert db.session.scalars(sa.select(Folder.name)).all() == \
+                ['replica0']
+            db.session.add(Folder(name='primary', created_by=self.user.id))
+            db.session.flush()
+            assert db.session.scalars(sa.select(Folder.name)).all() == \
+                ['primary']
+            db.session.rollback()
+
+        with self.app.test_request_context('/api/v1/folders',
+                                           method='POST'):
+            assert db.session.scalars(sa.select(Folder.name)).all() == []
+
+    def test_unavailable_replicas_fall_back_to_primary(self):
+        """Test that failing and lagging replicas are skipped."""
+        self.init_replicas(['sqlite:////nonexistent/replica.db',
+                            self.urls[1]])
+        assert self.folder_names() == ['replica1']
+        assert self.folder_names() == ['replica1']
+        stats = replicas.stats()
+        assert [replica['healthy'] for replica in stats] == [False, True]
+        assert stats[1]['lag'] == 0
+
+        self.init_replicas(self.urls, REPLICA_MAX_LAG=-1)
+        assert self.folder_names() == []
+
+    def test_replica_without_lag_is_unhealthy(self):
+        """Test that replicas not receiving WAL are skipped."""
+        self.init_replicas(self.urls)
+        with mock.patch.dict(LAG_QUERIES, sqlite=sa.text('SELECT NULL')):
+            assert self.folder_names() == []
+        stats = replicas.stats()
+        assert [replica['healthy'] for replica in stats] == [False, False]
+        assert stats[0]['lag'] is None
+
+    def test_cached_responses_built_from_primary(self):
+        """Test that listings missing the cache don't read from replicas."""
+        self.init_replicas(self.urls)
+        rv = self.client.get('/api/v1/folders', headers=self.headers)
+        assert rv.headers['X-Cache'] == 'MISS'
+        assert rv.json['data'] == []
+
+        rv = self.client.post('/api/v1/folders', json={'name': 'primary'},
+                              headers=self.headers)
+        assert rv.status_code == 201
+        for _ in self.urls:
+            rv = self.client.get('/api/v1/folders', headers=self.headers)
+            assert [folder['name'] for folder in rv.json['data']] == \
+                ['primary']
+        assert rv.headers['X-Cache'] == 'HIT'
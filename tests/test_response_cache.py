@@ -0,0 +1,71 @@
+import sqlalchemy as sa
+
+from api import db
+from api.app import responses
+from database.models import File, Folder, User
+from tests.base_test_case import BaseTestCase
+
+
+class ResponseCacheTests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.folder = Folder(name='folder', created_by=self.user.id)
+        db.session.add(self.folder)
+        db.session.commit()
+
+    def get(self, url: str) -> tuple[str, list]:
+        """Return the cache status and data of a listing."""
+        rv = self.client.get(url, headers=self.headers)
+        assert rv.status_code == 200
+        return rv.headers['X-Cache'], rv.json['data']
+
+    def test_listing_cached_until_commit(self):
+        """Test that a listing is served from cache until a folder changes."""
+        status, data = self.get('/api/v1/folders')
+        assert status == 'MISS'
+        assert self.get('/api/v1/folders') == ('HIT', data)
+        assert self.get('/api/v1/folders?limit=1')[0] == 'MISS'
+
+        self.folder.name = 'renamed'
+        db.session.commit()
+        status, data = self.get('/api/v1/folders')
+        assert status == 'MISS'
+        assert data[0]['name'] == 'renamed'
+        assert self.get('/api/v1/folders')[0] == 'HIT'
+
+    def test_nested_and_bulk_changes_invalidate(self):
+        """Test that bulk statements and nested models invalidate."""
+        self.get('/api/v1/folders')
+        db.session.execute(sa.update(User).values(username='renamed'))
+        db.session.commit()
+        status, data = self.get('/api/v1/folders')
+        assert status == 'MISS'
+        assert data[0]['owner']['username'] == 'renamed'
+
+        self.get('/api/v1/images')
+        db.session.execute(sa.insert(File).values(
+            filename='a.png', mimetype='image/png', created_by=self.user.id,
+            folder_id=self.folder.id))
+        db.session.rollback()
+        assert self.get('/api/v1/images') == ('HIT', [])
+        assert self.get('/api/v1/folders')[0] == 'HIT'
+
+    def test_errors_and_disabled_cache_not_cached(self):
+        """Test that only successful responses are cached, when enabled."""
+        rv = self.client.get('/api/v1/files/1', headers=self.headers)
+        assert rv.status_code == 404
+        assert 'X-Cache' not in rv.headers
+
+        self.app.config['RESPONSE_CACHE_TIMEOUT'] = 0
+        responses.init_app(self.app)
+        rv = self.client.get('/api/v1/folders', headers=self.headers)
+        assert 'X-Cache' not in rv.headers
+
+    def test_unexpected_entry_is_a_miss(self):
+        """Test that entries in another format are rebuilt, not served."""
+        with self.app.test_request_context('/api/v1/folders'):
+            key = responses.key(['folders', 'users'], 'ADMIN')
+        responses.cache.set(key, (b'{}', 'application/json'))
+        assert self.get('/api/v1/folders')[0] == 'MISS'
+        assert self.get('/api/v1/folders')[0] == 'HIT'
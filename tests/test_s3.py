@@ -0,0 +1,249 @@
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import boto3
+import requests
+from botocore.exceptions import ClientError
+from flask import Flask
+from moto import mock_aws
+
+from api import db, aws_wrapper
+from cli.database import orphaned_keys
+from database.models import File, Folder
+from utils.aws_wrapper import AWSWrapper
+from tests.base_test_case import BaseTestCase
+
+
+class S3Tests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.mock_aws = mock_aws()
+        self.mock_aws.start()
+        app = Flask(__name__)
+        app.config.update(AWS_BUCKET='arctic-fox', AWS_REGION='us-east-1',
+                          AWS_ACCESS_KEY_ID='testing',
+                          AWS_SECRET_ACCESS_KEY='testing',
+                          S3_DELETE_WORKERS=2,
+                          S3_MULTIPART_THRESHOLD=5 * 1024 * 1024,
+                          S3_MULTIPART_CHUNKSIZE=5 * 1024 * 1024,
+                          S3_MAX_CONCURRENCY=2)
+        self.aws_wrapper = AWSWrapper()
+        self.aws_wrapper.init_app(app)
+        self.s3 = boto3.client('s3', region_name='us-east-1',
+                               aws_access_key_id='testing',
+                               aws_secret_access_key='testing')
+        self.s3.create_bucket(Bucket='arctic-fox')
+        self.keys = [f'uploads/{i:04}.png' for i in range(2100)]
+
+    def put_keys(self):
+        """Store an empty object at each of the test keys."""
+        for key in self.keys:
+            self.s3.put_object(Bucket='arctic-fox', Key=key, Body=b'')
+
+    def write_file(self, size: int) -> str:
+        """Write a temporary file of random bytes and return its path."""
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(os.urandom(size))
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def tearDown(self):
+        self.mock_aws.stop()
+        super().tearDown()
+
+    def test_iter_keys_pages(self):
+        """Test that listing keys goes past the first 1000."""
+        self.put_keys()
+        assert sorted(self.aws_wrapper.iter_keys()) == self.keys
+        assert len(self.aws_wrapper.list_uploaded_files()) == 2100
+        assert list(self.aws_wrapper.iter_keys(modified_before=datetime.now(
+            timezone.utc) - timedelta(hours=1))) == []
+
+    def test_delete_many(self):
+        """Test that keys are deleted in batches of 1000."""
+        self.put_keys()
+        with mock.patch.object(
+                self.aws_wrapper.s3_client, 'delete_objects',
+                wraps=self.aws_wrapper.s3_client.delete_objects) as delete:
+            errors = self.aws_wrapper.delete_many(self.aws_wrapper.iter_keys())
+        assert errors == {}
+        assert delete.call_count == 3
+        assert list(self.aws_wrapper.iter_keys()) == []
+
+    def test_delete_many_errors(self):
+        """Test that a failed request reports an error for each of its keys."""
+        self.put_keys()
+        delete_objects = self.aws_wrapper.s3_client.delete_objects
+
+        def fail_first_batch(**kwargs):
+            if kwargs['Delete']['Objects'][0]['Key'] == self.keys[0]:
+                raise ClientError({'Error': {'Code': 'SlowDown',
+                                             'Message': 'Slow down'}},
+                                  'DeleteObjects')
+            return delete_objects(**kwargs)
+
+        with mock.patch.object(self.aws_wrapper.s3_client, 'delete_objects',
+                               side_effect=fail_first_batch):
+            errors = self.aws_wrapper.delete_many(self.keys)
+        assert sorted(errors) == self.keys[:1000]
+        assert sorted(self.aws_wrapper.iter_keys()) == self.keys[:1000]
+
+    def test_orphaned_keys(self):
+        """Test that keys with a file record are not orphaned."""
+        self.put_keys()
+        folder = Folder(name='folder', created_by=self.user.id)
+        db.session.add(folder)
+        db.session.flush()
+        db.session.add_all([
+            File(filename=key, mimetype='image/png', created_by=self.user.id,
+                 folder_id=folder.id) for key in self.keys[::2]])
+        db.session.commit()
+        assert list(orphaned_keys(self.aws_wrapper.iter_keys())) == \
+            self.keys[1::2]
+
+    def test_multipart_upload(self):
+        """Test that large files are uploaded in parts with progress."""
+        path = self.write_file(12 * 1024 * 1024)
+        progress = []
+        with mock.patch.object(
+                self.aws_wrapper.s3_client, 'upload_part',
+                wraps=self.aws_wrapper.s3_client.upload_part) as upload_part:
+            self.aws_wrapper.upload_file_to_s3(path, 'large.bin',
+                                               callback=progress.append)
+        assert upload_part.call_count == 3
+        assert sum(progress) == 12 * 1024 * 1024
+        with open(path, 'rb') as f:
+            assert self.s3.get_object(
+                Bucket='arctic-fox', Key='large.bin')['Body'].read() == f.read()
+
+    def test_resume_multipart_upload(self):
+        """Test that a failed upload resumes from its uploaded parts."""
+        path = self.write_file(12 * 1024 * 1024)
+        upload_part = self.aws_wrapper.s3_client.upload_part
+
+        def fail_second_part(**kwargs):
+            if kwargs['PartNumber'] == 2:
+                raise ClientError({'Error': {'Code': 'InternalError',
+                                             'Message': 'Try again'}},
+                                  'UploadPart')
+            return upload_part(**kwargs)
+
+        with mock.patch.object(self.aws_wrapper.s3_client, 'upload_part',
+                               side_effect=fail_second_part):
+            with self.assertRaises(ClientError):
+                self.aws_wrapper.upload_file_to_s3(path, 'large.bin')
+
+        progress = []
+        with mock.patch.object(self.aws_wrapper.s3_client, 'upload_part',
+                               wraps=upload_part) as resumed_upload_part:
+            self.aws_wrapper.upload_file_to_s3(path, 'large.bin',
+                                               callback=progress.append)
+        assert [call.kwargs['PartNumber']
+                for call in resumed_upload_part.call_args_list] == [2]
+        assert sum(progress) == 12 * 1024 * 1024
+        with open(path, 'rb') as f:
+            assert self.s3.get_object(
+                Bucket='arctic-fox', Key='large.bin')['Body'].read() == f.read()
+        assert 'Uploads' not in self.s3.list_multipart_uploads(
+            Bucket='arctic-fox')
+
+    def test_resume_keeps_recent_uploads(self):
+        """Test that uploads of other workers are kept, on every page."""
+        path = self.write_file(12 * 1024 * 1024)
+        other = self.s3.create_multipart_upload(
+            Bucket='arctic-fox', Key='large.bin')['UploadId']
+        self.s3.upload_part(Bucket='arctic-fox', Key='large.bin',
+                            UploadId=other, PartNumber=1,
+                            Body=os.urandom(5 * 1024 * 1024))
+        with open(path, 'rb') as f:
+            upload = self.s3.create_multipart_upload(
+                Bucket='arctic-fox', Key='large.bin')['UploadId']
+            self.s3.upload_part(Bucket='arctic-fox', Key='large.bin',
+                                UploadId=upload, PartNumber=1,
+                                Body=f.read(5 * 1024 * 1024))
+
+        # moto dates every upload in 2010 and returns them in one page
+        self.aws_wrapper.multipart_abort_age = 100 * 365 * 24 * 60 * 60
+        get_paginator = self.aws_wrapper.s3_client.get_paginator
+
+        def one_upload_per_page(name):
+            paginator = get_paginator(name)
+            if name != 'list_multipart_uploads':
+                return paginator
+            pages = mock.Mock()
+            pages.paginate = lambda **kwargs: [
+                {'Uploads': [upload]}
+                for page in paginator.paginate(**kwargs)
+                for upload in page.get('Uploads', [])]
+            return pages
+
+        with mock.patch.object(self.aws_wrapper.s3_client, 'get_paginator',
+                               side_effect=one_upload_per_page), \
+                mock.patch.object(self.aws_wrapper.s3_client, 'upload_part',
+                                  wraps=self.aws_wrapper.s3_client.upload_part
+                                  ) as upload_part:
+            self.aws_wrapper.upload_file_to_s3(path, 'large.bin')
+        assert [call.kwargs['PartNumber']
+                for call in upload_part.call_args_list] == [2, 3]
+        uploads = self.s3.list_multipart_uploads(Bucket='arctic-fox')
+        assert [upload['UploadId'] for upload in uploads['Uploads']] == \
+            [other]
+
+        self.aws_wrapper.multipart_abort_age = 24 * 60 * 60
+        assert self.aws_wrapper.find_multipart_upload(
+            'large.bin', memoryview(b''), []) == (None, {})
+        assert 'Uploads' not in self.s3.list_multipart_uploads(
+            Bucket='arctic-fox')
+
+    def test_presigned_multipart_upload(self):
+        """Test uploading parts to presigned URLs and completing the upload."""
+        aws_wrapper.init_app(self.app)
+        rv = self.client.post('/api/v1/files/multipart', json={
+            'filename': 'video.mp4', 'size': 12 * 1024 * 1024},
+            headers=self.headers)
+        assert rv.status_code == 201
+        assert rv.json['key'] == 'video.mp4'
+        assert [part['part_number'] for part in rv.json['parts']] == [1, 2]
+
+        data = os.urandom(12 * 1024 * 1024)
+        part_size = rv.json['part_size']
+        parts = []
+        for part in rv.json['parts']:
+            start = (part['part_number'] - 1) * part_size
+            response = requests.put(part['url'],
+                                    data=data[start:start + part_size])
+            assert response.status_code == 200
+            parts.append({'part_number': part['part_number'],
+                          'etag': response.headers['ETag']})
+
+        rv = self.client.post('/api/v1/files/multipart/complete', json={
+            'key': rv.json['key'], 'upload_id': rv.json['upload_id'],
+            'parts': parts[::-1]}, headers=self.headers)
+        assert rv.status_code == 204
+        assert self.s3.get_object(
+            Bucket='arctic-fox', Key='video.mp4')['Body'].read() == data
+
+        upload = aws_wrapper.create_multipart_upload('other.mp4')
+        rv = self.client.post('/api/v1/files/multipart/complete', json={
+            **upload, 'parts': parts}, headers=self.headers)
+        assert rv.status_code == 400
+
+    def test_clients_created_on_first_use(self):
+        """Test that AWS clients are only created when first used."""
+        assert self.aws_wrapper.clients == {}
+        assert self.aws_wrapper.pool_stats()['s3']['created'] is False
+        self.aws_wrapper.ping_s3_bucket()
+        assert set(self.aws_wrapper.clients) == {'session', 's3'}
+        client = self.aws_wrapper.s3_client
+        assert client.meta.config.max_pool_connections == 10
+        assert client.meta.config.retries['mode'] == 'adaptive'
+        assert self.aws_wrapper.pool_stats()['s3'] == {
+            'created': True, 'max_pool_connections': 10}
+
+        rv = self.client.get('/health/pools', headers=self.headers)
+        assert rv.status_code == 200
+        assert rv.json['s3']['max_pool_connections'] == 10
+        assert rv.json['rekognition']['created'] is False
@@ -0,0 +1,165 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+from api import db, storage
+from api.app import rd
+from database.models import File, Folder
+from utils.image_analysis import analyze_image
+from utils.storage import LocalStorage, StorageBackend
+from tests.base_test_case import BaseTestCase
+
+
+class LocalStorageTests(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.app.config.update(STORAGE_BACKEND='local',
+                               LOCAL_STORAGE_ROOT=self.root,
+                               LOCAL_STORAGE_URL='http://localhost:5000/storage')
+        storage.init_app(self.app)
+
+    def tearDown(self):
+        for key in rd.scan_iter(match='preview_url:*'):
+            rd.delete(key)
+        super().tearDown()
+
+    def get(self, url: str, **kwargs):
+        """Send a GET request to an absolute URL of the app."""
+        url = urlsplit(url)
+        return self.client.get(url.path, query_string=url.query, **kwargs)
+
+    def test_put_list_delete(self):
+        """Test storing, listing and deleting files on disk."""
+        assert isinstance(storage.backend, LocalStorage)
+        progress = []
+        storage.put('b/2.png', io.BytesIO(b'2' * 10), callback=progress.append)
+        storage.put('a.png', io.BytesIO(b'1'))
+        storage.put('b/1.png', io.BytesIO(b''))
+        with open(f'{self.root}/b/.partial', 'wb'):
+            pass
+
+        assert progress == [10]
+        assert list(storage.iter_keys()) == ['a.png', 'b/1.png', 'b/2.png']
+        assert list(storage.iter_keys('b/')) == ['b/1.png', 'b/2.png']
+        with storage.open('b/2.png') as f:
+            assert f.read() == b'2' * 10
+        with self.assertRaises(ValueError):
+            storage.put('../escape.png', io.BytesIO(b''))
+        with self.assertRaises(ValueError):
+            storage.download('b/2.png', io.BytesIO(), max_bytes=9)
+
+        assert storage.delete_many(['a.png', 'b/2.png', 'missing.png']) == {}
+        assert list(storage.iter_keys()) == ['b/1.png']
+
+    def test_presigned_post_and_download(self):
+        """Test uploading with a presigned POST and serving byte ranges."""
+        rv = self.client.post('/api/v1/files/pre', json={
+            'filename': 'video.mp4'}, headers=self.headers)
+        assert rv.status_code == 201
+        post = rv.json
+        data = bytes(range(256)) * 4
+
+        rv = self.client.post(urlsplit(post['url']).path, data={
+            **post['fields'], 'file': (io.BytesIO(data), 'video.mp4')})
+        assert rv.status_code == 204
+        rv = self.client.post(urlsplit(post['url']).path, data={
+            **post['fields'], 'key': 'other.mp4',
+            'file': (io.BytesIO(data), 'video.mp4')})
+        assert rv.status_code == 403
+
+        url = storage.generate_presigned_url('video.mp4')
+        rv = self.get(url)
+        assert rv.status_code == 200
+        assert rv.mimetype == 'video/mp4'
+        assert rv.data == data
+        assert rv.headers['X-Content-Type-Options'] == 'nosniff'
+        assert rv.headers['Content-Disposition'] == 'inline; filename=video.mp4'
+        rv = self.get(url, headers={'Range': 'bytes=100-199'})
+        assert rv.status_code == 206
+        assert rv.headers['Content-Range'] == 'bytes 100-199/1024'
+        assert rv.data == data[100:200]
+
+        assert self.get(url.replace('signature=', 'signature=0')
+                        ).status_code == 403
+        assert self.get(storage.generate_presigned_url('video.mp4', -1)
+                        ).status_code == 403
+        assert self.get(storage.generate_presigned_url('missing.mp4')
+                        ).status_code == 404
+
+    def test_incomplete_backend(self):
+        """Test that backends must implement the whole interface."""
+        class ReadOnlyStorage(StorageBackend):
+            def open(self, key):
+                return io.BytesIO()
+
+        with self.assertRaises(TypeError):
+            ReadOnlyStorage()
+
+    def test_active_content_downloaded(self):
+        """Test that files other than media aren't rendered by browsers."""
+        for key in ('page.html', 'image.svg'):
+            storage.put(key, io.BytesIO(b'<script>alert(1)</script>'))
+            rv = self.get(storage.generate_presigned_url(key))
+            assert rv.status_code == 200
+            assert rv.mimetype == 'application/octet-stream'
+            assert rv.headers['Content-Disposition'] == \
+                f'attachment; filename={key}'
+            assert rv.headers['X-Content-Type-Options'] == 'nosniff'
+
+    def test_preview_url_serves_image(self):
+        """Test that file previews are served and analyzed from the disk."""
+        image = io.BytesIO()
+        Image.new('RGB', (64, 64), (0, 0, 255)).save(image, 'PNG')
+        storage.put('blue.png', io.BytesIO(image.getvalue()))
+        folder = Folder(name='folder', created_by=self.user.id)
+        db.session.add(folder)
+        db.session.flush()
+        file = File(filename='blue.png', mimetype='image/png',
+                    created_by=self.user.id, folder_id=folder.id)
+        db.session.add(file)
+        db.session.commit()
+
+        rv = self.client.get(f'/api/v1/files/{file.id}', headers=self.headers)
+        assert rv.status_code == 200
+        rv = self.get(rv.json['preview_url'])
+        assert rv.status_code == 200
+        assert rv.data == image.getvalue()
+        assert analyze_image(storage.local_path('blue.png'), 256,
+                             100_000_000) == '#0404fc'
+
+    def test_reconcile_skips_recent_uploads(self):
+        """Test that only old orphaned files are deleted, and when asked."""
+        for key in ('old.png', 'recent.png', 'known.png'):
+            storage.put(key, io.BytesIO(b''))
+        past = time.time() - 2 * 24 * 60 * 60
+        for key in ('old.png', 'known.png'):
+            os.utime(storage.local_path(key), (past, past))
+        folder = Folder(name='folder', created_by=self.user.id)
+        db.session.add(folder)
+        db.session.flush()
+        db.session.add(File(filename='known.png', mimetype='image/png',
+                            created_by=self.user.id, folder_id=folder.id))
+        db.session.commit()
+
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['database', 'reconcile'])
+        assert result.exit_code == 0, result.output
+        assert result.output.splitlines()[0] == 'old.png'
+        assert 'recent.png' not in result.output
+        assert list(storage.iter_keys()) == ['known.png', 'old.png',
+                                             'recent.png']
+
+        result = runner.invoke(args=['database', 'reconcile', '--yes'])
+        assert result.exit_code == 0, result.output
+        assert list(storage.iter_keys()) == ['known.png', 'recent.png']
+        result = runner.invoke(args=['database', 'reconcile', '--yes',
+                                     '--min-age', '0'])
+        assert list(storage.iter_keys()) == ['known.png']
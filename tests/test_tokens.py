@@ -0,0 +1,167 @@
+import pickle
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import rsa
+from google.auth import crypt, jwt
+
+import api.token
+from api.app import cache, token_redis, google_verifier
+from api.token import Token
+from utils.google_certs import (GoogleCertCache, GoogleTokenVerifier,
+                                LocalCertProvider)
+from database.models import User
+from tests.base_test_case import BaseTestCase
+
+
+class PickledToken:
+    pass
+
+
+PickledToken.__module__, PickledToken.__qualname__ = 'api.token', 'Token'
+
+
+class TokenTests(BaseTestCase):
+
+    def test_token_saved_with_ttl(self):
+        """Test that a token is stored with a TTL and indexed by user."""
+        token = Token(self.user.id)
+        assert 0 < token_redis.ttl(Token.key(token.access_token))
+        assert token_redis.sismember(Token.user_key(self.user.id),
+                                     token.access_token)
+        assert Token.from_jwt(token.access_token_jwt).user_id == self.user.id
+        assert User.verify_access_token(token.access_token_jwt) == self.user
+
+    def test_expire_token(self):
+        """Test that expiring a token shortens its TTL."""
+        token = Token(self.user.id)
+        token.expire(delay=5)
+        assert token_redis.ttl(Token.key(token.access_token)) <= 5
+
+    def test_revoke_all(self):
+        """Test revoking the tokens of one user only."""
+        tokens = [Token(self.user.id) for _ in range(3)]
+        other = Token(self.user.id + 2)
+
+        Token.revoke_all(self.user.id)
+        for token in tokens:
+            assert not token_redis.exists(Token.key(token.access_token))
+        assert not token_redis.exists(Token.user_key(self.user.id))
+        assert token_redis.exists(Token.key(other.access_token))
+
+    def test_sweep(self):
+        """Test that expired tokens are removed from the user indexes."""
+        user_id = self.user.id + 1
+        Token.revoke_all(user_id)
+        token = Token(user_id)
+        expired = Token(user_id)
+        token_redis.delete(Token.key(expired.access_token))
+
+        cursor, removed = Token.sweep(count=10)
+        while cursor:
+            cursor, batch_removed = Token.sweep(cursor, count=10)
+            removed += batch_removed
+        assert removed >= 1
+        assert token_redis.smembers(Token.user_key(user_id)) == \
+            {token.access_token.encode()}
+
+    def test_token_record(self):
+        """Test that tokens round trip through their MessagePack record."""
+        token = Token(self.user.id)
+        data = token_redis.get(Token.key(token.access_token))
+        assert len(data) < 128
+        loaded = Token.loads(data)
+        for attr in Token.__slots__:
+            assert getattr(loaded, attr) == getattr(token, attr)
+        assert isinstance(loaded.access_expiration, int)
+
+    def cache_legacy_token(self, access_token: str,
+                           refresh_expiration: datetime) -> None:
+        """Save a token in the app cache as earlier releases did."""
+        legacy = PickledToken()
+        legacy.user_id = self.user.id
+        legacy.access_token = access_token
+        legacy.access_expiration = datetime.utcnow() + timedelta(minutes=15)
+        legacy.refresh_token = 'refresh'
+        legacy.refresh_expiration = refresh_expiration
+        api.token.Token = PickledToken
+        try:
+            data = pickle.dumps(legacy)
+        finally:
+            api.token.Token = Token
+        cache.set(f'token:{access_token}', data, timeout=60)
+
+    def test_read_legacy_token(self):
+        """Test that tokens cached by earlier releases become records."""
+        self.cache_legacy_token('legacy', datetime.utcnow() + timedelta(days=1))
+
+        token = Token.from_access_token('legacy')
+        assert token.user_id == self.user.id
+        assert token.refresh_token == 'refresh'
+        assert time.time() < token.access_expiration < time.time() + 16 * 60
+        assert cache.get('token:legacy') is None
+        assert Token.loads(token_redis.get(Token.key('legacy'))).user_id == \
+            self.user.id
+        assert token_redis.sismember(Token.user_key(self.user.id), 'legacy')
+
+        self.cache_legacy_token('expired', datetime.utcnow())
+        with self.assertRaises(ValueError):
+            Token.from_access_token('expired')
+        assert cache.get('token:expired') is None
+
+    def test_google_login(self):
+        """Test logging in with a locally minted Google ID token."""
+        public_key, private_key = rsa.newkeys(1024)
+        provider = google_verifier.provider
+        google_verifier.provider = LocalCertProvider(
+            {'local': public_key.save_pkcs1().decode()})
+        self.app.config.update(DISABLE_AUTH=False, GOOGLE_CLIENT_ID='client')
+        signer = crypt.RSASigner.from_string(
+            private_key.save_pkcs1().decode(), key_id='local')
+        now = int(time.time())
+        claims = {'iss': 'https://accounts.google.com', 'aud': 'client',
+                  'iat': now, 'exp': now + 300, 'email': self.user.email,
+                  'name': 'Test User', 'picture': 'https://example.com/a.png'}
+        try:
+            credential = jwt.encode(signer, claims).decode()
+            rv = self.client.post('/api/v1/tokens', headers={
+                'Authorization': f'Bearer {credential}'})
+            assert rv.status_code == 200
+            assert Token.from_jwt(rv.json['access_token']).user_id == \
+                self.user.id
+            assert self.user.activated
+
+            credential = jwt.encode(
+                signer, {**claims, 'aud': 'other'}).decode()
+            rv = self.client.post('/api/v1/tokens', headers={
+                'Authorization': f'Bearer {credential}'})
+            assert rv.status_code == 401
+        finally:
+            google_verifier.provider = provider
+
+    def test_google_cert_refresh_rate_limited(self):
+        """Test that unknown key IDs can't force a fetch on every login."""
+        public_key, private_key = rsa.newkeys(512)
+        certs = GoogleCertCache('https://certs.example.com',
+                                min_refresh_interval=60)
+        response = mock.Mock(headers={'Cache-Control': 'max-age=3600'})
+        response.json.return_value = {
+            'known': public_key.save_pkcs1().decode()}
+        verifier = GoogleTokenVerifier()
+        verifier.provider = certs
+        signer = crypt.RSASigner.from_string(
+            private_key.save_pkcs1().decode(), key_id='unknown')
+        credential = jwt.encode(signer, {'iss': 'accounts.google.com'})
+
+        with mock.patch.object(certs.session, 'get',
+                               return_value=response) as get:
+            for _ in range(3):
+                with self.assertRaises(ValueError):
+                    verifier.verify(credential)
+            assert get.call_count == 1
+
+            certs.fetched_at -= 60
+            with self.assertRaises(ValueError):
+                verifier.verify(credential)
+            assert get.call_count == 2
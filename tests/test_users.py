@@ -58,7 +58,13 @@ class UserTests(BaseTestCase):
         headers = {'Authorization': f'Bearer {access_token}'}
         rv = self.client.get('/api/v1/users', headers=self.headers)
         assert rv.status_code == 200
-        assert isinstance(rv.json, list)
+        assert isinstance(rv.json['data'], list)
+        assert rv.json['pagination']['count'] == 2
+
+        rv = self.client.get('/api/v1/users?role=VIEWER', headers=self.headers)
+        assert rv.status_code == 200
+        assert [user['email'] for user in rv.json['data']] == \
+            ['testuser@example.com']
 
     def test_get_user_by_id(self):
         """Test retrieving a user by id."""
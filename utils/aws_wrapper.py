@@ -1,17 +1,67 @@
 import os
+import hmac
+import hashlib
+import logging
+import mmap
+import shutil
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from flask import Flask
 from dotenv import load_dotenv
-from colorthief import ColorThief
-from io import BytesIO
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
+from threading import Lock
+from tempfile import SpooledTemporaryFile
+from urllib.parse import quote, urlsplit
 
-from typing import Any
+from utils.dominant_color import get_dominant_color
+from utils.multipart import MappedPart, get_part_ranges, get_part_size
+from utils.storage import StorageBackend
 
+from typing import IO, Any, Callable, Iterable, Iterator
 
-class AWSWrapper:
+DELETE_BATCH_SIZE = 1000
+
+
+@lru_cache(maxsize=8)
+def derive_signing_key(secret_key: str, datestamp: str, region: str,
+                       service: str = 's3') -> bytes:
+    """Derive the SigV4 signing key for a day, region and service.
+
+    :param secret_key: The AWS secret access key.
+    :param datestamp: The signing date as ``YYYYMMDD``.
+    :param region: The AWS region.
+    :param service: The AWS service name.
+
+    :return: The signing key.
+    """
+    key = f'AWS4{secret_key}'.encode()
+    for part in (datestamp, region, service, 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+class AWSWrapper(StorageBackend):
+    """Access to the S3 bucket and Rekognition.
+
+    The bucket is the default storage backend, keyed by S3 key.
+
+    The boto3 session and clients are created on first use, in each process,
+    so processes that never call AWS don't pay for loading botocore. Once
+    created, a client is shared by all the threads of its process, with a
+    connection pool of ``AWS_MAX_POOL_CONNECTIONS``, adaptive retries and TCP
+    keepalive.
+    """
 
     def __init__(self) -> None:
         self.initialized = False
+        self.lock = Lock()
+        self.clients = {}
+        self.pid = None
 
     def init_app(self, app: Flask):
         """Initialize the AWSWrapper with app configuration.
@@ -19,16 +69,99 @@ class AWSWrapper:
         :param app: The Flask application instance.
         """
         self.aws_bucket = app.config['AWS_BUCKET']
-        self.s3_client = boto3.client(
-            's3', aws_access_key_id=app.config['AWS_ACCESS_KEY_ID'],
-            aws_secret_access_key=app.config['AWS_SECRET_ACCESS_KEY'],
-            region_name=app.config['AWS_REGION'])
-        self.rekognition_client = boto3.client(
-            'rekognition', aws_access_key_id=app.config['AWS_ACCESS_KEY_ID'],
-            aws_secret_access_key=app.config['AWS_SECRET_ACCESS_KEY'],
-            region_name=app.config['AWS_REGION'])
+        self.aws_region = app.config['AWS_REGION']
+        self.aws_access_key_id = app.config['AWS_ACCESS_KEY_ID']
+        self.aws_secret_access_key = app.config['AWS_SECRET_ACCESS_KEY']
+        self.endpoint_url = app.config.get('AWS_ENDPOINT_URL') or None
+        self.delete_workers = app.config.get('S3_DELETE_WORKERS', 8)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=app.config.get(
+                'S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+            multipart_chunksize=app.config.get(
+                'S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024),
+            max_concurrency=app.config.get('S3_MAX_CONCURRENCY', 10),
+            use_threads=app.config.get('S3_USE_THREADS', True))
+        self.multipart_abort_age = app.config.get(
+            'S3_MULTIPART_ABORT_AGE', 24 * 60 * 60)
+        self.client_config = Config(
+            max_pool_connections=app.config.get('AWS_MAX_POOL_CONNECTIONS')
+            or max(10, self.delete_workers,
+                   self.transfer_config.max_concurrency,
+                   app.config.get('IMAGE_ANALYSIS_IO_SLOTS', 0)),
+            retries={'mode': 'adaptive',
+                     'max_attempts': app.config.get('AWS_MAX_ATTEMPTS', 5)},
+            tcp_keepalive=True)
+        self.dominant_color_size = app.config.get('DOMINANT_COLOR_SIZE', 256)
+        self.dominant_color_max_pixels = app.config.get(
+            'DOMINANT_COLOR_MAX_PIXELS', 100_000_000)
+        self.dominant_color_max_bytes = app.config.get(
+            'DOMINANT_COLOR_MAX_BYTES', 64 * 1024 * 1024)
+        with self.lock:
+            self.clients = {}
+            self.pid = None
+        self._credentials = None
         self.initialized = True
 
+    def get_client(self, service: str) -> Any:
+        """Return the client of an AWS service, creating it on first use.
+
+        :param service: The service name, ``s3`` or ``rekognition``.
+
+        :return: The boto3 client of this process.
+        """
+        client = self.clients.get(service)
+        if client is not None and self.pid == os.getpid():
+            return client
+        with self.lock:
+            if self.pid != os.getpid():
+                self.clients = {'session': boto3.session.Session(
+                    aws_access_key_id=self.aws_access_key_id,
+                    aws_secret_access_key=self.aws_secret_access_key,
+                    region_name=self.aws_region)}
+                self.pid = os.getpid()
+            if service not in self.clients:
+                config = self.client_config
+                if service == 's3':
+                    config = config.merge(Config(signature_version='s3v4'))
+                self.clients[service] = self.clients['session'].client(
+                    service, config=config, endpoint_url=self.endpoint_url)
+            return self.clients[service]
+
+    @property
+    def session(self) -> boto3.session.Session:
+        """The boto3 session of this process."""
+        return self.get_client('session')
+
+    @property
+    def s3_client(self) -> Any:
+        """The S3 client of this process."""
+        return self.get_client('s3')
+
+    @property
+    def rekognition_client(self) -> Any:
+        """The Rekognition client of this process."""
+        return self.get_client('rekognition')
+
+    @property
+    def credentials(self) -> Any:
+        """The credentials the S3 client signs requests with, if any."""
+        if self._credentials is None:
+            self._credentials = self.session.get_credentials() or False
+        return self._credentials or None
+
+    def pool_stats(self) -> dict[str, dict[str, Any]]:
+        """Return the connection pools of the clients of this process.
+
+        botocore has no public API for the connections of its pools, so only
+        the configured pool size is reported.
+
+        :return: Whether each client was created, and its pool size.
+        """
+        return {service: {
+            'created': self.pid == os.getpid() and service in self.clients,
+            'max_pool_connections': self.client_config.max_pool_connections,
+        } for service in ('s3', 'rekognition')}
+
     def ping_s3_bucket(self) -> None:
         """Ping S3 bucket.
 
@@ -36,56 +169,276 @@ class AWSWrapper:
         self.s3_client.list_objects_v2(Bucket=self.aws_bucket, MaxKeys=1)
 
     def upload_file_object_to_s3(self, folder: str, file_object: object,
-                                 s3_key: str) -> None:
+                                 s3_key: str,
+                                 callback: Callable[[int], None]|None = None
+                                 ) -> None:
         """Uploads a file-like object to an S3 bucket.
 
+        Large objects are uploaded in parts, as set by the transfer config.
+
         :param file_object: A file-like object to upload.
         :param s3_key: The S3 key (filename) where the file will be stored.
+        :param callback: Called with the number of bytes sent after each
+            chunk.
 
         :return: None if successful, otherwise an error description.
         """
         if folder:
             s3_key = f'{folder}/{s3_key}'
 
-        self.s3_client.upload_fileobj(file_object, self.aws_bucket, s3_key)
+        self.s3_client.upload_fileobj(file_object, self.aws_bucket, s3_key,
+                                      Config=self.transfer_config,
+                                      Callback=callback)
+
+    def put(self, key: str, file_object: IO[bytes],
+            callback: Callable[[int], None]|None = None) -> None:
+        self.upload_file_object_to_s3('', file_object, key, callback)
+
+    def open(self, key: str) -> IO[bytes]:
+        return self.get_s3_object(key)['Body']
+
+    def download(self, key: str, file_object: IO[bytes],
+                 max_bytes: int|None = None) -> None:
+        self.download_file_object_from_s3(key, file_object, max_bytes)
+
+    def iter_keys(self, prefix: str = '',
+                  modified_before: datetime|None = None) -> Iterator[str]:
+        """Iterate over the keys of the S3 bucket, one page at a time.
+
+        :param prefix: Only list the keys that start with this prefix.
+        :param modified_before: Only list the objects last modified before
+            this aware datetime.
+
+        :return: An iterator over the keys.
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.aws_bucket, Prefix=prefix):
+            for content in page.get('Contents', []):
+                if modified_before is None or \
+                        content['LastModified'] < modified_before:
+                    yield content['Key']
 
     def list_uploaded_files(self) -> list:
         """List files in the S3 bucket.
 
         :return: List of files if successful, otherwise an error description.
         """
-        response = self.s3_client.list_objects_v2(Bucket=self.aws_bucket)
-        files = []
-        if 'Contents' in response:
-            files = [content['Key'] for content in response['Contents']]
-        return files
+        return list(self.iter_keys())
 
-    def upload_file_to_s3(self, file_path: str, s3_key: str) -> None:
+    def upload_file_to_s3(self, file_path: str, s3_key: str,
+                          callback: Callable[[int], None]|None = None) -> None:
         """Upload a file to S3.
 
+        Files over the multipart threshold are memory-mapped and uploaded in
+        parts, concurrently if the transfer config uses threads. If an upload
+        fails, its parts are kept so that uploading the same file to the same
+        key again resumes it.
+
         :param local_file_path: The local file path.
+        :param callback: Called with the number of bytes sent after each
+            part, and first with the bytes already sent if resuming.
         """
-        with open(file_path, 'rb') as f:
-            self.s3_client.upload_fileobj(f, self.aws_bucket, s3_key)
+        size = os.path.getsize(file_path)
+        if size < self.transfer_config.multipart_threshold:
+            with open(file_path, 'rb') as f:
+                self.s3_client.upload_fileobj(
+                    f, self.aws_bucket, s3_key, Config=self.transfer_config,
+                    Callback=callback)
+            return
+
+        part_size = get_part_size(
+            size, self.transfer_config.multipart_chunksize)
+        with open(file_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                self.upload_parts(view, s3_key, part_size, callback)
+            finally:
+                view.release()
+
+    def upload_parts(self, view: memoryview, s3_key: str, part_size: int,
+                     callback: Callable[[int], None]|None = None) -> None:
+        """Upload a memory-mapped file in parts, resuming a previous upload.
+
+        :param view: The contents of the file.
+        :param s3_key: The S3 key (filename) where the file will be stored.
+        :param part_size: The size of the parts in bytes.
+        :param callback: Called with the number of bytes sent after each part.
+        """
+        ranges = get_part_ranges(len(view), part_size)
+        upload_id, etags = self.find_multipart_upload(s3_key, view, ranges)
+        if upload_id is None:
+            upload_id = self.s3_client.create_multipart_upload(
+                Bucket=self.aws_bucket, Key=s3_key)['UploadId']
+        elif callback and etags:
+            callback(sum(end - start for number, start, end in ranges
+                         if number in etags))
+
+        def upload_part(number: int, start: int, end: int) -> None:
+            with MappedPart(view[start:end]) as body:
+                etags[number] = self.s3_client.upload_part(
+                    Bucket=self.aws_bucket, Key=s3_key, UploadId=upload_id,
+                    PartNumber=number, Body=body)['ETag']
+            if callback:
+                callback(end - start)
+
+        missing = [part for part in ranges if part[0] not in etags]
+        if self.transfer_config.use_threads:
+            with ThreadPoolExecutor(
+                    self.transfer_config.max_concurrency) as executor:
+                for future in [executor.submit(upload_part, *part)
+                               for part in missing]:
+                    future.result()
+        else:
+            for part in missing:
+                upload_part(*part)
+
+        self.complete_multipart_upload(
+            s3_key, upload_id,
+            [{'part_number': number, 'etag': etags[number]}
+             for number, _, _ in ranges])
+
+    def find_multipart_upload(self, s3_key: str, view: memoryview,
+                              ranges: list[tuple[int, int, int]]
+                              ) -> tuple[str|None, dict[int, str]]:
+        """Find an unfinished upload of a file to resume.
+
+        Uploaded parts are only kept if their size and MD5 match the part of
+        the file at the same position. Uploads with parts that don't match
+        belong to another file or part size, and are aborted once they are
+        ``S3_MULTIPART_ABORT_AGE`` seconds old. Younger ones may still be in
+        progress in another worker.
+
+        :param s3_key: The S3 key (filename) of the upload.
+        :param view: The contents of the file.
+        :param ranges: The parts of the file.
+
+        :return: The upload ID, or None if there is nothing to resume, and
+            the ETags of the uploaded parts keyed by part number.
+        """
+        paginator = self.s3_client.get_paginator('list_multipart_uploads')
+        uploads = [upload for page in paginator.paginate(
+                       Bucket=self.aws_bucket, Prefix=s3_key)
+                   for upload in page.get('Uploads', [])
+                   if upload['Key'] == s3_key]
+        uploads.sort(key=lambda upload: upload['Initiated'], reverse=True)
+        abort_before = datetime.now(timezone.utc) - timedelta(
+            seconds=self.multipart_abort_age)
+        parts = {number: (start, end) for number, start, end in ranges}
+
+        def matching_etags(upload_id: str) -> dict[int, str]|None:
+            etags = {}
+            paginator = self.s3_client.get_paginator('list_parts')
+            for page in paginator.paginate(Bucket=self.aws_bucket, Key=s3_key,
+                                           UploadId=upload_id):
+                for part in page.get('Parts', []):
+                    start, end = parts.get(part['PartNumber'], (0, -1))
+                    if part['Size'] != end - start or part['ETag'].strip('"') \
+                            != hashlib.md5(view[start:end]).hexdigest():
+                        return None
+                    etags[part['PartNumber']] = part['ETag']
+            return etags
+
+        for upload in uploads:
+            etags = matching_etags(upload['UploadId'])
+            if etags is not None:
+                logging.info(f'Resuming upload of {s3_key} with '
+                             f'{len(etags)}/{len(ranges)} parts uploaded')
+                return upload['UploadId'], etags
+            if upload['Initiated'] <= abort_before:
+                self.abort_multipart_upload(s3_key, upload['UploadId'])
+        return None, {}
+
+    def create_multipart_upload(self, filename: str, folder: str = ''
+                                ) -> dict[str, str]:
+        """Start a multipart upload for a client to send parts to.
+
+        :param filename: Name of the file to upload.
+        :param folder: Folder in the S3 bucket where the file will be uploaded.
+
+        :return: The S3 key and upload ID.
+        """
+        s3_key = f'{folder}/{filename}' if folder else filename
+        response = self.s3_client.create_multipart_upload(
+            Bucket=self.aws_bucket, Key=s3_key)
+        return {'key': s3_key, 'upload_id': response['UploadId']}
+
+    def generate_presigned_parts(self, s3_key: str, upload_id: str,
+                                 part_count: int, expiration: int=3600
+                                 ) -> list[dict[str, Any]]:
+        """Generate presigned URLs to upload the parts of a multipart upload.
+
+        :param s3_key: The S3 key (filename) of the upload.
+        :param upload_id: The ID of the multipart upload.
+        :param part_count: The number of parts.
+        :param expiration: Time in seconds for the URLs to remain valid.
+
+        :return: The part numbers, starting at 1, with their PUT URLs.
+        """
+        return [{'part_number': number,
+                 'url': self.s3_client.generate_presigned_url(
+                     'upload_part', ExpiresIn=expiration,
+                     Params={'Bucket': self.aws_bucket, 'Key': s3_key,
+                             'UploadId': upload_id, 'PartNumber': number})}
+                for number in range(1, part_count + 1)]
+
+    def complete_multipart_upload(self, s3_key: str, upload_id: str,
+                                  parts: list[dict[str, Any]]) -> None:
+        """Assemble the uploaded parts of a multipart upload.
+
+        :param s3_key: The S3 key (filename) of the upload.
+        :param upload_id: The ID of the multipart upload.
+        :param parts: The part numbers and the ETags returned for them.
+        """
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.aws_bucket, Key=s3_key, UploadId=upload_id,
+            MultipartUpload={'Parts': [
+                {'PartNumber': part['part_number'], 'ETag': part['etag']}
+                for part in sorted(parts, key=lambda p: p['part_number'])]})
+
+    def abort_multipart_upload(self, s3_key: str, upload_id: str) -> None:
+        """Abort a multipart upload and delete its parts.
+
+        :param s3_key: The S3 key (filename) of the upload.
+        :param upload_id: The ID of the multipart upload.
+        """
+        self.s3_client.abort_multipart_upload(
+            Bucket=self.aws_bucket, Key=s3_key, UploadId=upload_id)
+
+    def download_file_object_from_s3(self, s3_key: str, file_object: IO[bytes],
+                                     max_bytes: int|None = None) -> None:
+        """Stream an object from S3 to a file-like object.
+
+        :param s3_key: The S3 key (filename) where the file is stored.
+        :param file_object: A writable binary file-like object.
+        :param max_bytes: The maximum size of the object, if any.
+
+        :raises ValueError: If the object is larger than ``max_bytes``.
+        """
+        response = self.get_s3_object(s3_key)
+        size = response.get('ContentLength', 0)
+        if max_bytes is not None and size > max_bytes:
+            response['Body'].close()
+            raise ValueError(f'Object is too large: {size} bytes')
+        shutil.copyfileobj(response['Body'], file_object)
 
     def generate_dominant_color(self, s3_key: str) -> str|None:
-        """Generate the dominant color of an image stored in S3. Supports both raster images and SVGs.
+        """Generate the dominant color of an image stored in S3.
+
+        The object is streamed to a spooled temporary file, so only small
+        images are held in memory, and the image is decoded at a reduced size.
 
         :param s3_key: The S3 key (filename) where the image is stored.
         :return: The dominant color as a hex string. If error, returns None.
         """
         try:
-            response = self.get_s3_object(s3_key)
-            if response is None or 'Body' not in response:
-                return None
-
-            image_bytes = response['Body'].read()
-            image_stream = BytesIO(image_bytes)
-
-            color_thief = ColorThief(image_stream)
-            dominant_color = color_thief.get_color(quality=1)
-
-            return '#{:02x}{:02x}{:02x}'.format(*dominant_color)
+            with SpooledTemporaryFile(max_size=8 * 1024 * 1024) as image_file:
+                self.download_file_object_from_s3(
+                    s3_key, image_file, self.dominant_color_max_bytes)
+                image_file.seek(0)
+                return get_dominant_color(
+                    image_file, self.dominant_color_size,
+                    self.dominant_color_max_pixels)
         except Exception as e:
             print(f'Error generating dominant color: {e}')
             return None
@@ -97,6 +450,54 @@ class AWSWrapper:
         """
         self.s3_client.delete_object(Bucket=self.aws_bucket, Key=s3_key)
 
+    def delete_batch(self, s3_keys: list[str]) -> dict[str, str]:
+        """Delete up to 1000 files from S3 with a single request.
+
+        :param s3_keys: The S3 keys (filenames) of the files.
+
+        :return: The error messages keyed by the S3 keys that could not be
+            deleted.
+        """
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=self.aws_bucket,
+                Delete={'Objects': [{'Key': s3_key} for s3_key in s3_keys],
+                        'Quiet': True})
+        except (BotoCoreError, ClientError) as e:
+            return dict.fromkeys(s3_keys, str(e))
+        return {error['Key']: error.get('Message', error['Code'])
+                for error in response.get('Errors', [])}
+
+    def delete_many(self, s3_keys: Iterable[str],
+                    workers: int|None = None) -> dict[str, str]:
+        """Delete many files from S3, with one request per 1000 keys.
+
+        The requests run concurrently on a pool of ``S3_DELETE_WORKERS``
+        threads. Keys are read lazily, and at most two batches per thread are
+        pending at once, so the keys can come from :meth:`iter_keys` on a
+        bucket of any size.
+
+        :param s3_keys: The S3 keys (filenames) of the files.
+        :param workers: The number of concurrent requests.
+
+        :return: The error messages keyed by the S3 keys that could not be
+            deleted.
+        """
+        workers = workers or self.delete_workers
+        s3_keys = iter(s3_keys)
+        errors = {}
+        with ThreadPoolExecutor(workers) as executor:
+            pending = set()
+            while batch := list(islice(s3_keys, DELETE_BATCH_SIZE)):
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        errors.update(future.result())
+                pending.add(executor.submit(self.delete_batch, batch))
+            for future in pending:
+                errors.update(future.result())
+        return errors
+
     def generate_presigned_url(self, s3_key: str, expiration: int=3600) -> dict[Any, Any]:
         """Generate a presigned URL to share an S3 object.
 
@@ -110,6 +511,61 @@ class AWSWrapper:
             ExpiresIn=expiration
         )
 
+    def generate_presigned_urls(self, s3_keys: Iterable[str],
+                                expiration: int=3600) -> dict[str, str]:
+        """Generate presigned URLs for many S3 objects at once.
+
+        The URLs are signed with SigV4 like the ones returned by
+        :meth:`generate_presigned_url`, but the signing key is derived once
+        for the whole batch instead of once per object.
+
+        :param s3_keys: The names of the objects to share.
+        :param expiration: Time in seconds for the presigned URLs to remain valid.
+        :return: Presigned URLs keyed by object name, or None for every
+            object if no credentials are configured.
+        """
+        if self.credentials is None:
+            return {s3_key: None for s3_key in s3_keys}
+        if '.' in self.aws_bucket or self.endpoint_url:
+            return {s3_key: self.generate_presigned_url(s3_key, expiration)
+                    for s3_key in s3_keys}
+
+        credentials = self.credentials.get_frozen_credentials()
+        now = datetime.now(timezone.utc)
+        datestamp = now.strftime('%Y%m%d')
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        scope = f'{datestamp}/{self.aws_region}/s3/aws4_request'
+        signing_key = derive_signing_key(
+            credentials.secret_key, datestamp, self.aws_region)
+        endpoint = urlsplit(self.s3_client.meta.endpoint_url)
+        host = f'{self.aws_bucket}.{endpoint.netloc}'
+
+        params = {
+            'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+            'X-Amz-Credential': f'{credentials.access_key}/{scope}',
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(expiration),
+            'X-Amz-SignedHeaders': 'host',
+        }
+        if credentials.token:
+            params['X-Amz-Security-Token'] = credentials.token
+        query = '&'.join(f"{name}={quote(value, safe='-_.~')}"
+                         for name, value in sorted(params.items()))
+
+        urls = {}
+        for s3_key in s3_keys:
+            path = '/' + quote(s3_key, safe='/~')
+            canonical_request = (f'GET\n{path}\n{query}\nhost:{host}\n\n'
+                                 'host\nUNSIGNED-PAYLOAD')
+            string_to_sign = '\n'.join((
+                'AWS4-HMAC-SHA256', amz_date, scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest()))
+            signature = hmac.new(signing_key, string_to_sign.encode(),
+                                 hashlib.sha256).hexdigest()
+            urls[s3_key] = (f'{endpoint.scheme}://{host}{path}?{query}'
+                            f'&X-Amz-Signature={signature}')
+        return urls
+
     def get_s3_object(self, s3_key: str) -> dict|None:
         """Fetch an object from S3 using the bucket and key.
 
@@ -128,9 +584,6 @@ class AWSWrapper:
 
         :return: list of label data if successful, otherwise None.
         """
-        if not hasattr(self, 'rekognition_client'):
-            self._init_rekognition_client()
-
         response = self.rekognition_client.detect_labels(
             Image={
                 'S3Object': {
@@ -166,11 +619,12 @@ class AWSWrapper:
 
     def clean_s3_bucket(self) -> None:
         """Delete all items (objects) from the S3 bucket."""
-        files = self.list_uploaded_files()
-        for file_key in files:
-            self.delete_file_from_s3(file_key)
+        errors = self.delete_many(self.iter_keys())
+        for s3_key, error in errors.items():
+            print(f'Could not delete {s3_key}: {error}')
 
-        print('S3 bucket cleaned successfully.')
+        print('S3 bucket cleaned successfully.' if not errors else
+              f'S3 bucket cleaned with {len(errors)} errors.')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,91 @@
+import os
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+from sqlalchemy.engine import make_url
+
+from typing import Any, Mapping
+
+# Drivers that prepare statements on the server, and the connect arguments
+# that turn it off, since a PgBouncer in transaction mode may run the next
+# statement on a server connection where it wasn't prepared.
+PREPARED_STATEMENT_ARGS = {
+    'psycopg': {'prepare_threshold': None},
+    'asyncpg': {'statement_cache_size': 0,
+                'prepared_statement_cache_size': 0},
+}
+
+
+def engine_options(config: Mapping[str, Any]) -> dict[str, Any]:
+    """Return the SQLAlchemy engine options for the database of the app.
+
+    Pool settings only apply to PostgreSQL, as the pools SQLite uses don't
+    take them. Every process, each gunicorn and Celery worker, has its own
+    pool of up to ``DB_POOL_SIZE + DB_MAX_OVERFLOW`` connections.
+
+    The statement timeout is set once per connection with a startup option.
+    PgBouncer rejects startup options and may hand every transaction a
+    different server connection, so with ``DB_PGBOUNCER`` the timeout is set
+    at the start of each transaction instead, and server-side prepared
+    statements are turned off for the drivers that use them.
+
+    :param config: The app configuration.
+
+    :return: The engine options, for ``ALCHEMICAL_ENGINE_OPTIONS``.
+    """
+    url = make_url(config['ALCHEMICAL_DATABASE_URL'])
+    options = {'echo': config.get('ALCHEMICAL_ECHO', False)}
+    if url.get_backend_name() != 'postgresql':
+        return options
+
+    options.update(pool_size=config['DB_POOL_SIZE'],
+                   max_overflow=config['DB_MAX_OVERFLOW'],
+                   pool_timeout=config['DB_POOL_TIMEOUT'],
+                   pool_recycle=config['DB_POOL_RECYCLE'],
+                   pool_pre_ping=config['DB_POOL_PRE_PING'],
+                   pool_use_lifo=True)
+    connect_args = {}
+    if url.get_driver_name() == 'psycopg2':
+        options['executemany_mode'] = config['DB_EXECUTEMANY_MODE']
+    if config['DB_PGBOUNCER']:
+        connect_args.update(
+            PREPARED_STATEMENT_ARGS.get(url.get_driver_name(), {}))
+        if config['DB_STATEMENT_TIMEOUT']:
+            options['execution_options'] = {
+                'statement_timeout': config['DB_STATEMENT_TIMEOUT']}
+    elif config['DB_STATEMENT_TIMEOUT']:
+        connect_args['options'] = \
+            f'-c statement_timeout={config["DB_STATEMENT_TIMEOUT"]}'
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+@sa.event.listens_for(so.Session, 'after_begin')
+def set_statement_timeout(session: so.Session,
+                          transaction: so.SessionTransaction,
+                          connection: sa.Connection) -> None:
+    """Set the statement timeout of a transaction behind PgBouncer."""
+    timeout = connection.get_execution_options().get('statement_timeout')
+    if timeout:
+        connection.exec_driver_sql(
+            f'SET LOCAL statement_timeout = {int(timeout)}')
+
+
+def pool_stats(engine: sa.Engine) -> dict[str, Any]:
+    """Return the connection pool usage of an engine in this process.
+
+    :param engine: The SQLAlchemy engine.
+
+    :return: The pool class, size and the connections checked out, idle in
+        the pool and opened over its size. Pools that don't keep count, like
+        the ones of SQLite, only report their class.
+    """
+    pool = engine.pool
+    stats = {'pid': os.getpid(), 'pool': type(pool).__name__,
+             'size': None, 'checked_out': None, 'idle': None,
+             'overflow': None}
+    if isinstance(pool, sa.QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(),
+                     idle=pool.checkedin(), overflow=max(pool.overflow(), 0))
+    return stats
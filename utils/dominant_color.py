@@ -0,0 +1,213 @@
+import numpy as np
+from PIL import Image
+
+from typing import IO
+
+SIGBITS = 5
+RSHIFT = 8 - SIGBITS
+MAX_ITERATION = 1000
+FRACT_BY_POPULATIONS = 0.75
+
+
+class ColorBox:
+    """A box of the quantized RGB color space and the pixels it holds.
+
+    Bounds are inclusive, in ``SIGBITS`` per channel units, like the boxes of
+    ColorThief's MMCQ so that both pick the same colors.
+    """
+    __slots__ = ('histogram', 'bounds', 'count', 'volume')
+
+    def __init__(self, histogram: np.ndarray,
+                 bounds: tuple[int, int, int, int, int, int]) -> None:
+        self.histogram = histogram
+        self.bounds = bounds
+        r1, r2, g1, g2, b1, b2 = bounds
+        self.count = int(self.pixels.sum())
+        self.volume = (r2 - r1 + 1) * (g2 - g1 + 1) * (b2 - b1 + 1)
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """The histogram of the box."""
+        r1, r2, g1, g2, b1, b2 = self.bounds
+        return self.histogram[r1:r2 + 1, g1:g2 + 1, b1:b2 + 1]
+
+    @property
+    def color(self) -> tuple[int, int, int]:
+        """The average color of the pixels in the box."""
+        r1, r2, g1, g2, b1, b2 = self.bounds
+        mult = 1 << RSHIFT
+        if not self.count:
+            return (int(mult * (r1 + r2 + 1) / 2),
+                    int(mult * (g1 + g2 + 1) / 2),
+                    int(mult * (b1 + b2 + 1) / 2))
+        pixels = self.pixels
+        return tuple(
+            int(float(np.dot(pixels.sum(axis=others).astype(np.float64),
+                             (np.arange(low, high + 1) + 0.5) * mult))
+                / self.count)
+            for (low, high), others in (((r1, r2), (1, 2)),
+                                        ((g1, g2), (0, 2)),
+                                        ((b1, b2), (0, 1))))
+
+    def split(self) -> tuple['ColorBox|None', 'ColorBox|None']:
+        """Cut the box in two along its widest side, at the median pixel.
+
+        :return: The two halves, the box and None if it can't be split, or
+            None twice if it is empty.
+        """
+        if not self.count:
+            return None, None
+        if self.count == 1:
+            return ColorBox(self.histogram, self.bounds), None
+
+        bounds = list(self.bounds)
+        widths = [bounds[1] - bounds[0], bounds[3] - bounds[2],
+                  bounds[5] - bounds[4]]
+        axis = widths.index(max(widths))
+        others = tuple(i for i in range(3) if i != axis)
+        partial = np.cumsum(self.pixels.sum(axis=others))
+        total = int(partial[-1])
+        low, high = bounds[2 * axis], bounds[2 * axis + 1]
+
+        median = low + int(np.argmax(partial > total / 2))
+        left, right = median - low, high - median
+        if left <= right:
+            cut = min(high - 1, int(median + right / 2))
+        else:
+            cut = max(low, int(median - 1 - left / 2))
+        # Avoid empty boxes, with the bounds checks of ColorThief.
+        while cut < low or not partial[cut - low]:
+            cut += 1
+        while total == partial[cut - low] and cut > low \
+                and partial[cut - 1 - low]:
+            cut -= 1
+
+        first, second = bounds.copy(), bounds.copy()
+        first[2 * axis + 1] = cut
+        second[2 * axis] = cut + 1
+        return (ColorBox(self.histogram, tuple(first)),
+                ColorBox(self.histogram, tuple(second)))
+
+
+def load_thumbnail(fp: IO[bytes], size: int = 256,
+                   max_pixels: int = 100_000_000) -> Image.Image:
+    """Decode an image at a reduced size.
+
+    JPEGs are decoded directly at a fraction of their size in draft mode,
+    then every image is shrunk with :meth:`PIL.Image.Image.reduce`, so that
+    its longest side is about ``size`` pixels.
+
+    :param fp: A seekable binary file object holding the image.
+    :param size: The approximate longest side of the thumbnail, in pixels.
+    :param max_pixels: The maximum size of the full image, in pixels.
+
+    :return: The thumbnail, in RGBA mode.
+
+    :raises ValueError: If the image is larger than ``max_pixels``.
+    """
+    image = Image.open(fp)
+    if image.width * image.height > max_pixels:
+        raise ValueError(f'Image is too large: {image.width}x{image.height}')
+    image.draft('RGB', (size, size))
+    if image.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    factor = max(image.size) // size
+    if factor > 1:
+        image = image.reduce(factor)
+    return image.convert('RGBA')
+
+
+def histogram(image: Image.Image) -> np.ndarray:
+    """Count the opaque, non-white pixels of an image per quantized color.
+
+    :param image: An RGBA image.
+
+    :return: The pixel counts, indexed by quantized red, green and blue.
+    """
+    pixels = np.asarray(image).reshape(-1, 4)
+    rgb = pixels[:, :3]
+    valid = (pixels[:, 3] >= 125) & ~(rgb > 250).all(axis=1)
+    quantized = (rgb[valid] >> RSHIFT).astype(np.intp)
+    index = (quantized[:, 0] << (2 * SIGBITS)) \
+        + (quantized[:, 1] << SIGBITS) + quantized[:, 2]
+    side = 1 << SIGBITS
+    return np.bincount(index, minlength=side ** 3).reshape(side, side, side)
+
+
+def quantize(histogram: np.ndarray, color_count: int) -> list[ColorBox]:
+    """Split a color histogram in boxes with modified median cut quantization.
+
+    :param histogram: The pixel counts per quantized color.
+    :param color_count: The maximum number of boxes.
+
+    :return: The boxes, by decreasing population times volume.
+
+    :raises ValueError: If the histogram is empty.
+    """
+    if not histogram.any():
+        raise ValueError('Image has no opaque non-white pixels')
+    occupied = [np.flatnonzero(histogram.any(axis=others))
+                for others in ((1, 2), (0, 2), (0, 1))]
+    boxes = [ColorBox(histogram, (
+        int(occupied[0][0]), int(occupied[0][-1]),
+        int(occupied[1][0]), int(occupied[1][-1]),
+        int(occupied[2][0]), int(occupied[2][-1])))]
+
+    def split(key, target: float) -> None:
+        colors = 1
+        for _ in range(MAX_ITERATION):
+            boxes.sort(key=key)
+            box = boxes.pop()
+            if not box.count:
+                boxes.append(box)
+                continue
+            first, second = box.split()
+            boxes.append(first)
+            if second:
+                boxes.append(second)
+                colors += 1
+            if colors >= target:
+                return
+
+    split(lambda box: box.count, FRACT_BY_POPULATIONS * color_count)
+    boxes.sort(key=lambda box: box.count)
+    boxes.reverse()
+    split(lambda box: box.count * box.volume, color_count - len(boxes))
+    boxes.sort(key=lambda box: box.count * box.volume)
+    return boxes[::-1]
+
+
+def get_palette(fp: IO[bytes], color_count: int = 5, size: int = 256,
+                max_pixels: int = 100_000_000) -> list[tuple[int, int, int]]:
+    """Return the main colors of an image.
+
+    :param fp: A seekable binary file object holding the image.
+    :param color_count: The maximum number of colors.
+    :param size: The approximate longest side the image is reduced to.
+    :param max_pixels: The maximum size of the full image, in pixels.
+
+    :return: The colors as RGB tuples, the dominant one first.
+
+    :raises ValueError: If the image is too large or has no visible color.
+    """
+    thumbnail = load_thumbnail(fp, size, max_pixels)
+    return [box.color for box in quantize(histogram(thumbnail), color_count)]
+
+
+def get_dominant_color(fp: IO[bytes], size: int = 256,
+                       max_pixels: int = 100_000_000) -> str:
+    """Return the dominant color of an image.
+
+    The color is the one ColorThief's ``get_color`` would return for the
+    reduced image.
+
+    :param fp: A seekable binary file object holding the image.
+    :param size: The approximate longest side the image is reduced to.
+    :param max_pixels: The maximum size of the full image, in pixels.
+
+    :return: The dominant color as a hex string.
+
+    :raises ValueError: If the image is too large or has no visible color.
+    """
+    return '#{:02x}{:02x}{:02x}'.format(
+        *get_palette(fp, 5, size, max_pixels)[0])
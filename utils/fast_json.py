@@ -0,0 +1,217 @@
+import keyword
+import weakref
+from collections.abc import Mapping
+from operator import attrgetter, itemgetter
+
+import flask
+import msgspec
+from flask import Response, current_app
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema, fields, missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+from marshmallow.utils import get_func_args
+
+from typing import Any, Callable
+
+ISO_FORMATS = (None, 'iso', 'iso8601')
+
+
+class Unsupported(Exception):
+    """A schema or value the fast path can't dump exactly like marshmallow."""
+
+
+def integer(value: Any) -> int|None:
+    return value if value is None or type(value) is int else int(value)
+
+
+def string(value: Any) -> str|None:
+    return value if value is None or type(value) is str else str(value)
+
+
+def boolean(value: Any) -> bool|None:
+    if value is None or type(value) is bool:
+        return value
+    raise Unsupported(f'{value!r} is not a boolean')
+
+
+def iso_datetime(value: Any) -> str|None:
+    return None if value is None else value.isoformat()
+
+
+class StructDumper:
+    """Dumps objects to msgspec structs with the fields of a marshmallow schema.
+
+    The struct has a field for each field the schema dumps, in the same
+    order, so that msgspec encodes it to the same JSON as marshmallow's
+    dictionary. Integers, strings, booleans and ISO dates are converted
+    inline, nested schemas get dumpers of their own and the other fields
+    are serialized by marshmallow, so their output doesn't change. Floats
+    are left to marshmallow, as msgspec doesn't format them like ``json``.
+
+    Schemas with post-dump hooks, or with keys that aren't identifiers, are
+    not supported.
+
+    :param schema: The schema instance.
+    """
+
+    def __init__(self, schema: Schema) -> None:
+        if schema._has_processors(POST_DUMP):
+            raise Unsupported(f'{schema} has post-dump hooks')
+        self.schema = schema
+        self.pre_dump = schema._has_processors(PRE_DUMP)
+        keys, self.attr_fields, self.item_fields = [], [], []
+        for name, field in schema.dump_fields.items():
+            key = name if field.data_key is None else field.data_key
+            if not key.isidentifier() or keyword.iskeyword(key):
+                raise Unsupported(f'{key!r} is not an identifier')
+            keys.append(key)
+            self.attr_fields.append(self.compile(name, field, attrgetter))
+            self.item_fields.append(self.compile(name, field, itemgetter))
+        self.struct = msgspec.defstruct(type(schema).__name__,
+                                        [(key, Any) for key in keys])
+
+    def compile(self, name: str, field: fields.Field,
+                getter: Callable) -> tuple[Callable, Callable|None]:
+        """Return the getter and the converter of the value of a field.
+
+        :param name: The name of the field in the schema.
+        :param field: The field.
+        :param getter: ``attrgetter`` for objects or ``itemgetter`` for
+            mappings.
+
+        :return: A function returning the raw value of an object and one
+            converting it, or None if it is dumped as is.
+        """
+        attribute = field.attribute or name
+        if isinstance(field, fields.Method) and field.serialize_method_name:
+            method = getattr(self.schema, field.serialize_method_name)
+            if len(get_func_args(method)) == 1:
+                return method, None
+        elif isinstance(field, fields.Nested) and '.' not in attribute:
+            dumper = struct_dumper(field.schema)
+            if dumper is not None:
+                many = field.schema.many or field.many
+                return getter(attribute), lambda value: (
+                    None if value is None else dumper.dump(value, many))
+        elif type(field) in CONVERTERS and '.' not in attribute and \
+                field.dump_default is missing and \
+                not getattr(field, 'as_string', False) and \
+                getattr(field, 'format', None) in ISO_FORMATS:
+            return getter(attribute), CONVERTERS[type(field)]
+
+        def serialize(obj: Any) -> Any:
+            value = field.serialize(name, obj,
+                                    accessor=self.schema.get_attribute)
+            if value is missing or type(value) is float:
+                raise Unsupported(f'{name} is missing or a float')
+            return value
+        return serialize, None
+
+    def dump(self, obj: Any, many: bool = False) -> Any:
+        """Dump an object or a list of objects to structs.
+
+        :param obj: The object or objects.
+        :param many: Whether ``obj`` is a list of objects.
+
+        :return: The struct or list of structs.
+        """
+        if self.pre_dump:
+            obj = self.schema._invoke_dump_processors(
+                PRE_DUMP, obj, many=many, original_data=obj)
+        struct = self.struct
+        try:
+            if not many:
+                return struct(*self.values(obj))
+            return [struct(*self.values(item)) for item in obj]
+        except (AttributeError, KeyError) as e:
+            raise Unsupported(f'Missing value: {e}') from e
+
+    def values(self, obj: Any) -> list[Any]:
+        """Return the values of the fields of an object."""
+        compiled = self.item_fields if isinstance(obj, Mapping) else \
+            self.attr_fields
+        return [get(obj) if convert is None else convert(get(obj))
+                for get, convert in compiled]
+
+
+CONVERTERS = {
+    fields.Integer: integer,
+    fields.String: string,
+    fields.Boolean: boolean,
+    fields.DateTime: iso_datetime,
+}
+dumpers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def struct_dumper(schema: Schema) -> StructDumper|None:
+    """Return the struct dumper of a schema, compiled on first use.
+
+    :param schema: The schema instance.
+
+    :return: The dumper, or None if the schema isn't supported.
+    """
+    try:
+        return dumpers[schema]
+    except KeyError:
+        pass
+    try:
+        dumper = StructDumper(schema)
+    except Unsupported:
+        dumper = None
+    dumpers[schema] = dumper
+    return dumper
+
+
+def is_struct(obj: Any) -> bool:
+    """Return whether an object is a struct or a list of structs."""
+    return isinstance(obj, msgspec.Struct) or (
+        type(obj) is list and bool(obj) and isinstance(obj[0], msgspec.Struct))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes structs with msgspec.
+
+    msgspec writes compact JSON with the keys in field order, as the stdlib
+    provider does for responses with ``sort_keys`` off. It doesn't escape
+    non-ASCII characters, nor DEL, so bodies that have any, indented ones and
+    ``dumps`` are encoded by the stdlib provider from the structs converted
+    to builtins. Anything else than structs is left to the stdlib provider.
+    """
+    encoder = msgspec.json.Encoder()
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if is_struct(obj):
+            obj = msgspec.to_builtins(obj)
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (
+            self.compact is None and self._app.debug)
+        if is_struct(obj) and not pretty and not self.sort_keys:
+            body = self.encoder.encode(obj)
+            if body.isascii() and b'\x7f' not in body:
+                return self._app.response_class(body + b'\n',
+                                                mimetype=self.mimetype)
+        return super().response(obj)
+
+
+class FastJSONMixin:
+    """Schema mixin that dumps responses to structs when ``FAST_JSON`` is on.
+
+    The schema still describes the response to apifairy, and is used as is
+    for anything the dumper doesn't support.
+    """
+
+    def jsonify(self, obj: Any, many: bool|None = None, *args: Any,
+                **kwargs: Any) -> Response:
+        if many is None:
+            many = self.many
+        if current_app.config['FAST_JSON'] and not args and not kwargs:
+            dumper = struct_dumper(self)
+            if dumper is not None:
+                try:
+                    return flask.jsonify(dumper.dump(obj, many))
+                except Unsupported:
+                    pass
+        return super().jsonify(obj, many, *args, **kwargs)
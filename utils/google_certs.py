@@ -0,0 +1,170 @@
+import json
+import logging
+import re
+import time
+from threading import Lock
+
+import requests
+from flask import Flask
+from google.auth import exceptions, jwt
+from requests.adapters import HTTPAdapter
+
+GOOGLE_OAUTH2_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ['accounts.google.com', 'https://accounts.google.com']
+
+
+class GoogleCertCache:
+    """Google's OAuth2 signing certificates, cached for their max-age.
+
+    The certificates are fetched through a pooled HTTP session and kept for
+    the ``max-age`` of the ``Cache-Control`` header of the response. If a
+    refresh fails, the expired certificates keep being used until the next
+    refresh succeeds.
+
+    Refreshes forced before the certificates expire, which anyone can cause
+    with a token signed by an unknown key, happen at most once every
+    ``min_refresh_interval`` seconds.
+    """
+
+    def __init__(self, url: str = GOOGLE_OAUTH2_CERTS_URL,
+                 pool_size: int = 4, timeout: float = 5.0,
+                 min_refresh_interval: float = 60.0) -> None:
+        self.url = url
+        self.timeout = timeout
+        self.min_refresh_interval = min_refresh_interval
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount('http://', HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size))
+        self.lock = Lock()
+        self.certs = None
+        self.expires_at = 0.0
+        self.fetched_at = float('-inf')
+
+    def get_certs(self, refresh: bool = False) -> dict[str, str]:
+        """Return the signing certificates.
+
+        :param refresh: Fetch the certificates even if they haven't expired,
+            unless they were fetched less than ``min_refresh_interval``
+            seconds ago.
+
+        :return: The certificates keyed by key ID.
+        """
+        if self.is_fresh(refresh):
+            return self.certs
+        with self.lock:
+            if self.is_fresh(refresh):
+                return self.certs
+            self.fetched_at = time.monotonic()
+            try:
+                response = self.session.get(self.url, timeout=self.timeout)
+                response.raise_for_status()
+                self.certs = response.json()
+                self.expires_at = time.time() + self.max_age(
+                    response.headers.get('Cache-Control', ''))
+            except (requests.RequestException, ValueError) as e:
+                if not self.certs:
+                    raise exceptions.TransportError(
+                        f'Could not fetch certificates at {self.url}') from e
+                logging.warning(f'Using expired Google certificates: {e}')
+        return self.certs
+
+    def is_fresh(self, refresh: bool) -> bool:
+        """Return whether the certificates can be used without a fetch.
+
+        :param refresh: Whether a refresh is forced.
+        """
+        if not self.certs:
+            return False
+        if refresh:
+            return time.monotonic() < \
+                self.fetched_at + self.min_refresh_interval
+        return time.time() < self.expires_at
+
+    @staticmethod
+    def max_age(cache_control: str) -> int:
+        """Return the max-age of a Cache-Control header.
+
+        :param cache_control: The header value.
+
+        :return: The max-age in seconds, 0 if there is none.
+        """
+        match = re.search(r'max-age=(\d+)', cache_control)
+        return int(match.group(1)) if match else 0
+
+
+class LocalCertProvider:
+    """Fixed signing certificates, to verify locally minted ID tokens."""
+
+    def __init__(self, certs: dict[str, str]) -> None:
+        self.certs = certs
+
+    @classmethod
+    def from_file(cls, path: str) -> 'LocalCertProvider':
+        """Load the certificates from a JSON file.
+
+        :param path: The path of a ``{'key id': 'certificate'}`` JSON file.
+
+        :return: The certificate provider.
+        """
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def get_certs(self, refresh: bool = False) -> dict[str, str]:
+        """Return the signing certificates.
+
+        :param refresh: Ignored, the certificates never change.
+
+        :return: The certificates keyed by key ID.
+        """
+        return self.certs
+
+
+class GoogleTokenVerifier:
+    """Verify Google ID tokens against cached signing certificates."""
+
+    def __init__(self) -> None:
+        self.provider = None
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the verifier with app configuration.
+
+        ``GOOGLE_CERTS_FILE`` selects a local certificate file instead of
+        Google's certificate endpoint, to run the login flow offline.
+
+        :param app: The Flask application instance.
+        """
+        if app.config['GOOGLE_CERTS_FILE']:
+            self.provider = LocalCertProvider.from_file(
+                app.config['GOOGLE_CERTS_FILE'])
+        else:
+            self.provider = GoogleCertCache(
+                app.config['GOOGLE_CERTS_URL'],
+                min_refresh_interval=app.config['GOOGLE_CERTS_MIN_REFRESH'])
+
+    def verify(self, credential: str, audience: str|None = None) -> dict:
+        """Verify a Google ID token.
+
+        The certificates are refreshed once if the token is signed with a key
+        that isn't known yet, and weren't refreshed in the last
+        ``GOOGLE_CERTS_MIN_REFRESH`` seconds. Otherwise the token is
+        rejected.
+
+        :param credential: The encoded ID token.
+        :param audience: The expected audience, the app's client ID.
+
+        :return: The decoded ID token.
+
+        :raises ValueError: If the token is invalid.
+        :raises google.auth.exceptions.GoogleAuthError: If the issuer is not
+            Google.
+        """
+        certs = self.provider.get_certs()
+        if jwt.decode_header(credential).get('kid') not in certs:
+            certs = self.provider.get_certs(refresh=True)
+        idinfo = jwt.decode(credential, certs=certs, audience=audience)
+        if idinfo['iss'] not in GOOGLE_ISSUERS:
+            raise exceptions.GoogleAuthError(
+                f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS}")
+        return idinfo
@@ -0,0 +1,99 @@
+import logging
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+from flask import Flask
+
+from utils.dominant_color import get_dominant_color
+
+
+def analyze_image(path: str, size: int, max_pixels: int) -> str:
+    """Return the dominant color of an image file, in a pool process.
+
+    The file is memory-mapped, so it is read straight from the page cache.
+
+    :param path: The path of the image file.
+    :param size: The approximate longest side the image is reduced to.
+    :param max_pixels: The maximum size of the full image, in pixels.
+
+    :return: The dominant color as a hex string.
+    """
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image_file:
+        return get_dominant_color(image_file, size, max_pixels)
+
+
+class ImageAnalysisExecutor:
+    """Run CPU-bound image analysis in a pool of worker processes.
+
+    The tasks that use it keep the S3 downloads and database writes in their
+    own threads, ``IMAGE_ANALYSIS_IO_SLOTS`` of them, and only hand the
+    downloaded file to one of the ``IMAGE_ANALYSIS_CPU_SLOTS`` processes, so
+    decoding images never holds the GIL of the threads doing I/O. The pool is
+    started on first use in each process, with the spawn method because the
+    threads of the parent can't be safely forked.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.pool = None
+        self.pid = None
+        self.cpu_slots = os.cpu_count() or 1
+        self.size = 256
+        self.max_pixels = 100_000_000
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the executor with app configuration.
+
+        :param app: The Flask application instance.
+        """
+        self.cpu_slots = app.config['IMAGE_ANALYSIS_CPU_SLOTS'] \
+            or os.cpu_count() or 1
+        self.size = app.config['DOMINANT_COLOR_SIZE']
+        self.max_pixels = app.config['DOMINANT_COLOR_MAX_PIXELS']
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        """Return the process pool of this process, starting it if needed.
+
+        :return: The process pool.
+        """
+        if self.pool is not None and self.pid == os.getpid():
+            return self.pool
+        with self.lock:
+            if self.pool is None or self.pid != os.getpid():
+                self.pool = ProcessPoolExecutor(
+                    self.cpu_slots,
+                    mp_context=multiprocessing.get_context('spawn'))
+                self.pid = os.getpid()
+        return self.pool
+
+    def dominant_color(self, path: str) -> str:
+        """Compute the dominant color of an image file in the process pool.
+
+        :param path: The path of the image file.
+
+        :return: The dominant color as a hex string.
+
+        :raises ValueError: If the image is too large or has no visible color.
+        """
+        pool = self.get_pool()
+        try:
+            return pool.submit(
+                analyze_image, path, self.size, self.max_pixels).result()
+        except BrokenProcessPool:
+            logging.error('Image analysis process died, restarting the pool')
+            with self.lock:
+                if self.pool is pool:
+                    self.pool = None
+            raise
+
+    def shutdown(self) -> None:
+        """Stop the worker processes of the pool."""
+        with self.lock:
+            if self.pool is not None and self.pid == os.getpid():
+                self.pool.shutdown()
+            self.pool = None
@@ -0,0 +1,135 @@
+import logging
+import smtplib
+import time
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+
+from flask import Flask, current_app
+from flask_mail import Connection, Message
+
+from typing import Callable, Iterator
+
+# Errors that concern a single message, after which the connection can still
+# send the next one.
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                  smtplib.SMTPDataError, smtplib.SMTPNotSupportedError)
+
+
+class SMTPPool:
+    """A pool of open SMTP connections, shared by the threads of a worker.
+
+    At most ``MAIL_POOL_SIZE`` connections are open at once. Threads wait up
+    to ``MAIL_POOL_TIMEOUT`` seconds for one to be free, then fail, so that a
+    slow mail server holds back the email tasks instead of piling up
+    connections. Connections idle for more than ``MAIL_POOL_IDLE_TIMEOUT``
+    seconds are closed before the server drops them.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.idle = []
+        self.size = 2
+        self.timeout = 30.0
+        self.idle_timeout = 60.0
+        self.slots = BoundedSemaphore(self.size)
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the pool with app configuration.
+
+        :param app: The Flask application instance.
+        """
+        self.close()
+        self.size = app.config['MAIL_POOL_SIZE']
+        self.timeout = app.config['MAIL_POOL_TIMEOUT']
+        self.idle_timeout = app.config['MAIL_POOL_IDLE_TIMEOUT']
+        self.slots = BoundedSemaphore(self.size)
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Check a connection out of the pool, opening one if none is idle.
+
+        The connection goes back to the pool unless an error was raised
+        while it was in use.
+
+        :return: The Flask-Mail connection.
+        """
+        if not self.slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f'No SMTP connection was free within '
+                               f'{self.timeout}s')
+        try:
+            connection = self.checkout()
+            try:
+                yield connection
+            except BaseException:
+                self.quit(connection)
+                raise
+            with self.lock:
+                self.idle.append((connection, time.monotonic()))
+        finally:
+            self.slots.release()
+
+    def checkout(self) -> Connection:
+        """Return the most recently used idle connection, or a new one."""
+        expired = []
+        connection = None
+        with self.lock:
+            deadline = time.monotonic() - self.idle_timeout
+            while self.idle:
+                idle, used_at = self.idle.pop()
+                if used_at >= deadline:
+                    connection = idle
+                    break
+                expired.append(idle)
+        for idle in expired:
+            self.quit(idle)
+        if connection is None:
+            connection = Connection(current_app.extensions['mail'])
+            connection.__enter__()
+        return connection
+
+    def send(self, messages: list[Message],
+             callback: Callable[[int, str|None], None]|None = None
+             ) -> list[str|None]:
+        """Send messages over a single connection of the pool.
+
+        A connection the server has closed is opened again once. Errors that
+        only concern one message, like a refused recipient, are returned for
+        that message, while connection errors are raised.
+
+        :param messages: The messages to send.
+        :param callback: Called with the index and the error of each message
+            once it is sent or refused, so that the outcome of the messages
+            before a connection error is known.
+
+        :return: The error of each message, or None if it was sent.
+        """
+        errors = []
+        with self.connection() as connection:
+            for index, message in enumerate(messages):
+                try:
+                    try:
+                        connection.send(message)
+                    except smtplib.SMTPServerDisconnected:
+                        connection.host = connection.configure_host()
+                        connection.send(message)
+                    errors.append(None)
+                except MESSAGE_ERRORS as e:
+                    errors.append(str(e)[:280])
+                if callback:
+                    callback(index, errors[-1])
+        return errors
+
+    def close(self) -> None:
+        """Close the idle connections of the pool."""
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection, _ in idle:
+            self.quit(connection)
+
+    @staticmethod
+    def quit(connection: Connection) -> None:
+        """Close a connection, ignoring servers that are already gone."""
+        try:
+            connection.__exit__(None, None, None)
+        except (OSError, smtplib.SMTPException) as e:
+            logging.debug(f'Could not close SMTP connection: {e}')
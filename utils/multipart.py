@@ -0,0 +1,90 @@
+import io
+import math
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+
+def get_part_size(size: int, chunksize: int) -> int:
+    """Return the part size of a multipart upload.
+
+    The configured chunk size is raised when needed to stay within S3's
+    limits of 5 MiB per part and 10000 parts per upload.
+
+    :param size: The size of the file in bytes.
+    :param chunksize: The configured part size in bytes.
+
+    :return: The part size in bytes, a whole number of MiB.
+    """
+    part_size = max(chunksize, MIN_PART_SIZE, math.ceil(size / MAX_PARTS))
+    return math.ceil(part_size / (1024 * 1024)) * 1024 * 1024
+
+
+def get_part_ranges(size: int,
+                    part_size: int) -> list[tuple[int, int, int]]:
+    """Split a file in the parts of a multipart upload.
+
+    :param size: The size of the file in bytes.
+    :param part_size: The size of every part but the last, in bytes.
+
+    :return: The part numbers, starting at 1, with their start and end
+        offsets.
+    """
+    return [(number, start, min(start + part_size, size))
+            for number, start in enumerate(range(0, size, part_size), 1)]
+
+
+class MappedPart(io.RawIOBase):
+    """Seekable binary stream over a slice of a memory-mapped file.
+
+    Reads copy straight from the mapping into the caller's buffer, so a part
+    is never loaded in memory as a whole before being sent.
+    """
+
+    def __init__(self, view: memoryview) -> None:
+        super().__init__()
+        self.view = view
+        self.position = 0
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray|memoryview) -> int:
+        """Read bytes into a buffer.
+
+        :param buffer: The buffer to fill.
+
+        :return: The number of bytes read, 0 at the end of the part.
+        """
+        size = min(len(buffer), len(self.view) - self.position)
+        if size <= 0:
+            return 0
+        buffer[:size] = self.view[self.position:self.position + size]
+        self.position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move to a new position in the part.
+
+        :param offset: The offset relative to ``whence``.
+        :param whence: ``io.SEEK_SET``, ``io.SEEK_CUR`` or ``io.SEEK_END``.
+
+        :return: The new position.
+        """
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position,
+                io.SEEK_END: len(self.view)}[whence]
+        self.position = max(base + offset, 0)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self) -> None:
+        self.view.release()
+        super().close()
@@ -0,0 +1,101 @@
+import logging
+import time
+from threading import Lock
+
+import redis
+from cachetools import LRUCache
+from flask import Flask
+
+from utils.storage import StorageBackend
+
+from typing import Iterable
+
+
+class PreviewURLCache:
+    """Cache of presigned preview URLs keyed by ``(filename, expiry bucket)``.
+
+    Time is split in windows of ``PREVIEW_URL_WINDOW`` seconds. A URL signed
+    during a window is valid until the end of the following one and is handed
+    out for the rest of the window it was signed in, so every URL returned
+    stays valid for at least a full window. Lookups go through an in-process
+    LRU first, then Redis, and the remaining keys are signed in one batch.
+    """
+
+    def __init__(self, storage: StorageBackend,
+                 redis_client: redis.Redis) -> None:
+        self.storage = storage
+        self.redis = redis_client
+        self.lock = Lock()
+        self.urls = LRUCache(maxsize=4096)
+        self.window = 3600
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the cache with app configuration.
+
+        :param app: The Flask application instance.
+        """
+        self.window = app.config['PREVIEW_URL_WINDOW']
+        self.urls = LRUCache(maxsize=app.config['PREVIEW_URL_CACHE_SIZE'])
+
+    def get(self, filename: str) -> str|None:
+        """Return the preview URL of a single file.
+
+        :param filename: The storage key of the file.
+
+        :return: The presigned preview URL, or None if it can't be signed.
+        """
+        return self.get_many([filename])[filename]
+
+    def get_many(self, filenames: Iterable[str]) -> dict[str, str|None]:
+        """Return the preview URLs of many files.
+
+        :param filenames: The storage keys of the files.
+
+        :return: The presigned preview URLs keyed by filename, None for the
+            ones that can't be signed.
+        """
+        filenames = list(dict.fromkeys(filenames))
+        now = time.time()
+        bucket = int(now // self.window)
+        urls = {}
+        with self.lock:
+            for filename in filenames:
+                url = self.urls.get((filename, bucket))
+                if url is not None:
+                    urls[filename] = url
+        missing = [filename for filename in filenames
+                   if filename not in urls]
+        if not missing:
+            return urls
+
+        keys = [f'preview_url:{bucket}:{filename}' for filename in missing]
+        try:
+            cached = self.redis.mget(keys)
+        except redis.RedisError as e:
+            logging.warning(f'Preview URL cache unavailable: {e}')
+            cached = [None] * len(missing)
+        found = {filename: url for filename, url in zip(missing, cached)
+                 if url is not None}
+
+        unsigned = [filename for filename in missing if filename not in found]
+        if unsigned:
+            window_end = (bucket + 1) * self.window
+            signed = self.storage.generate_presigned_urls(
+                unsigned, expiration=int(window_end + self.window - now))
+            signed = {filename: url for filename, url in signed.items()
+                      if url is not None}
+            try:
+                with self.redis.pipeline(transaction=False) as pipe:
+                    for filename, url in signed.items():
+                        pipe.set(f'preview_url:{bucket}:{filename}', url,
+                                 ex=max(int(window_end - now), 1))
+                    pipe.execute()
+            except redis.RedisError as e:
+                logging.warning(f'Preview URL cache unavailable: {e}')
+            found.update(signed)
+
+        with self.lock:
+            for filename, url in found.items():
+                self.urls[(filename, bucket)] = url
+        urls.update(found)
+        return {filename: urls.get(filename) for filename in filenames}
@@ -0,0 +1,147 @@
+import logging
+import os
+import time
+from threading import Lock
+
+import redis
+from cachetools import TTLCache
+from flask import Flask
+
+from typing import Any
+
+
+class PrincipalCache:
+    """Per-process cache of the principals of validated access tokens.
+
+    Entries live for ``AUTH_CACHE_TTL`` seconds at most. Tokens and users are
+    invalidated in every process through a Redis pub/sub channel. Entries are
+    only cached while this process is subscribed to it, so an invalidation
+    can't be missed.
+    """
+    channel = 'auth:invalidate'
+
+    def __init__(self, redis_client: redis.Redis) -> None:
+        self.redis = redis_client
+        self.lock = Lock()
+        self.principals = TTLCache(maxsize=1024, ttl=5)
+        self.thread = None
+        self.pid = None
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the cache with app configuration.
+
+        :param app: The Flask application instance.
+        """
+        self.principals = TTLCache(maxsize=app.config['AUTH_CACHE_SIZE'],
+                                   ttl=app.config['AUTH_CACHE_TTL'])
+
+    def get(self, access_token: str) -> Any:
+        """Return the cached principal of an access token.
+
+        :param access_token: The access token.
+
+        :return: The principal, or None if it is not cached.
+        """
+        with self.lock:
+            principal = self.principals.get(access_token)
+        if principal is not None and principal.expires_at <= time.time():
+            return None
+        return principal
+
+    def set(self, access_token: str, principal: Any) -> None:
+        """Cache the principal of an access token.
+
+        :param access_token: The access token.
+        :param principal: The principal, with ``id`` and ``expires_at``
+            attributes.
+        """
+        if not self.subscribe():
+            return
+        with self.lock:
+            self.principals[access_token] = principal
+
+    def invalidate_token(self, access_token: str) -> None:
+        """Drop an access token from the cache of every process.
+
+        :param access_token: The access token.
+        """
+        self.publish(f'token:{access_token}')
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop all the access tokens of a user from the cache of every process.
+
+        :param user_id: The user ID.
+        """
+        self.publish(f'user:{user_id}')
+
+    def publish(self, message: str) -> None:
+        """Publish an invalidation message and apply it locally.
+
+        :param message: The invalidation message.
+        """
+        self.invalidate(message)
+        try:
+            self.redis.publish(self.channel, message)
+        except redis.RedisError as e:
+            logging.warning(f'Could not publish invalidation {message}: {e}')
+
+    def invalidate(self, message: str) -> None:
+        """Apply an invalidation message to the cache of this process.
+
+        :param message: The invalidation message.
+        """
+        kind, _, value = message.partition(':')
+        with self.lock:
+            if kind == 'token':
+                self.principals.pop(value, None)
+            elif kind == 'user':
+                for access_token, principal in list(self.principals.items()):
+                    if str(principal.id) == value:
+                        del self.principals[access_token]
+            else:
+                self.principals.clear()
+
+    def subscribe(self) -> bool:
+        """Make sure this process listens to the invalidation channel.
+
+        :return: True if the process is subscribed.
+        """
+        if self.thread is not None and self.pid == os.getpid():
+            return True
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid():
+                return True
+            self.principals.clear()
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.channel: self.on_message})
+                self.thread = pubsub.run_in_thread(
+                    sleep_time=1, daemon=True,
+                    exception_handler=self.on_error)
+                self.pid = os.getpid()
+            except redis.RedisError as e:
+                logging.warning(f'Principal cache disabled: {e}')
+                return False
+        return True
+
+    def on_message(self, message: dict) -> None:
+        """Handle a message received on the invalidation channel.
+
+        :param message: The pub/sub message.
+        """
+        data = message['data']
+        self.invalidate(data.decode() if isinstance(data, bytes) else data)
+
+    def on_error(self, error: Exception, pubsub: Any, thread: Any) -> None:
+        """Stop caching when the invalidation channel is lost.
+
+        :param error: The error raised by the listener.
+        :param pubsub: The pub/sub object.
+        :param thread: The listener thread.
+        """
+        logging.warning(f'Principal cache unsubscribed: {error}')
+        thread.stop()
+        pubsub.close()
+        with self.lock:
+            self.thread = None
+            self.principals.clear()
@@ -0,0 +1,34 @@
+from flask import Flask
+from werkzeug.utils import import_string
+
+from typing import Any
+
+
+class RedisClient:
+    """Redis client connected to the ``REDIS_URL`` of the app.
+
+    It is created at import time, so that other modules can hold on to it,
+    and forwards every call to the client of the last initialized app. The
+    client is an instance of ``REDIS_CLIENT_CLASS``, which tests set to a
+    fakeredis class so that no Redis server is needed.
+
+    :param options: Options of the client, such as ``decode_responses``.
+    """
+
+    def __init__(self, **options: Any) -> None:
+        self.options = options
+        self.client = None
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the client with app configuration.
+
+        :param app: The Flask application instance.
+        """
+        client_class = import_string(app.config['REDIS_CLIENT_CLASS'])
+        self.client = client_class.from_url(str(app.config['REDIS_URL']),
+                                            **self.options)
+
+    def __getattr__(self, name: str) -> Any:
+        if self.client is None:
+            raise RuntimeError('The Redis client is used before init_app')
+        return getattr(self.client, name)
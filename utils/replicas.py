@@ -0,0 +1,191 @@
+import logging
+import time
+from threading import Lock
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+from flask import Flask, has_request_context, request
+
+from utils.database import engine_options, pool_stats
+
+from typing import Any
+
+READ_METHODS = ('GET', 'HEAD')
+ROUTING_KEY = 'database.routing'
+
+# Seconds the replica is behind the primary, 0 when it has replayed all the
+# WAL it received, so that an idle primary doesn't look like lag. A replica
+# whose WAL receiver stopped has also replayed all it received, so the lag
+# is only measured while the receiver is streaming, and is NULL otherwise.
+# The status of the receiver is only visible to roles with the privileges
+# of pg_read_all_stats.
+POSTGRES_LAG_QUERY = sa.text(
+    'SELECT CASE WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver '
+    "WHERE status = 'streaming') THEN NULL "
+    'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE COALESCE(EXTRACT(EPOCH FROM '
+    'now() - pg_last_xact_replay_timestamp()), 0) END')
+
+LAG_QUERIES = {'postgresql': POSTGRES_LAG_QUERY}
+
+
+class Replica:
+    """A read replica and the result of its last health check."""
+
+    def __init__(self, engine: sa.Engine) -> None:
+        self.engine = engine
+        self.lock = Lock()
+        self.healthy = False
+        self.lag = None
+        self.checked_at = float('-inf')
+
+    def is_available(self, max_lag: float, interval: float) -> bool:
+        """Return whether the replica can serve reads.
+
+        The replica is checked again once ``interval`` seconds have passed
+        since the last check, by the first thread to ask. Other threads use
+        the previous result meanwhile.
+
+        :param max_lag: The maximum replication lag, in seconds.
+        :param interval: The time between checks, in seconds.
+
+        :return: Whether the replica answered its last check in time.
+        """
+        if time.monotonic() >= self.checked_at + interval and \
+                self.lock.acquire(blocking=False):
+            try:
+                self.check(max_lag)
+            finally:
+                self.lock.release()
+        return self.healthy
+
+    def check(self, max_lag: float) -> None:
+        """Measure the replication lag of the replica.
+
+        A replica that doesn't report a lag, because it isn't receiving the
+        WAL of the primary, is unhealthy.
+
+        :param max_lag: The maximum replication lag, in seconds.
+        """
+        healthy = self.healthy
+        try:
+            with self.engine.connect() as connection:
+                query = LAG_QUERIES.get(connection.dialect.name,
+                                        sa.text('SELECT 0'))
+                lag = connection.execute(query).scalar()
+            self.lag = None if lag is None else float(lag)
+            self.healthy = self.lag is not None and self.lag <= max_lag
+        except sa.exc.SQLAlchemyError as e:
+            logging.warning(f'Replica {self.engine.url!r} is unavailable: {e}')
+            self.lag = None
+            self.healthy = False
+        self.checked_at = time.monotonic()
+        if self.healthy != healthy:
+            logging.info(f'Replica {self.engine.url!r} is '
+                         f'{"back" if self.healthy else "out"} of rotation '
+                         f'with a lag of {self.lag}s')
+
+
+class ReplicaSet:
+    """The read replicas of the database, from ``POSTGRES_REPLICA_URIS``.
+
+    Replicas are handed out round-robin, skipping the ones that failed their
+    last health check or lag more than ``REPLICA_MAX_LAG`` seconds behind
+    the primary.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.replicas = []
+        self.next = 0
+        self.max_lag = 5.0
+        self.check_interval = 5.0
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the replicas with app configuration.
+
+        Engines are created with the pool settings of the primary, and
+        connect on first use.
+
+        :param app: The Flask application instance.
+        """
+        self.max_lag = app.config['REPLICA_MAX_LAG']
+        self.check_interval = app.config['REPLICA_CHECK_INTERVAL']
+        for replica in self.replicas:
+            replica.engine.dispose()
+        self.replicas = [Replica(sa.create_engine(url, **engine_options(
+            {**app.config, 'ALCHEMICAL_DATABASE_URL': url})))
+            for url in app.config['POSTGRES_REPLICA_URIS']]
+        self.next = 0
+
+    def get(self) -> sa.Engine|None:
+        """Return the engine of the next available replica.
+
+        :return: The engine, or None if no replica is available.
+        """
+        with self.lock:
+            start = self.next
+            self.next = (self.next + 1) % max(len(self.replicas), 1)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if replica.is_available(self.max_lag, self.check_interval):
+                return replica.engine
+        return None
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Return the health and pool usage of the replicas in this process.
+
+        :return: The URL, without password, health, lag and pool usage of
+            each replica.
+        """
+        return [{'url': replica.engine.url.render_as_string(),
+                 'healthy': replica.healthy, 'lag': replica.lag,
+                 **pool_stats(replica.engine)} for replica in self.replicas]
+
+
+class RoutingSession(so.Session):
+    """Session that sends the reads of GET requests to a read replica.
+
+    Each request reads from a single replica, picked on its first query.
+    Requests with other methods, code outside of requests, locking reads and
+    everything that follows a write in the same request use the primary, as
+    do all requests when no replica is available.
+    """
+
+    def __init__(self, *args, replicas: ReplicaSet|None = None,
+                 **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs) -> Any:
+        if self.replicas and self.replicas.replicas and \
+                getattr(clause, 'is_select', False) and \
+                getattr(clause, '_for_update_arg', None) is None and \
+                has_request_context() and request.method in READ_METHODS:
+            routing = request.environ.setdefault(ROUTING_KEY, {})
+            if not routing.get('primary'):
+                if 'replica' not in routing:
+                    routing['replica'] = self.replicas.get()
+                if routing['replica'] is not None:
+                    return routing['replica']
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def use_primary() -> None:
+    """Send the rest of the current request to the primary."""
+    if has_request_context():
+        request.environ.setdefault(ROUTING_KEY, {})['primary'] = True
+
+
+@sa.event.listens_for(RoutingSession, 'before_flush')
+def flush_to_primary(session: so.Session, flush_context: Any,
+                     instances: Any) -> None:
+    """Read from the primary after the changes of a request are flushed."""
+    use_primary()
+
+
+@sa.event.listens_for(RoutingSession, 'do_orm_execute')
+def execute_on_primary(orm_execute_state: so.ORMExecuteState) -> None:
+    """Read from the primary after a statement that isn't a select."""
+    if not orm_execute_state.is_select:
+        use_primary()
@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import time
+from urllib.parse import urlencode
+
+import redis
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+from flask import Flask, Response, current_app, has_app_context, request
+from flask_caching import Cache
+
+from typing import Any, Iterable
+
+TABLES_KEY = 'response_cache.tables'
+
+
+class ResponseCache:
+    """Cache of the responses of read endpoints, in the app cache.
+
+    Every table has a generation, replaced once a transaction that changed
+    it is committed. Responses are cached under the generations of the
+    tables they were built from, so a commit makes the stale ones
+    unreachable and they expire on their own.
+
+    Responses are kept ``RESPONSE_CACHE_TIMEOUT`` seconds at most, and only
+    served in the ``PREVIEW_URL_WINDOW`` they were cached in, so that the
+    preview URLs they hold, and their validators, are those of the window.
+    A timeout of 0 turns the cache off.
+    """
+    # Changed along with the format of the cached values, so that entries
+    # written by earlier releases are not read.
+    prefix = 'response.v2'
+
+    def __init__(self, cache: Cache) -> None:
+        self.cache = cache
+        self.timeout = 300
+        self.window = 3600
+        sa.event.listen(so.Session, 'after_flush', self.track_flush)
+        sa.event.listen(so.Session, 'do_orm_execute', self.track_execute)
+        sa.event.listen(so.Session, 'after_commit', self.invalidate_commit)
+        sa.event.listen(so.Session, 'after_rollback', self.drop_tables)
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the cache with app configuration.
+
+        :param app: The Flask application instance.
+        """
+        self.timeout = min(app.config['RESPONSE_CACHE_TIMEOUT'],
+                           app.config['PREVIEW_URL_WINDOW'])
+        self.window = app.config['PREVIEW_URL_WINDOW']
+
+    def generations(self, tables: list[str]) -> list[Any]:
+        """Return the current generation of some tables.
+
+        Tables that have none yet, or whose generation was evicted, get a new
+        one, so that responses cached before can't be served again.
+
+        :param tables: The names of the tables.
+
+        :return: The generations, in the order of the tables.
+        """
+        keys = [f'generation:{table}' for table in tables]
+        generations = self.cache.get_many(*keys)
+        for i, generation in enumerate(generations):
+            if generation is None:
+                self.cache.add(keys[i], time.time_ns(), timeout=0)
+                generations[i] = self.cache.get(keys[i])
+        return generations
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        """Give some tables a new generation.
+
+        :param tables: The names of the tables.
+        """
+        generation = time.time_ns()
+        self.cache.set_many({f'generation:{table}': generation
+                             for table in tables}, timeout=0)
+
+    def key(self, tables: list[str], role: str) -> str:
+        """Return the cache key of the response to the current request.
+
+        :param tables: The names of the tables the response is built from.
+        :param role: The role of the user.
+
+        :return: The key of the route, query arguments, role, preview URL
+            window and generations.
+        """
+        args = urlencode(sorted(request.args.items(multi=True)))
+        window = int(time.time() // self.window)
+        digest = hashlib.sha256(
+            f'{request.path}?{args}:{role}:{window}:'
+            f'{self.generations(tables)}'.encode()).hexdigest()
+        return f'{self.prefix}:{request.endpoint}:{digest}'
+
+    def get(self, key: str) -> Response|None:
+        """Return a cached response.
+
+        :param key: The cache key.
+
+        :return: The response, or None if it is not cached.
+        """
+        cached = self.cache.get(key)
+        try:
+            data, mimetype, headers = cached
+        except (TypeError, ValueError):
+            return None
+        return current_app.response_class(data, mimetype=mimetype,
+                                          headers=headers)
+
+    def set(self, key: str, response: Response) -> None:
+        """Cache a response, with its validators.
+
+        :param key: The cache key.
+        :param response: The response.
+        """
+        headers = {header: response.headers[header]
+                   for header in ('ETag', 'Last-Modified')
+                   if header in response.headers}
+        self.cache.set(key, (response.get_data(), response.mimetype, headers),
+                       timeout=self.timeout)
+
+    @staticmethod
+    def track_flush(session: so.Session, flush_context: Any) -> None:
+        """Record the tables of the objects written by a flush."""
+        tables = session.info.setdefault(TABLES_KEY, set())
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            tables.add(sa.inspect(instance).mapper.persist_selectable.name)
+
+    @staticmethod
+    def track_execute(orm_execute_state: so.ORMExecuteState) -> None:
+        """Record the table of a bulk insert, update or delete."""
+        if orm_execute_state.is_insert or orm_execute_state.is_update or \
+                orm_execute_state.is_delete:
+            orm_execute_state.session.info.setdefault(TABLES_KEY, set()).add(
+                orm_execute_state.statement.table.name)
+
+    def invalidate_commit(self, session: so.Session) -> None:
+        """Give new generations to the tables of a committed transaction."""
+        tables = session.info.pop(TABLES_KEY, None)
+        if not tables or not has_app_context():
+            return
+        try:
+            self.invalidate(tables)
+        except redis.RedisError as e:
+            logging.error(f'Could not invalidate the responses of '
+                          f'{sorted(tables)}: {e}')
+
+    @staticmethod
+    def drop_tables(session: so.Session) -> None:
+        """Forget the tables changed by the rolled back transaction."""
+        session.info.pop(TABLES_KEY, None)
@@ -0,0 +1,425 @@
+import abc
+import base64
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from tempfile import NamedTemporaryFile
+from urllib.parse import quote, urlencode
+
+from flask import Flask
+from werkzeug.utils import safe_join
+
+from typing import IO, Any, Callable, Iterable, Iterator
+
+
+class StorageBackend(abc.ABC):
+    """Interface of the object stores the uploaded files are kept in.
+
+    Files are addressed by key, the ``filename`` of their record. Subclasses
+    implement storing, reading, listing, deleting and presigning, and can't
+    be instantiated until they do; the other methods are built on top of
+    those.
+    """
+
+    @abc.abstractmethod
+    def put(self, key: str, file_object: IO[bytes],
+            callback: Callable[[int], None]|None = None) -> None:
+        """Store the contents of a file-like object.
+
+        :param key: The key to store the file at.
+        :param file_object: A readable binary file-like object.
+        :param callback: Called with the number of bytes stored after each
+            chunk.
+        """
+
+    @abc.abstractmethod
+    def open(self, key: str) -> IO[bytes]:
+        """Open a stored file for reading.
+
+        :param key: The key of the file.
+
+        :return: A readable binary stream, to be closed by the caller.
+        """
+
+    @abc.abstractmethod
+    def iter_keys(self, prefix: str = '',
+                  modified_before: datetime|None = None) -> Iterator[str]:
+        """Iterate over the stored keys.
+
+        :param prefix: Only list the keys that start with this prefix.
+        :param modified_before: Only list the files last modified before
+            this aware datetime.
+
+        :return: An iterator over the keys.
+        """
+
+    @abc.abstractmethod
+    def delete_many(self, keys: Iterable[str],
+                    workers: int|None = None) -> dict[str, str]:
+        """Delete many files. Missing files are not an error.
+
+        :param keys: The keys of the files.
+        :param workers: The number of concurrent requests, if supported.
+
+        :return: The error messages keyed by the keys that could not be
+            deleted.
+        """
+
+    @abc.abstractmethod
+    def generate_presigned_urls(self, keys: Iterable[str],
+                                expiration: int = 3600
+                                ) -> dict[str, str|None]:
+        """Generate URLs to download many files without authentication.
+
+        :param keys: The keys of the files.
+        :param expiration: Time in seconds for the URLs to remain valid.
+
+        :return: The URLs keyed by file key, None for the ones that can't be
+            signed.
+        """
+
+    @abc.abstractmethod
+    def generate_presigned_post(self, filename: str, fields=None,
+                                conditions=None, folder: str = '',
+                                expiration: int = 3600) -> dict[str, Any]:
+        """Generate a form POST request to upload a file.
+
+        :param filename: Name of the file to upload.
+        :param fields: Fields to include in the form.
+        :param conditions: Conditions the upload has to meet.
+        :param folder: Folder where the file will be uploaded.
+        :param expiration: Time in seconds for the request to remain valid.
+
+        :return: The URL to post to and the form fields to send with the file.
+        """
+
+    def generate_presigned_url(self, key: str, expiration: int = 3600
+                               ) -> str|None:
+        """Generate a URL to download a file without authentication.
+
+        :param key: The key of the file.
+        :param expiration: Time in seconds for the URL to remain valid.
+
+        :return: The URL, or None if it can't be signed.
+        """
+        return self.generate_presigned_urls([key], expiration)[key]
+
+    def local_path(self, key: str) -> str|None:
+        """Return the path of a file on the local disk, if it is stored there.
+
+        :param key: The key of the file.
+
+        :return: The path, or None for remote backends.
+        """
+        return None
+
+    def download(self, key: str, file_object: IO[bytes],
+                 max_bytes: int|None = None) -> None:
+        """Copy a stored file to a file-like object.
+
+        :param key: The key of the file.
+        :param file_object: A writable binary file-like object.
+        :param max_bytes: The maximum size of the file, if any.
+
+        :raises ValueError: If the file is larger than ``max_bytes``.
+        """
+        with self.open(key) as stream:
+            if max_bytes is None:
+                shutil.copyfileobj(stream, file_object)
+                return
+            size = 0
+            while chunk := stream.read(min(1024 * 1024, max_bytes + 1 - size)):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f'Object is too large: over {max_bytes} '
+                                     f'bytes')
+                file_object.write(chunk)
+
+    def delete(self, key: str) -> None:
+        """Delete a file.
+
+        :param key: The key of the file.
+
+        :raises OSError: If the file could not be deleted.
+        """
+        errors = self.delete_many([key])
+        if errors:
+            raise OSError(errors[key])
+
+
+class LocalStorage(StorageBackend):
+    """Files stored in a directory of the local disk.
+
+    Keys map to paths under ``LOCAL_STORAGE_ROOT``. Presigned URLs point to
+    the routes of ``api.routes.storage`` and are signed with an HMAC of the
+    app's secret key: downloads are served from the file with ``send_file``,
+    which answers Range requests and lets the WSGI server use ``sendfile``,
+    and local paths let the image pipeline memory-map files instead of
+    copying them. This runs the whole upload, process and serve pipeline
+    without AWS.
+    """
+
+    def __init__(self) -> None:
+        self.root = os.path.abspath('storage')
+        self.url = '/storage'
+        self.secret_key = b''
+
+    def init_app(self, app: Flask) -> None:
+        """Initialize the storage with app configuration.
+
+        :param app: The Flask application instance.
+        """
+        self.root = os.path.abspath(app.config['LOCAL_STORAGE_ROOT'])
+        self.url = app.config['LOCAL_STORAGE_URL'].rstrip('/')
+        self.secret_key = app.config['SECRET_KEY'].encode()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """Return the path a key is stored at.
+
+        :param key: The key of the file.
+
+        :return: The absolute path under the storage root.
+
+        :raises ValueError: If the key would escape the storage root.
+        """
+        path = safe_join(self.root, key)
+        if path is None or not key or key.endswith('/'):
+            raise ValueError(f'Invalid key: {key}')
+        return path
+
+    def local_path(self, key: str) -> str|None:
+        try:
+            return self.path(key)
+        except ValueError:
+            return None
+
+    def put(self, key: str, file_object: IO[bytes],
+            callback: Callable[[int], None]|None = None) -> None:
+        """Store the contents of a file-like object.
+
+        The file is written next to its final path and renamed over it, so
+        readers never see a partial file.
+
+        :param key: The key to store the file at.
+        :param file_object: A readable binary file-like object.
+        :param callback: Called with the number of bytes stored after each
+            chunk.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with NamedTemporaryFile(dir=os.path.dirname(path), prefix='.',
+                                delete=False) as f:
+            try:
+                while chunk := file_object.read(1024 * 1024):
+                    f.write(chunk)
+                    if callback:
+                        callback(len(chunk))
+            except BaseException:
+                os.remove(f.name)
+                raise
+        os.replace(f.name, path)
+
+    def open(self, key: str) -> IO[bytes]:
+        """Open a stored file for reading.
+
+        :param key: The key of the file.
+
+        :return: The file, to be closed by the caller.
+
+        :raises FileNotFoundError: If there is no file with this key.
+        """
+        return open(self.path(key), 'rb')
+
+    def iter_keys(self, prefix: str = '',
+                  modified_before: datetime|None = None) -> Iterator[str]:
+        """Iterate over the stored keys in sorted order.
+
+        Temporary files of unfinished uploads are skipped.
+
+        :param prefix: Only list the keys that start with this prefix.
+        :param modified_before: Only list the files last modified before
+            this aware datetime.
+
+        :return: An iterator over the keys.
+        """
+        for directory, directories, filenames in os.walk(self.root):
+            directories.sort()
+            relative = os.path.relpath(directory, self.root)
+            relative = '' if relative == '.' else \
+                relative.replace(os.sep, '/') + '/'
+            for filename in sorted(filenames):
+                key = relative + filename
+                if filename.startswith('.') or not key.startswith(prefix):
+                    continue
+                if modified_before is None or datetime.fromtimestamp(
+                        os.path.getmtime(os.path.join(directory, filename)),
+                        timezone.utc) < modified_before:
+                    yield key
+
+    def delete_many(self, keys: Iterable[str],
+                    workers: int|None = None) -> dict[str, str]:
+        """Delete many files. Missing files are not an error.
+
+        :param keys: The keys of the files.
+        :param workers: Unused, files are deleted one after the other.
+
+        :return: The error messages keyed by the keys that could not be
+            deleted.
+        """
+        errors = {}
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                errors[key] = str(e)
+        return errors
+
+    def sign(self, message: str) -> str:
+        """Sign a message with the secret key of the app.
+
+        :param message: The message to sign.
+
+        :return: The hex digest of the HMAC-SHA256 of the message.
+        """
+        return hmac.new(self.secret_key, message.encode(),
+                        hashlib.sha256).hexdigest()
+
+    def verify(self, message: str, signature: str, expires: int) -> bool:
+        """Check the signature of a presigned request.
+
+        :param message: The signed message.
+        :param signature: The signature sent with the request.
+        :param expires: The time the request expires at, in seconds since
+            the epoch.
+
+        :return: Whether the signature is valid and hasn't expired.
+        """
+        return expires >= time.time() and \
+            hmac.compare_digest(self.sign(message), signature)
+
+    def generate_presigned_urls(self, keys: Iterable[str],
+                                expiration: int = 3600
+                                ) -> dict[str, str|None]:
+        """Generate URLs to download many files without authentication.
+
+        :param keys: The keys of the files.
+        :param expiration: Time in seconds for the URLs to remain valid.
+
+        :return: The URLs keyed by file key.
+        """
+        expires = int(time.time()) + expiration
+        return {key: f'{self.url}/{quote(key)}?' + urlencode({
+                    'expires': expires,
+                    'signature': self.sign(f'{key}\n{expires}')})
+                for key in keys}
+
+    def generate_presigned_post(self, filename: str, fields=None,
+                                conditions=None, folder: str = '',
+                                expiration: int = 3600) -> dict[str, Any]:
+        """Generate a form POST request to upload a file.
+
+        Like S3, the form carries a base64-encoded JSON policy with the key
+        and expiry, and its signature. Conditions are not supported.
+
+        :param filename: Name of the file to upload.
+        :param fields: Fields to include in the form.
+        :param conditions: Unused.
+        :param folder: Folder where the file will be uploaded.
+        :param expiration: Time in seconds for the request to remain valid.
+
+        :return: The URL to post to and the form fields to send with the file.
+        """
+        key = f'{folder}/{filename}' if folder else filename
+        policy = base64.b64encode(json.dumps({
+            'key': key, 'expires': int(time.time()) + expiration}).encode())
+        return {'url': self.url, 'fields': {
+            **(fields or {}), 'key': key, 'policy': policy.decode(),
+            'signature': self.sign(policy.decode())}}
+
+    def check_presigned_post(self, form: dict[str, str]) -> str|None:
+        """Check the fields of a form posted to upload a file.
+
+        :param form: The form fields.
+
+        :return: The key to store the file at, or None if the policy is
+            invalid, expired or for another key.
+        """
+        try:
+            policy = json.loads(base64.b64decode(form['policy']))
+            valid = policy['key'] == form['key'] and self.verify(
+                form['policy'], form['signature'], int(policy['expires']))
+        except (KeyError, ValueError, TypeError):
+            return None
+        return policy['key'] if valid else None
+
+
+class Storage(StorageBackend):
+    """The storage backend selected by the ``STORAGE_BACKEND`` setting.
+
+    ``s3`` keeps files in the bucket of the AWS wrapper and ``local`` on the
+    local disk. Calls are forwarded to the selected backend.
+    """
+
+    def __init__(self, default: StorageBackend) -> None:
+        self.default = default
+        self.backend = default
+
+    def init_app(self, app: Flask) -> None:
+        """Select the backend from app configuration.
+
+        :param app: The Flask application instance.
+
+        :raises ValueError: If the backend is unknown.
+        """
+        name = app.config.get('STORAGE_BACKEND', 's3')
+        if name == 's3':
+            self.backend = self.default
+        elif name == 'local':
+            self.backend = LocalStorage()
+            self.backend.init_app(app)
+        else:
+            raise ValueError(f'Unknown storage backend: {name}')
+
+    def put(self, key: str, file_object: IO[bytes],
+            callback: Callable[[int], None]|None = None) -> None:
+        self.backend.put(key, file_object, callback)
+
+    def open(self, key: str) -> IO[bytes]:
+        return self.backend.open(key)
+
+    def iter_keys(self, prefix: str = '',
+                  modified_before: datetime|None = None) -> Iterator[str]:
+        return self.backend.iter_keys(prefix, modified_before)
+
+    def delete_many(self, keys: Iterable[str],
+                    workers: int|None = None) -> dict[str, str]:
+        return self.backend.delete_many(keys, workers)
+
+    def generate_presigned_urls(self, keys: Iterable[str],
+                                expiration: int = 3600
+                                ) -> dict[str, str|None]:
+        return self.backend.generate_presigned_urls(keys, expiration)
+
+    def generate_presigned_post(self, filename: str, fields=None,
+                                conditions=None, folder: str = '',
+                                expiration: int = 3600) -> dict[str, Any]:
+        return self.backend.generate_presigned_post(
+            filename, fields, conditions, folder, expiration)
+
+    def generate_presigned_url(self, key: str, expiration: int = 3600
+                               ) -> str|None:
+        return self.backend.generate_presigned_url(key, expiration)
+
+    def local_path(self, key: str) -> str|None:
+        return self.backend.local_path(key)
+
+    def download(self, key: str, file_object: IO[bytes],
+                 max_bytes: int|None = None) -> None:
+        self.backend.download(key, file_object, max_bytes)
@@ -1,9 +1,52 @@
+from celery.signals import worker_shutdown
+
 from api import celery, create_app
+from config import config
+from utils.image_analysis import ImageAnalysisExecutor
+from utils.mailer import SMTPPool
 
 app = create_app()
 app.app_context().push()
+image_analysis = ImageAnalysisExecutor()
+image_analysis.init_app(app)
+mailer = SMTPPool()
+mailer.init_app(app)
+
+
+class ContextTask(celery.Task):
+    """Task that runs in its own application context.
+
+    Tasks run in the threads of the worker pool, which don't share the
+    application context, and so the database session, of the main thread.
+    """
+
+    def __call__(self, *args, **kwargs):
+        with app.app_context():
+            return self.run(*args, **kwargs)
+
 
+celery.Task = ContextTask
+celery.conf.worker_pool = 'threads'
+celery.conf.worker_concurrency = config.IMAGE_ANALYSIS_IO_SLOTS
 celery.conf.task_routes = {
     'worker.tasks.*': {'queue': 'worker'},
 }
+celery.conf.beat_schedule = {
+    'sweep-tokens': {
+        'task': 'worker.tasks.token_tasks.sweep_tokens',
+        'schedule': config.TOKEN_SWEEP_INTERVAL,
+    },
+}
 celery.autodiscover_tasks(['worker.tasks'], force=True)
+
+
+@worker_shutdown.connect
+def shutdown_image_analysis(**kwargs) -> None:
+    """Stop the image analysis processes with the worker."""
+    image_analysis.shutdown()
+
+
+@worker_shutdown.connect
+def close_mailer(**kwargs) -> None:
+    """Close the open SMTP connections with the worker."""
+    mailer.close()
@@ -1 +1,2 @@
 from worker.tasks.file_tasks import set_dominant_color, delete_s3_file
+from worker.tasks.token_tasks import sweep_tokens
@@ -0,0 +1,29 @@
+from worker import celery, mailer
+from api import db
+from api.email import deliver_emails, fail_emails
+from config import config
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+
+@celery.task(name='worker.tasks.email_tasks.send_emails', bind=True,
+             max_retries=config.MAIL_MAX_RETRIES, acks_late=True,
+             rate_limit=config.MAIL_RATE_LIMIT)
+def send_emails(self, email_ids: list[int]) -> None:
+    """Send queued emails over a pooled SMTP connection.
+
+    Connection errors are retried with exponential backoff, after which the
+    emails are marked as failed.
+
+    :param email_ids: The IDs of the emails.
+    """
+    try:
+        deliver_emails(email_ids, mailer)
+    except OSError as e:
+        db.session.rollback()
+        logging.error(f'Could not send emails {email_ids}: {e}')
+        if self.request.retries >= self.max_retries:
+            fail_emails(email_ids, str(e) or type(e).__name__)
+            return
+        raise self.retry(exc=e, countdown=2 ** self.request.retries)
@@ -1,46 +1,126 @@
-from worker import celery
-from api import db, aws_wrapper
+import os
+from tempfile import NamedTemporaryFile
+
+from worker import celery, image_analysis
+from api import db, storage
+from config import config
 from database.models import File
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
 
-@celery.task(name='worker.tasks.file_tasks.set_dominant_color', bind=True, max_retries=3)
-def set_dominant_color(self, file_id: int) -> None:
+def analyze_dominant_color(s3_key: str) -> str|None:
+    """Compute the dominant color of a stored image in the process pool.
+
+    Images on the local disk are read in place, others are downloaded to a
+    temporary file first.
+
+    :param s3_key: The storage key (filename) of the image.
+
+    :return: The dominant color as a hex string. If error, returns None.
+    """
+    try:
+        path = storage.local_path(s3_key)
+        if path is not None:
+            if os.path.getsize(path) > config.DOMINANT_COLOR_MAX_BYTES:
+                raise ValueError(f'Object is too large: '
+                                 f'{os.path.getsize(path)} bytes')
+            return image_analysis.dominant_color(path)
+        with NamedTemporaryFile() as image_file:
+            storage.download(
+                s3_key, image_file, config.DOMINANT_COLOR_MAX_BYTES)
+            image_file.flush()
+            return image_analysis.dominant_color(image_file.name)
+    except Exception as e:
+        logging.error(f'Error generating dominant color of {s3_key}: {e}')
+        return None
+
+
+def update_dominant_color(file_id: int) -> bool:
     """Set the dominant color of a file.
 
+    The tasks are only sent once the file is committed, so a missing file
+    has been deleted since.
+
     :param file_id: The ID of the file.
+
+    :return: False if the dominant color could not be generated, and should
+        be retried.
     """
     try:
         file = db.session.get(File, file_id)
         if not file:
-            logging.error(f'File with ID {file_id} not found')
-            self.retry(countdown=2)
-            return
+            logging.warning(f'File with ID {file_id} was deleted')
+            return True
 
-        dominant_color = aws_wrapper.generate_dominant_color(file.filename)
+        dominant_color = analyze_dominant_color(file.filename)
         if dominant_color:
             file.dominant_color = dominant_color
+            file.processed = True
         else:
             file.error = 'Could not generate dominant color'
             logging.error(f'Error in generating dominant color for file ID {file_id}')
-            self.retry(countdown=2)
 
         db.session.commit()
+        return dominant_color is not None
     except Exception as e:
         logging.error(f'An error occurred with file ID {file_id}: {str(e)}')
         db.session.rollback()
+        return True
+
+
+@celery.task(name='worker.tasks.file_tasks.set_dominant_color', bind=True, max_retries=3)
+def set_dominant_color(self, file_id: int) -> None:
+    """Set the dominant color of a file.
+
+    :param file_id: The ID of the file.
+    """
+    if not update_dominant_color(file_id):
+        self.retry(countdown=2)
+
+
+@celery.task(name='worker.tasks.file_tasks.set_dominant_colors', bind=True, max_retries=3)
+def set_dominant_colors(self, file_ids: list[int]) -> None:
+    """Set the dominant colors of many files, sent in a single message.
+
+    Only the files whose dominant color could not be generated are retried.
+
+    :param file_ids: The IDs of the files.
+    """
+    failed = [file_id for file_id in file_ids
+              if not update_dominant_color(file_id)]
+    if failed:
+        self.retry(args=[failed], countdown=2)
 
 
 @celery.task(name='worker.tasks.file_tasks.delete_s3_file', bind=True, max_retries=3)
 def delete_s3_file(self, filename: str) -> None:
-    """Delete a file from S3.
+    """Delete a file from storage.
 
     :param filename: The name of the file.
     """
     try:
-        aws_wrapper.delete_file_from_s3(filename)
+        storage.delete(filename)
     except Exception as e:
         logging.error(f'An error occurred with file {filename}: {str(e)}')
         self.retry(countdown=2)
+
+
+@celery.task(name='worker.tasks.file_tasks.delete_s3_files', bind=True, max_retries=3)
+def delete_s3_files(self, filenames: list[str]) -> None:
+    """Delete many files from storage, 1000 per request on S3.
+
+    Only the files that could not be deleted are retried.
+
+    :param filenames: The names of the files.
+    """
+    try:
+        errors = storage.delete_many(filenames)
+    except Exception as e:
+        logging.error(f'An error occurred deleting {len(filenames)} files: {str(e)}')
+        self.retry(countdown=2)
+    for filename, error in errors.items():
+        logging.error(f'An error occurred with file {filename}: {error}')
+    if errors:
+        self.retry(args=[list(errors)], countdown=2)
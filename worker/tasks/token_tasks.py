@@ -0,0 +1,38 @@
+from worker import celery
+from api.app import token_redis
+from api.token import Token
+from config import config
+import logging
+import time
+
+logging.basicConfig(level=logging.INFO)
+
+SWEEP_CURSOR_KEY = 'token_sweep:cursor'
+
+
+@celery.task(name='worker.tasks.token_tasks.sweep_tokens')
+def sweep_tokens() -> dict:
+    """Remove expired tokens from the user token indexes.
+
+    Each run scans at most ``TOKEN_SWEEP_MAX_BATCHES`` batches of
+    ``TOKEN_SWEEP_BATCH_SIZE`` keys and saves the SCAN cursor, so that the
+    next run resumes where this one stopped.
+
+    :return: The number of entries removed, the duration of the run in
+        seconds and the saved cursor.
+    """
+    start = time.perf_counter()
+    cursor = int(token_redis.get(SWEEP_CURSOR_KEY) or 0)
+    removed = 0
+    for _ in range(config.TOKEN_SWEEP_MAX_BATCHES):
+        cursor, batch_removed = Token.sweep(
+            cursor, count=config.TOKEN_SWEEP_BATCH_SIZE)
+        removed += batch_removed
+        if cursor == 0:
+            break
+    token_redis.set(SWEEP_CURSOR_KEY, cursor)
+
+    duration = time.perf_counter() - start
+    logging.info(f'Token sweep removed {removed} expired tokens '
+                 f'in {duration:.3f}s')
+    return {'removed': removed, 'duration': duration, 'cursor': cursor}